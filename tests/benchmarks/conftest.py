@@ -0,0 +1,131 @@
+import json
+import os
+import statistics
+import time
+import warnings
+from io import StringIO
+
+import pytest
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+# YATUBE_BENCHMARK=check сравнивает с базовой линией, =update её переписывает.
+MODE = os.environ.get('YATUBE_BENCHMARK', '')
+# Время зависит от машины и её загрузки, поэтому проверку валит только
+# рост числа запросов, а замедление сверх допуска — предупреждение.
+# С явным YATUBE_BENCHMARK_TOLERANCE замедление тоже валит проверку.
+STRICT_TIME = 'YATUBE_BENCHMARK_TOLERANCE' in os.environ
+TOLERANCE = float(os.environ.get('YATUBE_BENCHMARK_TOLERANCE', '1.0'))
+# Запас на шум таймера у замеров порядка миллисекунды.
+SLACK_MS = 1.0
+ROUNDS = 15
+PREFIX = 'bench'
+
+
+class Benchmark:
+    """Медиана времени и число SQL-запросов, сравнение с базовой линией."""
+
+    def __init__(self, baseline):
+        self.baseline = baseline
+        self.results = {}
+
+    def __call__(self, name, func, setup=cache.clear, rounds=ROUNDS):
+        setup()
+        func()
+        timings = []
+        queries = 0
+        for _ in range(rounds):
+            setup()
+            with CaptureQueriesContext(connection) as context:
+                start = time.perf_counter()
+                func()
+                timings.append((time.perf_counter() - start) * 1000)
+            queries = max(queries, len(context))
+        result = {
+            'time_ms': round(statistics.median(timings), 3),
+            'queries': queries,
+        }
+        self.results[name] = result
+        if MODE == 'update':
+            return result
+        expected = self.baseline.get(name)
+        assert expected is not None, (
+            f'Нет базовой линии для `{name}`: '
+            'запустите с YATUBE_BENCHMARK=update'
+        )
+        assert queries <= expected['queries'], (
+            f'`{name}`: SQL-запросов стало {queries}, '
+            f'в базовой линии {expected["queries"]}'
+        )
+        limit = expected['time_ms'] * (1 + TOLERANCE) + SLACK_MS
+        if result['time_ms'] > limit:
+            message = (
+                f'`{name}`: {result["time_ms"]:.2f} мс, в базовой линии '
+                f'{expected["time_ms"]:.2f} мс, допустимо до {limit:.2f} мс'
+            )
+            assert not STRICT_TIME, message
+            warnings.warn(message)
+        return result
+
+
+@pytest.fixture(scope='session')
+def benchmark():
+    # Замеры очищают кэш на каждом раунде: только кэш прогона тестов.
+    assert settings.TESTING, 'Замеры запускаются только через pytest'
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as file:
+            baseline = json.load(file)
+    bench = Benchmark(baseline)
+    yield bench
+    if MODE == 'update' and bench.results:
+        baseline.update(bench.results)
+        with open(BASELINE_PATH, 'w') as file:
+            json.dump(baseline, file, ensure_ascii=False, indent=2,
+                      sort_keys=True)
+            file.write('\n')
+
+
+@pytest.fixture(scope='module')
+def dataset(django_db_setup, django_db_blocker):
+    """Граф seed_social_graph с постоянным seed: число запросов стабильно."""
+    from django.contrib.auth import get_user_model
+    from posts.models import Group, Post, UserStats
+
+    User = get_user_model()
+    with django_db_blocker.unblock():
+        call_command(
+            'seed_social_graph', '--prefix', PREFIX, '--users', '40',
+            '--groups', '3', '--posts', '1000', '--comments', '1500',
+            '--follows', '8', '--seed', '0', '--with-search',
+            stdout=StringIO(),
+        )
+        stats = UserStats.objects.select_related('user')
+        reader = stats.order_by('-following_count', 'pk').first().user
+        author = stats.order_by('-posts_count', 'pk').first().user
+        users = User.objects.filter(username__startswith=f'{PREFIX}-')
+        groups = Group.objects.filter(slug__startswith=f'{PREFIX}-group-')
+        data = {
+            'reader': reader,
+            'author': author,
+            'stranger': users.exclude(pk=reader.pk)
+            .exclude(following__user=reader).order_by('pk').first(),
+            'group': groups.order_by('pk').first(),
+            'post': Post.objects.order_by('-comments_count', 'pk').first(),
+            'own_post': author.posts.order_by('pk').first(),
+        }
+    yield data
+    with django_db_blocker.unblock():
+        groups.delete()
+        users.delete()
+        cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def quiet_query_log(settings):
+    # Журнал запросов не пишет в базу посреди замера.
+    settings.QUERY_LOG_FLUSH_INTERVAL = float('inf')
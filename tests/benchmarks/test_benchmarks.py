@@ -0,0 +1,257 @@
+"""
+Регрессионные замеры производительности.
+
+Запуск: YATUBE_BENCHMARK=check pytest tests/benchmarks
+Обновить базовую линию: YATUBE_BENCHMARK=update pytest tests/benchmarks
+"""
+import pytest
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.test import Client, RequestFactory
+from django.urls import reverse
+
+from posts import thumbnails
+from posts.feed import follow_feed
+from posts.models import Follow, Post
+from posts.utils import add_paginator_on_page
+
+from .conftest import MODE
+
+pytestmark = [
+    pytest.mark.django_db,
+    pytest.mark.skipif(
+        MODE not in ('check', 'update'),
+        reason='Замеры включаются переменной YATUBE_BENCHMARK=check|update',
+    ),
+]
+
+
+def logged_in(user):
+    client = Client()
+    client.force_login(user)
+    return client
+
+
+def get(client, url, status=200):
+    def run():
+        response = client.get(url)
+        assert response.status_code == status, url
+    return run
+
+
+class TestViews:
+
+    def test_index(self, benchmark, dataset):
+        benchmark('view.index', get(Client(), reverse('posts:index')))
+
+    def test_index_cached(self, benchmark, dataset):
+        benchmark('view.index.cached', get(Client(), reverse('posts:index')),
+                  setup=lambda: None)
+
+    def test_index_not_modified(self, benchmark, dataset):
+        client = Client()
+        etag = client.get(reverse('posts:index'))['ETag']
+
+        def run():
+            response = client.get(
+                reverse('posts:index'), HTTP_IF_NONE_MATCH=etag
+            )
+            assert response.status_code == 304
+
+        benchmark('view.index.not_modified', run, setup=lambda: None)
+
+    def test_group_posts(self, benchmark, dataset):
+        url = reverse(
+            'posts:group_list', kwargs={'slug': dataset['group'].slug}
+        )
+        benchmark('view.group_posts', get(Client(), url))
+
+    def test_profile(self, benchmark, dataset):
+        url = reverse(
+            'posts:profile', kwargs={'username': dataset['author'].username}
+        )
+        benchmark('view.profile', get(logged_in(dataset['reader']), url))
+
+    def test_post_detail(self, benchmark, dataset):
+        url = reverse(
+            'posts:post_detail', kwargs={'post_id': dataset['post'].pk}
+        )
+        benchmark('view.post_detail', get(Client(), url))
+
+    def test_search(self, benchmark, dataset):
+        word = dataset['post'].text.split()[0]
+        url = f'{reverse("posts:search")}?q={word}'
+        benchmark('view.search', get(Client(), url))
+
+    def test_follow_index(self, benchmark, dataset):
+        client = logged_in(dataset['reader'])
+        benchmark('view.follow_index',
+                  get(client, reverse('posts:follow_index')))
+
+    def test_create_post_form(self, benchmark, dataset):
+        client = logged_in(dataset['author'])
+        benchmark('view.create_post.get',
+                  get(client, reverse('posts:create_post')))
+
+    def test_create_post_submit(self, benchmark, dataset):
+        client = logged_in(dataset['author'])
+
+        def run():
+            response = client.post(
+                reverse('posts:create_post'), {'text': 'Замер'}
+            )
+            assert response.status_code == 302
+
+        benchmark('view.create_post.post', run)
+
+    def test_post_edit_form(self, benchmark, dataset):
+        url = reverse(
+            'posts:post_edit', kwargs={'post_id': dataset['own_post'].pk}
+        )
+        benchmark('view.post_edit', get(logged_in(dataset['author']), url))
+
+    def test_add_comment(self, benchmark, dataset):
+        client = logged_in(dataset['reader'])
+        url = reverse(
+            'posts:add_comment', kwargs={'post_id': dataset['post'].pk}
+        )
+
+        def run():
+            assert client.post(url, {'text': 'Замер'}).status_code == 302
+
+        benchmark('view.add_comment', run)
+
+    def test_follow_unfollow(self, benchmark, dataset):
+        client = logged_in(dataset['reader'])
+        username = dataset['stranger'].username
+        kwargs = {'username': username}
+        follow = get(client, reverse('posts:profile_follow', kwargs=kwargs),
+                     302)
+        unfollow = get(client,
+                       reverse('posts:profile_unfollow', kwargs=kwargs), 302)
+
+        def run():
+            follow()
+            unfollow()
+
+        benchmark('view.profile_follow+unfollow', run)
+
+
+class TestPaginator:
+
+    def request(self, **params):
+        request = RequestFactory().get('/', params)
+        request.user = AnonymousUser()
+        return request
+
+    def page(self, request):
+        return lambda: list(
+            add_paginator_on_page(Post.objects.for_feed(), request)
+        )
+
+    def test_first_page(self, benchmark, dataset):
+        benchmark('paginator.cursor.first', self.page(self.request()),
+                  setup=lambda: None)
+
+    def test_cursor_page(self, benchmark, dataset):
+        first = add_paginator_on_page(Post.objects.for_feed(), self.request())
+        request = self.request(cursor=first.next_cursor)
+        benchmark('paginator.cursor.next', self.page(request),
+                  setup=lambda: None)
+
+    def test_numbered_page(self, benchmark, dataset, settings):
+        # Замер нумерованных страниц, даже если выборка выросла за лимит.
+        settings.PAGE_NUMBERS_MAX_COUNT = 10 ** 6
+        benchmark('paginator.numbered', self.page(self.request(page=5)),
+                  setup=lambda: None)
+
+
+class TestTemplates:
+
+    @pytest.fixture
+    def context(self, dataset):
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        page_obj = add_paginator_on_page(Post.objects.for_feed(), request)
+        thumbnails.attach(page_obj)
+        list(page_obj)
+        return request, {'page_obj': page_obj}
+
+    def test_index_template(self, benchmark, context):
+        request, data = context
+        benchmark(
+            'template.posts/index.html',
+            lambda: render_to_string('posts/index.html', data, request),
+            setup=cache.clear,
+        )
+
+    def test_paginator_template(self, benchmark, context):
+        request, data = context
+        benchmark(
+            'template.includes/paginator.html',
+            lambda: render_to_string('includes/paginator.html', data, request),
+            setup=lambda: None,
+        )
+
+
+class TestPostCards:
+    """Главная с карточками из кэша (warm) и без него (cold)."""
+
+    @pytest.fixture(params=(10, 50, 100))
+    def context(self, request, dataset, settings):
+        settings.POSTS_PER_PAGE = request.param
+        page_request = RequestFactory().get('/')
+        page_request.user = AnonymousUser()
+        page_obj = add_paginator_on_page(
+            Post.objects.for_feed(), page_request
+        )
+        thumbnails.attach(page_obj)
+        list(page_obj)
+        return request.param, page_request, {'page_obj': page_obj}
+
+    def test_cold(self, benchmark, context):
+        per_page, request, data = context
+        benchmark(
+            f'template.post_cards.{per_page}.cold',
+            lambda: render_to_string('posts/index.html', data, request),
+            setup=cache.clear,
+        )
+
+    def test_warm(self, benchmark, context):
+        per_page, request, data = context
+        benchmark(
+            f'template.post_cards.{per_page}.warm',
+            lambda: render_to_string('posts/index.html', data, request),
+            setup=lambda: None,
+        )
+
+
+class TestFollowLookups:
+
+    def test_is_following(self, benchmark, dataset):
+        reader, author = dataset['reader'], dataset['author']
+        benchmark(
+            'follow.exists',
+            lambda: Follow.objects.filter(user=reader, author=author).exists(),
+            setup=lambda: None,
+        )
+
+    def test_following_ids(self, benchmark, dataset):
+        follows = Follow.objects.filter(user=dataset['reader'])
+        benchmark(
+            'follow.authors',
+            lambda: list(follows.values_list('author', flat=True)),
+            setup=lambda: None,
+        )
+
+    def test_follow_feed_page(self, benchmark, dataset):
+        reader = dataset['reader']
+        benchmark(
+            'follow.feed_page',
+            lambda: list(
+                follow_feed(reader).for_feed()[:settings.POSTS_PER_PAGE]
+            ),
+            setup=cache.clear,
+        )
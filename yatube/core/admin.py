@@ -0,0 +1,32 @@
+from django.contrib import admin
+
+from .models import QueryFingerprint, SlowQuery
+
+
+class ReadOnlyAdmin(admin.ModelAdmin):
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(QueryFingerprint)
+class QueryFingerprintAdmin(ReadOnlyAdmin):
+    list_display = (
+        'digest', 'sql', 'calls', 'total_time', 'mean',
+        'max_time', 'slow_calls', 'last_seen',
+    )
+    search_fields = ('sql',)
+
+    def mean(self, obj):
+        return f'{obj.mean_time:.6f}'
+    mean.short_description = 'Среднее время, с'
+
+
+@admin.register(SlowQuery)
+class SlowQueryAdmin(ReadOnlyAdmin):
+    list_display = ('pk', 'created', 'duration', 'view', 'path', 'sql')
+    list_filter = ('view', 'created')
+    search_fields = ('sql', 'path')
+    raw_id_fields = ('fingerprint',)
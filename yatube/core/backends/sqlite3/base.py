@@ -0,0 +1,43 @@
+"""
+SQLite с опциями init_command и transaction_mode из Django 5.1.
+
+init_command — SQL через «;», который выполняется на каждом новом
+соединении: прагмы журнала, кэша страниц, mmap и т.п.
+transaction_mode — режим BEGIN для transaction.atomic. В режиме
+IMMEDIATE транзакция сразу берёт блокировку записи и ждёт её
+busy_timeout; отложенная (DEFERRED) при переходе от чтения к записи
+получает «database is locked» без ожидания, если писатель уже есть.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        self.init_command = kwargs.pop('init_command', None)
+        mode = kwargs.pop('transaction_mode', None)
+        if mode is not None and mode.upper() not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                f'transaction_mode должен быть одним из {TRANSACTION_MODES}, '
+                f'а не {mode!r}.'
+            )
+        self.transaction_mode = mode.upper() if mode else None
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for statement in (self.init_command or '').split(';'):
+            if statement.strip():
+                conn.execute(statement)
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        if self.transaction_mode is None:
+            super()._start_transaction_under_autocommit()
+        else:
+            self.cursor().execute(f'BEGIN {self.transaction_mode}')
@@ -0,0 +1,278 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from . import metrics
+
+
+RAW = b'r'
+COMPRESSED = b'z'
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    ' key TEXT PRIMARY KEY, value BLOB, expires REAL,'
+    ' accessed REAL, size INTEGER) WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+    'CREATE TABLE IF NOT EXISTS cache_stats ('
+    ' id INTEGER PRIMARY KEY CHECK (id = 1),'
+    ' entries INTEGER, bytes INTEGER)',
+    'INSERT OR IGNORE INTO cache_stats VALUES (1, 0, 0)',
+    'CREATE TRIGGER IF NOT EXISTS cache_insert AFTER INSERT ON cache BEGIN'
+    ' UPDATE cache_stats SET entries = entries + 1,'
+    ' bytes = bytes + new.size; END',
+    'CREATE TRIGGER IF NOT EXISTS cache_delete AFTER DELETE ON cache BEGIN'
+    ' UPDATE cache_stats SET entries = entries - 1,'
+    ' bytes = bytes - old.size; END',
+    'CREATE TRIGGER IF NOT EXISTS cache_update'
+    ' AFTER UPDATE OF size ON cache BEGIN'
+    ' UPDATE cache_stats SET bytes = bytes - old.size + new.size; END',
+)
+
+
+class SQLiteCache(BaseCache):
+    """
+    Общий для всех процессов кэш в файле SQLite (WAL).
+
+    Поддерживает атомарный incr, get_many/set_many одним запросом,
+    сжатие больших значений и вытеснение давно не читанных ключей
+    (LRU) по числу записей (MAX_ENTRIES) и объёму (MAX_SIZE, байт).
+    """
+    # Время последнего чтения обновляется не чаще раза в секунду,
+    # пачками не больше TOUCH_BATCH ключей на запрос.
+    ACCESS_RESOLUTION = 1.0
+    TOUCH_BATCH = 500
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._max_size = int(options.get('MAX_SIZE', 64 * 1024 * 1024))
+        self._compress_min = int(options.get('COMPRESS_MIN_SIZE', 1024))
+        self._busy_timeout = float(options.get('BUSY_TIMEOUT', 5))
+        self._local = threading.local()
+
+    @property
+    def _db(self):
+        # Соединение своё у каждого потока и процесса (после fork).
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            local.db = sqlite3.connect(
+                self._path,
+                timeout=self._busy_timeout,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            local.db.execute('PRAGMA journal_mode=WAL')
+            local.db.execute('PRAGMA synchronous=NORMAL')
+            # REPLACE удаляет старую строку: триггеры учёта должны сработать.
+            local.db.execute('PRAGMA recursive_triggers=ON')
+            for statement in SCHEMA:
+                local.db.execute(statement)
+            local.pid = os.getpid()
+        return local.db
+
+    def _encode(self, value):
+        if type(value) is int and -2 ** 63 <= value < 2 ** 63:
+            return value, 8
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if len(data) >= self._compress_min:
+            data = COMPRESSED + zlib.compress(data)
+        else:
+            data = RAW + data
+        return data, len(data)
+
+    @staticmethod
+    def _decode(data):
+        if isinstance(data, int):
+            return data
+        if data[:1] == COMPRESSED:
+            return pickle.loads(zlib.decompress(data[1:]))
+        return pickle.loads(data[1:])
+
+    def _expires(self, timeout):
+        # Для BaseCache это абсолютное время истечения или None.
+        return self.get_backend_timeout(timeout)
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    @contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE сразу берёт блокировку записи на весь файл,
+        # поэтому чтение-изменение-запись атомарны между процессами.
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            yield db
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+
+    def _write(self, sql, rows, many=False):
+        with self._transaction() as db:
+            cursor = (db.executemany if many else db.execute)(sql, rows)
+        return cursor.rowcount
+
+    def _rows(self, items, timeout):
+        now = time.time()
+        expires = self._expires(timeout)
+        for key, value in items:
+            data, size = self._encode(value)
+            yield key, data, expires, now, size
+
+    def _touch_accessed(self, keys, now):
+        """
+        Время чтения нужно только для вытеснения, поэтому пишется по
+        возможности: ключи копятся в потоке и сбрасываются не чаще
+        ACCESS_RESOLUTION одним UPDATE без ожидания блокировки. Если
+        база занята записью, отметки пропускаются, а чтение не падает.
+        """
+        local = self._local
+        touched = local.__dict__.setdefault('touched', set())
+        touched.update(keys)
+        if now - getattr(local, 'touched_at', 0) < self.ACCESS_RESOLUTION:
+            return
+        keys = list(touched)
+        touched.clear()
+        local.touched_at = now
+        db = self._db
+        db.execute('PRAGMA busy_timeout = 0')
+        try:
+            for start in range(0, len(keys), self.TOUCH_BATCH):
+                batch = keys[start:start + self.TOUCH_BATCH]
+                db.execute(
+                    'UPDATE cache SET accessed = ? WHERE accessed < ?'
+                    f' AND key IN ({",".join("?" * len(batch))})',
+                    (now, now - self.ACCESS_RESOLUTION, *batch),
+                )
+        except sqlite3.OperationalError:
+            pass
+        finally:
+            db.execute(
+                f'PRAGMA busy_timeout = {int(self._busy_timeout * 1000)}'
+            )
+
+    def _cull(self):
+        db = self._db
+        entries, size = db.execute(
+            'SELECT entries, bytes FROM cache_stats'
+        ).fetchone()
+        if entries <= self._max_entries and size <= self._max_size:
+            return
+        db.execute('DELETE FROM cache WHERE expires < ?', (time.time(),))
+        entries, size = db.execute(
+            'SELECT entries, bytes FROM cache_stats'
+        ).fetchone()
+        if entries <= self._max_entries and size <= self._max_size:
+            return
+        if self._cull_frequency == 0:
+            return self.clear()
+        db.execute(
+            'DELETE FROM cache WHERE key IN ('
+            'SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+            (max(entries // self._cull_frequency, 1),),
+        )
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version=version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        made = {self._key(key, version): key for key in keys}
+        now = time.time()
+        rows = self._db.execute(
+            'SELECT key, value FROM cache WHERE (expires IS NULL'
+            f' OR expires > ?) AND key IN ({",".join("?" * len(made))})',
+            (now, *made),
+        ).fetchall()
+        if rows:
+            self._touch_accessed([row[0] for row in rows], now)
+        metrics.record_cache(len(rows), len(made) - len(rows))
+        return {made[key]: self._decode(value) for key, value in rows}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout=timeout, version=version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        items = [(self._key(key, version), value)
+                 for key, value in data.items()]
+        self._write(
+            'INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?)',
+            self._rows(items, timeout),
+            many=True,
+        )
+        self._cull()
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        with self._transaction() as db:
+            db.execute(
+                'DELETE FROM cache WHERE key = ? AND expires < ?',
+                (key, time.time()),
+            )
+            added = db.execute(
+                'INSERT OR IGNORE INTO cache VALUES (?, ?, ?, ?, ?)',
+                next(self._rows([(key, value)], timeout)),
+            ).rowcount
+        self._cull()
+        return bool(added)
+
+    def incr(self, key, delta=1, version=None):
+        """Атомарное увеличение значения в транзакции записи."""
+        key = self._key(key, version)
+        with self._transaction() as db:
+            row = db.execute(
+                'SELECT value FROM cache WHERE key = ? AND'
+                ' (expires IS NULL OR expires > ?)',
+                (key, time.time()),
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = self._decode(row[0]) + delta
+            data, size = self._encode(value)
+            db.execute(
+                'UPDATE cache SET value = ?, size = ? WHERE key = ?',
+                (data, size, key),
+            )
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return bool(self._write(
+            'UPDATE cache SET expires = ? WHERE key = ?',
+            (self._expires(timeout), self._key(key, version)),
+        ))
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version=version)
+
+    def delete_many(self, keys, version=None):
+        self._write(
+            'DELETE FROM cache WHERE key = ?',
+            [(self._key(key, version),) for key in keys],
+            many=True,
+        )
+
+    def has_key(self, key, version=None):
+        return self._db.execute(
+            'SELECT 1 FROM cache WHERE key = ? AND'
+            ' (expires IS NULL OR expires > ?)',
+            (self._key(key, version), time.time()),
+        ).fetchone() is not None
+
+    def clear(self):
+        self._write('DELETE FROM cache', ())
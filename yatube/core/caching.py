@@ -0,0 +1,139 @@
+"""
+Кэширование вычисляемых значений без лавины пересчётов.
+
+Запись хранит значение, его версию, мягкий срок и время вычисления.
+Физически запись живёт дольше мягкого срока на CACHE_STALE_TIMEOUT,
+поэтому после истечения её ещё можно отдать устаревшей.
+
+- Пересчёт делает один исполнитель: кто первым взял блокировку
+  в кэше. Остальные в это время получают прежнее значение, а если
+  его нет, ждут появления нового.
+- Истёкшая по сроку запись обновляется в фоне, запрос получает
+  прежнее значение. Срок истекает вероятностно раньше времени
+  (XFetch): чем дороже вычисление, тем раньше.
+- Запись другой версии (поколения страниц после изменения данных)
+  пересчитывает тот, кто взял блокировку; остальные до его записи
+  получают прежнее значение. get_or_compute_versioned возвращает
+  и версию отданного значения, чтобы по ней строить валидаторы.
+"""
+import logging
+import math
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+
+logger = logging.getLogger(__name__)
+
+LOCK_KEY = 'lock:{}'
+WAIT_INTERVAL = 0.05
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _pool():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.CACHE_REFRESH_WORKERS,
+                thread_name_prefix='cache-refresh',
+            )
+    return _executor
+
+
+def _acquire(key):
+    return cache.add(
+        LOCK_KEY.format(key), 1, settings.CACHE_LOCK_TIMEOUT
+    )
+
+
+def _release(key):
+    cache.delete(LOCK_KEY.format(key))
+
+
+def _expired(expires, delta, beta):
+    # XFetch: -ln(U) экспоненциально распределён, дорогие значения
+    # пересчитываются раньше, чем истечёт их срок.
+    return time.time() - delta * beta * math.log(random.random()) >= expires
+
+
+def _store(key, compute, timeout, version):
+    """Вычисляет значение и кладёт его в кэш, снимая блокировку."""
+    try:
+        start = time.perf_counter()
+        value = compute()
+        delta = time.perf_counter() - start
+        if value is not None:
+            cache.set(
+                key,
+                (value, version, time.time() + timeout, delta),
+                timeout + settings.CACHE_STALE_TIMEOUT,
+            )
+        return value
+    finally:
+        _release(key)
+
+
+def _refresh(key, compute, timeout, version):
+    try:
+        _store(key, compute, timeout, version)
+    except Exception:
+        logger.exception('Не удалось обновить %s в фоне', key)
+    finally:
+        # Поток пула не обслуживает запросы: соединения закрываем сами.
+        connections.close_all()
+
+
+def _wait(key, version):
+    deadline = time.monotonic() + settings.CACHE_LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None and entry[1] == version:
+            return entry
+    return None
+
+
+def get_or_compute(key, compute, timeout, version='', beta=1.0):
+    """
+    Значение по ключу с защитой от одновременных пересчётов.
+
+    compute() возвращает значение для кэша или None, если результат
+    кэшировать нельзя; тогда его возвращает и get_or_compute.
+    """
+    return get_or_compute_versioned(key, compute, timeout, version, beta)[0]
+
+
+def get_or_compute_versioned(key, compute, timeout, version='', beta=1.0):
+    """
+    То же, что get_or_compute, но возвращает (значение, версия):
+    пока новую версию считает другой исполнитель, версия прежняя.
+    """
+    entry = cache.get(key)
+    if entry is None:
+        if _acquire(key):
+            return _store(key, compute, timeout, version), version
+        # Значение считает другой исполнитель: ждём его, а если он
+        # не успел, считаем сами, чтобы не держать запрос.
+        entry = _wait(key, version)
+        if entry is None:
+            return compute(), version
+        return entry[0], entry[1]
+    value, entry_version, expires, delta = entry
+    if entry_version != version:
+        if _acquire(key):
+            return _store(key, compute, timeout, version), version
+        return value, entry_version
+    if _expired(expires, delta, beta) and _acquire(key):
+        if not settings.CACHE_REFRESH_WORKERS:
+            fresh = _store(key, compute, timeout, version)
+            return (value if fresh is None else fresh), version
+        _pool().submit(_refresh, key, compute, timeout, version)
+    return value, version
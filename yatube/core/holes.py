@@ -0,0 +1,80 @@
+"""
+Пользовательские фрагменты в общих страницах.
+
+Страница, закэшированная для всех, не содержит данных пользователя:
+на месте шапки, кнопок подписки и форм стоят метки, которые на каждый
+запрос заменяются фрагментами текущего пользователя. Поэтому одна
+копия страницы в кэше годится и гостям, и авторизованным.
+
+Фрагмент регистрируется под именем: функция по запросу и аргументам
+метки возвращает контекст его шаблона. Метку из текста поста подделать
+нельзя: экранирование превращает < в &lt;.
+"""
+import re
+from urllib.parse import parse_qsl, urlencode
+
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+
+PREFIX = '<!--hole:'
+_MARKER = re.compile(r'<!--hole:(\w+)\?([^>]*)-->')
+
+_holes = {}
+
+
+def register(name, template):
+    """Регистрирует функцию контекста фрагмента с шаблоном template."""
+    def decorator(function):
+        _holes[name] = template, function
+        return function
+    return decorator
+
+
+def punching(request):
+    """Рендерится ли сейчас общая страница, в которой фрагменты — метки."""
+    return getattr(request, 'punch_holes', False)
+
+
+def marker(name, **kwargs):
+    return mark_safe(f'{PREFIX}{name}?{urlencode(kwargs)}-->')
+
+
+def place(context, name, **kwargs):
+    """
+    Фрагмент текущего пользователя: в общей странице для кэша — метка,
+    которую заполнит fill, иначе сразу сам фрагмент.
+    """
+    if punching(context.request):
+        return marker(name, **kwargs)
+    return render(context, name, **kwargs)
+
+
+def render(context, name, **kwargs):
+    """Фрагмент внутри рендеринга страницы, с её контекстом."""
+    template, function = _holes[name]
+    with context.push(function(context.request, **kwargs)):
+        return context.template.engine.get_template(template).render(context)
+
+
+def fill(request, response):
+    """Заменяет метки в готовой странице фрагментами пользователя."""
+    if PREFIX.encode() not in response.content:
+        return response
+
+    def replace(match):
+        template, function = _holes[match[1]]
+        return render_to_string(
+            template, function(request, **dict(parse_qsl(match[2]))),
+            request,
+        )
+
+    response.content = _MARKER.sub(
+        replace, response.content.decode(response.charset)
+    )
+    return response
+
+
+@register('header', 'includes/header.html')
+def header(request):
+    return {}
@@ -0,0 +1,83 @@
+"""
+Прогон запросов через WSGI-приложение без сети.
+
+Модуль не импортирует модели: в дочернем процессе пула spawn Django
+настраивается импортом yatube.wsgi внутри replay().
+"""
+import sys
+import time
+from contextlib import ExitStack
+from io import BytesIO
+
+from django.db import connections
+
+
+HOST = 'localhost'
+
+
+def environ(method, path, cookie='', token='', body=b''):
+    """WSGI-окружение запроса без сокета и тестового клиента."""
+    return {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SERVER_NAME': HOST,
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': HOST,
+        'REMOTE_ADDR': '127.0.0.1',
+        'HTTP_COOKIE': cookie,
+        'HTTP_X_CSRFTOKEN': token,
+        'CONTENT_TYPE': 'application/x-www-form-urlencoded',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+
+
+def replay(plan):
+    """
+    Прогоняет запросы через yatube.wsgi.application в текущем потоке
+    или процессе. Возвращает (сценарий, код, секунды, SQL-запросы).
+    """
+    from yatube.wsgi import application
+
+    queries = 0
+
+    def count(execute, sql, params, many, context):
+        nonlocal queries
+        queries += 1
+        return execute(sql, params, many, context)
+
+    samples = []
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(count))
+            for scenario, method, path, cookie, token, body in plan:
+                status = []
+                queries = 0
+                start = time.perf_counter()
+                response = application(
+                    environ(method, path, cookie, token, body),
+                    lambda line, headers, exc_info=None: status.append(line),
+                )
+                try:
+                    for _ in response:
+                        pass
+                finally:
+                    response.close()
+                samples.append((scenario, int(status[0].split()[0]),
+                                time.perf_counter() - start, queries))
+    finally:
+        connections.close_all()
+    return samples
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, round(fraction * (len(ordered) - 1)))]
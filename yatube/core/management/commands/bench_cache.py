@@ -0,0 +1,122 @@
+import multiprocessing
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+
+BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'filebased': 'django.core.cache.backends.filebased.FileBasedCache',
+    'sqlite': 'core.cache.SQLiteCache',
+}
+PAGE = '<article><p>Текст поста</p></article>\n' * 1500
+
+
+def make_cache(name, directory):
+    location = {
+        'locmem': name,
+        'filebased': os.path.join(directory, 'filebased'),
+        'sqlite': os.path.join(directory, 'cache.sqlite3'),
+    }[name]
+    return import_string(BACKENDS[name])(
+        location, {'OPTIONS': {'MAX_ENTRIES': 100000}}
+    )
+
+
+def worker(name, directory, keys, rounds, results):
+    # Каждый процесс — отдельный воркер со своей копией кэша в памяти.
+    cache = make_cache(name, directory)
+    hits = 0
+    for _ in range(rounds):
+        for key in keys:
+            if cache.get(key) is None:
+                cache.set(key, PAGE)
+            else:
+                hits += 1
+    results.put(hits)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает LocMemCache, FileBasedCache и SQLiteCache: '
+        'задержки операций и долю попаданий при нескольких воркерах.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--operations', type=int, default=2000)
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--keys', type=int, default=50)
+        parser.add_argument('--rounds', type=int, default=5)
+
+    def handle(self, *args, **options):
+        for name in BACKENDS:
+            directory = tempfile.mkdtemp()
+            try:
+                self.bench_operations(name, directory, options)
+                self.bench_workers(name, directory, options)
+            finally:
+                shutil.rmtree(directory, ignore_errors=True)
+
+    def timed(self, operation, count):
+        timings = []
+        for number in range(count):
+            start = time.perf_counter()
+            operation(number)
+            timings.append((time.perf_counter() - start) * 1e6)
+        return statistics.median(timings)
+
+    def bench_operations(self, name, directory, options):
+        cache = make_cache(name, directory)
+        count = options['operations']
+        cache.set('counter', 0)
+        cache.set_many({f'small-{number}': number for number in range(10)})
+        results = {
+            'set': self.timed(
+                lambda number: cache.set(f'key-{number}', number), count
+            ),
+            'get': self.timed(
+                lambda number: cache.get(f'key-{number}'), count
+            ),
+            'get_many(10)': self.timed(
+                lambda number: cache.get_many(
+                    [f'small-{key}' for key in range(10)]
+                ), count
+            ),
+            'incr': self.timed(lambda number: cache.incr('counter'), count),
+            'set page': self.timed(
+                lambda number: cache.set(f'page-{number % 50}', PAGE), count
+            ),
+            'get page': self.timed(
+                lambda number: cache.get(f'page-{number % 50}'), count
+            ),
+        }
+        self.stdout.write(f'{name}: ' + ', '.join(
+            f'{operation} {median:.1f} us'
+            for operation, median in results.items()
+        ))
+
+    def bench_workers(self, name, directory, options):
+        results = multiprocessing.Queue()
+        keys = [f'shared-{number}' for number in range(options['keys'])]
+        processes = [
+            multiprocessing.Process(
+                target=worker,
+                args=(name, directory, keys, options['rounds'], results),
+            )
+            for _ in range(options['workers'])
+        ]
+        for process in processes:
+            process.start()
+        hits = sum(results.get() for _ in processes)
+        for process in processes:
+            process.join()
+        requests = len(keys) * options['rounds'] * options['workers']
+        self.stdout.write(
+            f'{name}: воркеров {options["workers"]}, '
+            f'попаданий {hits / requests:.0%}'
+        )
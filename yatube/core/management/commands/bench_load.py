@@ -0,0 +1,273 @@
+import json
+import multiprocessing
+import random
+import subprocess
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth import (
+    BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model,
+)
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.middleware import csrf
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+
+from core.loadtest import percentile, replay
+from posts.models import Comment, Follow, Group, Post
+
+
+User = get_user_model()
+
+DEFAULT_MIX = (
+    'index=30,group=15,profile=15,post_detail=25,'
+    'follow_index=10,create_post=2,add_comment=3'
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный прогон сайта внутри процесса: смесь запросов '
+        'к yatube.wsgi.application из пула потоков или процессов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--warmup', type=int, default=100)
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--pool', choices=('thread', 'process'),
+                            default='thread')
+        parser.add_argument('--mix', default=DEFAULT_MIX,
+                            help='Веса сценариев: имя=вес через запятую.')
+        parser.add_argument('--sessions', type=int, default=20,
+                            help='Сколько пользователей входит на сайт.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Сохранить результат в JSON.')
+        parser.add_argument('--compare',
+                            help='JSON прошлого прогона для сравнения.')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        mix = self.parse_mix(options['mix'])
+        self.prepare(options['sessions'])
+        try:
+            plan = [self.build(self.rng.choices(*zip(*mix.items()))[0])
+                    for _ in range(options['warmup'] + options['requests'])]
+            warmup, plan = plan[:options['warmup']], plan[options['warmup']:]
+            workers = options['concurrency']
+            executor = (
+                ThreadPoolExecutor(workers)
+                if options['pool'] == 'thread' else
+                ProcessPoolExecutor(
+                    workers, mp_context=multiprocessing.get_context('spawn')
+                )
+            )
+            with executor:
+                list(executor.map(replay, [warmup[i::workers]
+                                           for i in range(workers)]))
+                start = time.perf_counter()
+                chunks = list(executor.map(replay, [plan[i::workers]
+                                                    for i in range(workers)]))
+                elapsed = time.perf_counter() - start
+        finally:
+            for session in self.sessions:
+                SessionStore(session_key=session).delete()
+        samples = [sample for chunk in chunks for sample in chunk]
+        result = self.summarize(samples, elapsed, options)
+        self.report(result)
+        if options['compare']:
+            with open(options['compare']) as file:
+                self.compare(json.load(file), result)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(result, file, ensure_ascii=False, indent=2)
+            self.stdout.write(f'Результат сохранён в {options["output"]}')
+
+    def parse_mix(self, text):
+        mix = {}
+        for item in text.split(','):
+            name, _, weight = item.partition('=')
+            if not hasattr(self, f'scenario_{name}'):
+                raise CommandError(f'Неизвестный сценарий: {name}')
+            mix[name] = float(weight or 1)
+        return mix
+
+    def sample_ids(self, model, count):
+        """Случайные существующие id без ORDER BY RANDOM() по таблице."""
+        bounds = model.objects.aggregate(low=Min('pk'), high=Max('pk'))
+        if bounds['low'] is None:
+            raise CommandError(
+                f'Таблица {model._meta.db_table} пуста: заполните базу '
+                'командой seed_social_graph.'
+            )
+        candidates = {self.rng.randint(bounds['low'], bounds['high'])
+                      for _ in range(count * 2)}
+        return list(model.objects.filter(pk__in=candidates)
+                    .order_by('pk').values_list('pk', flat=True)[:count])
+
+    def prepare(self, sessions):
+        self.post_ids = self.sample_ids(Post, 500)
+        self.usernames = list(User.objects
+                              .filter(pk__in=self.sample_ids(User, 500))
+                              .values_list('username', flat=True))
+        self.group_slugs = list(Group.objects.values_list('slug', flat=True)
+                                .order_by('pk')[:500])
+        self.sessions = []
+        self.cookies = []
+        # Вход как у Client.force_login: сессия пишется в базу напрямую.
+        for user in User.objects.filter(
+                pk__in=self.sample_ids(User, sessions)):
+            session = SessionStore()
+            session[SESSION_KEY] = user._meta.pk.value_to_string(user)
+            session[BACKEND_SESSION_KEY] = (
+                'django.contrib.auth.backends.ModelBackend'
+            )
+            session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+            session.save()
+            token = get_random_string(csrf.CSRF_TOKEN_LENGTH,
+                                      allowed_chars=csrf.CSRF_ALLOWED_CHARS)
+            self.sessions.append(session.session_key)
+            self.cookies.append((
+                f'{settings.SESSION_COOKIE_NAME}={session.session_key}; '
+                f'{settings.CSRF_COOKIE_NAME}={token}',
+                token,
+            ))
+
+    def build(self, scenario):
+        return (scenario,) + getattr(self, f'scenario_{scenario}')()
+
+    def get(self, path, logged_in=False):
+        cookie, token = (self.rng.choice(self.cookies)
+                         if logged_in else ('', ''))
+        return 'GET', path, cookie, token, b''
+
+    def post(self, path, data):
+        cookie, token = self.rng.choice(self.cookies)
+        return 'POST', path, cookie, token, urlencode(data).encode()
+
+    def scenario_index(self):
+        return self.get(reverse('posts:index'))
+
+    def scenario_group(self):
+        if not self.group_slugs:
+            return self.scenario_index()
+        return self.get(reverse('posts:group_list', kwargs={
+            'slug': self.rng.choice(self.group_slugs)}))
+
+    def scenario_profile(self):
+        return self.get(reverse('posts:profile', kwargs={
+            'username': self.rng.choice(self.usernames)}))
+
+    def scenario_post_detail(self):
+        return self.get(reverse('posts:post_detail', kwargs={
+            'post_id': self.rng.choice(self.post_ids)}))
+
+    def scenario_follow_index(self):
+        return self.get(reverse('posts:follow_index'), logged_in=True)
+
+    def scenario_create_post(self):
+        return self.post(reverse('posts:create_post'),
+                         {'text': f'Нагрузочный пост {self.rng.random()}'})
+
+    def scenario_add_comment(self):
+        return self.post(
+            reverse('posts:add_comment', kwargs={
+                'post_id': self.rng.choice(self.post_ids)}),
+            {'text': f'Нагрузочный комментарий {self.rng.random()}'},
+        )
+
+    def summarize(self, samples, elapsed, options):
+        views = {}
+        by_scenario = {}
+        for scenario, status, seconds, queries in samples:
+            by_scenario.setdefault(scenario, []).append(
+                (status, seconds, queries)
+            )
+        for scenario, rows in sorted(by_scenario.items()):
+            latencies = sorted(seconds * 1000 for _, seconds, _ in rows)
+            statuses = Counter(str(status) for status, _, _ in rows)
+            views[scenario] = {
+                'requests': len(rows),
+                'errors': sum(count for status, count in statuses.items()
+                              if int(status) >= 400),
+                'statuses': dict(statuses),
+                'rps': len(rows) / elapsed,
+                'mean_ms': sum(latencies) / len(latencies),
+                'p50_ms': percentile(latencies, 0.5),
+                'p95_ms': percentile(latencies, 0.95),
+                'p99_ms': percentile(latencies, 0.99),
+                'queries': sum(queries for _, _, queries in rows) / len(rows),
+            }
+        latencies = sorted(seconds * 1000 for _, _, seconds, _ in samples)
+        return {
+            'commit': self.commit(),
+            'created': timezone.now().isoformat(),
+            'options': {name: options[name] for name in (
+                'requests', 'warmup', 'concurrency', 'pool', 'mix', 'seed',
+            )},
+            'scale': self.scale(),
+            'total': {
+                'requests': len(samples),
+                'seconds': elapsed,
+                'rps': len(samples) / elapsed,
+                'p50_ms': percentile(latencies, 0.5),
+                'p95_ms': percentile(latencies, 0.95),
+                'p99_ms': percentile(latencies, 0.99),
+            },
+            'views': views,
+        }
+
+    def commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                cwd=settings.BASE_DIR, capture_output=True, text=True,
+            ).stdout.strip() or None
+        except OSError:
+            return None
+
+    def scale(self):
+        return {model._meta.model_name: model.objects.count()
+                for model in (User, Group, Post, Comment, Follow)}
+
+    def report(self, result):
+        total = result['total']
+        self.stdout.write(
+            f'{result["scale"]}\n'
+            f'Всего {total["requests"]} запросов за {total["seconds"]:.1f} с: '
+            f'{total["rps"]:.1f} rps, p50 {total["p50_ms"]:.1f} мс, '
+            f'p95 {total["p95_ms"]:.1f} мс, p99 {total["p99_ms"]:.1f} мс'
+        )
+        self.stdout.write(
+            f'{"сценарий":>13} {"n":>6} {"ошибок":>6} {"rps":>7} '
+            f'{"p50":>7} {"p95":>7} {"p99":>7} {"SQL":>5}'
+        )
+        for name, view in result['views'].items():
+            self.stdout.write(
+                f'{name:>13} {view["requests"]:6} {view["errors"]:6} '
+                f'{view["rps"]:7.1f} {view["p50_ms"]:7.1f} '
+                f'{view["p95_ms"]:7.1f} {view["p99_ms"]:7.1f} '
+                f'{view["queries"]:5.1f}'
+            )
+
+    def compare(self, before, after):
+        self.stdout.write(
+            f'Сравнение с {before.get("commit")} ({before.get("created")}):'
+        )
+        for name, view in after['views'].items():
+            old = before['views'].get(name)
+            if old is None:
+                continue
+            self.stdout.write(
+                f'{name:>13} rps {old["rps"]:.1f} -> {view["rps"]:.1f} '
+                f'({view["rps"] / old["rps"] - 1:+.0%}), '
+                f'p95 {old["p95_ms"]:.1f} -> {view["p95_ms"]:.1f} мс '
+                f'({view["p95_ms"] / old["p95_ms"] - 1:+.0%}), '
+                f'SQL {old["queries"]:.1f} -> {view["queries"]:.1f}'
+            )
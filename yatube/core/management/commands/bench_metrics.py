@@ -0,0 +1,65 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.utils import override_settings
+
+from core import metrics
+
+
+MIDDLEWARE = 'core.middleware.MetricsMiddleware'
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет накладные расходы MetricsMiddleware: '
+        'задержку запросов с метриками и без них.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--rounds', type=int, default=5)
+        parser.add_argument('paths', nargs='*',
+                            default=['/', '/about/author/', '/missing/'])
+
+    def handle(self, *args, **options):
+        self.bench_observe()
+        without = [name for name in settings.MIDDLEWARE if name != MIDDLEWARE]
+        for path in options['paths']:
+            results = {}
+            # Попеременные раунды сглаживают прогрев кэшей и шум.
+            for _ in range(options['rounds']):
+                for label, middleware in (('off', without),
+                                          ('on', [MIDDLEWARE] + without)):
+                    results.setdefault(label, []).append(
+                        self.measure(path, middleware, options['requests'])
+                    )
+            off = statistics.median(results['off'])
+            on = statistics.median(results['on'])
+            self.stdout.write(
+                f'{path}: без метрик {off:.1f} us, с метриками {on:.1f} us, '
+                f'накладные {on - off:+.1f} us ({(on - off) / off:+.1%})'
+            )
+
+    def measure(self, path, middleware, count):
+        with override_settings(MIDDLEWARE=middleware,
+                               ALLOWED_HOSTS=['testserver']):
+            client = Client()
+            client.get(path)
+            start = time.perf_counter()
+            for _ in range(count):
+                client.get(path)
+            return (time.perf_counter() - start) / count * 1e6
+
+    def bench_observe(self):
+        registry = metrics.Registry()
+        count = 100000
+        start = time.perf_counter()
+        for number in range(count):
+            registry.observe(
+                'yatube_request_duration_seconds', ('bench',), number / count
+            )
+        elapsed = (time.perf_counter() - start) / count * 1e9
+        self.stdout.write(f'Registry.observe: {elapsed:.0f} ns')
@@ -0,0 +1,163 @@
+import random
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+from django.db import transaction
+
+from core.loadtest import percentile
+
+
+ALIAS = 'bench_sqlite'
+SCHEMA = (
+    'CREATE TABLE bench_post (id INTEGER PRIMARY KEY, text TEXT,'
+    ' comments INTEGER NOT NULL DEFAULT 0)',
+    'CREATE TABLE bench_comment (id INTEGER PRIMARY KEY,'
+    ' post_id INTEGER NOT NULL, text TEXT, created REAL)',
+    'CREATE INDEX bench_comment_post ON bench_comment (post_id)',
+)
+
+
+def profiles():
+    """Настройки соединения «до» (sqlite3 по умолчанию) и «после»."""
+    production = settings.DATABASES[DEFAULT_DB_ALIAS]
+    return {
+        'default': {'ENGINE': 'django.db.backends.sqlite3'},
+        'production': {
+            'ENGINE': production['ENGINE'],
+            'CONN_MAX_AGE': production.get('CONN_MAX_AGE', 0),
+            'OPTIONS': production.get('OPTIONS', {}),
+        },
+    }
+
+
+def read(cursor, rng, posts):
+    cursor.execute(
+        'SELECT id, text, comments FROM bench_post ORDER BY id DESC LIMIT 10'
+    )
+    cursor.fetchall()
+    cursor.execute(
+        'SELECT COUNT(*) FROM bench_comment WHERE post_id = %s',
+        [rng.randint(1, posts)],
+    )
+    cursor.fetchone()
+
+
+def write(cursor, rng, posts):
+    # Как add_comment: прочитать пост, добавить комментарий, счётчик.
+    with transaction.atomic(using=ALIAS):
+        post = rng.randint(1, posts)
+        cursor.execute('SELECT id FROM bench_post WHERE id = %s', [post])
+        cursor.fetchone()
+        cursor.execute(
+            'INSERT INTO bench_comment (post_id, text, created) '
+            'VALUES (%s, %s, %s)', [post, 'Комментарий', time.time()],
+        )
+        cursor.execute(
+            'UPDATE bench_post SET comments = comments + 1 WHERE id = %s',
+            [post],
+        )
+
+
+def worker(seed, operations, writes, posts):
+    """
+    Смесь операций в своём потоке. Каждая заканчивается как запрос:
+    соединение закрывается, если CONN_MAX_AGE не разрешает его держать.
+    """
+    rng = random.Random(seed)
+    connection = connections[ALIAS]
+    samples = []
+    try:
+        for _ in range(operations):
+            kind = 'write' if rng.random() < writes else 'read'
+            start = time.perf_counter()
+            try:
+                with connection.cursor() as cursor:
+                    (write if kind == 'write' else read)(cursor, rng, posts)
+                ok = True
+            except OperationalError:
+                ok = False
+            samples.append((kind, ok, time.perf_counter() - start))
+            connection.close_if_unusable_or_obsolete()
+    finally:
+        connection.close()
+    return samples
+
+
+class Command(BaseCommand):
+    help = (
+        'Конкурентная смесь чтений и пишущих транзакций к SQLite '
+        'с настройками sqlite3 по умолчанию и из settings.DATABASES.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--operations', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--writes', type=float, default=0.2,
+                            help='Доля пишущих транзакций.')
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"профиль":>10} {"оп/с":>8} {"ошибок":>7} '
+            f'{"чт p50":>7} {"чт p95":>7} {"зап p50":>7} {"зап p95":>7}'
+        )
+        for name, profile in profiles().items():
+            directory = tempfile.mkdtemp()
+            connections.databases[ALIAS] = dict(
+                profile, NAME=f'{directory}/bench.sqlite3'
+            )
+            connections.ensure_defaults(ALIAS)
+            try:
+                self.seed(options['posts'])
+                self.report(name, *self.run(options))
+            finally:
+                connections[ALIAS].close()
+                del connections[ALIAS]
+                del connections.databases[ALIAS]
+                shutil.rmtree(directory, ignore_errors=True)
+
+    def seed(self, posts):
+        with transaction.atomic(using=ALIAS):
+            with connections[ALIAS].cursor() as cursor:
+                for statement in SCHEMA:
+                    cursor.execute(statement)
+                cursor.executemany(
+                    'INSERT INTO bench_post (text) VALUES (%s)',
+                    [(f'Пост {number}',) for number in range(posts)],
+                )
+
+    def run(self, options):
+        workers = options['concurrency']
+        share = options['operations'] // workers
+        with ThreadPoolExecutor(workers) as executor:
+            start = time.perf_counter()
+            chunks = list(executor.map(
+                worker,
+                [options['seed'] + number for number in range(workers)],
+                [share] * workers,
+                [options['writes']] * workers,
+                [options['posts']] * workers,
+            ))
+            elapsed = time.perf_counter() - start
+        return [sample for chunk in chunks for sample in chunk], elapsed
+
+    def report(self, name, samples, elapsed):
+        latencies = {}
+        for kind, ok, seconds in samples:
+            if ok:
+                latencies.setdefault(kind, []).append(seconds * 1000)
+        columns = []
+        for kind in ('read', 'write'):
+            ordered = sorted(latencies.get(kind, [0]))
+            columns += [percentile(ordered, 0.5), percentile(ordered, 0.95)]
+        errors = sum(not ok for _, ok, _ in samples)
+        self.stdout.write(
+            f'{name:>10} {len(samples) / elapsed:8.0f} {errors:7} '
+            + ' '.join(f'{value:7.2f}' for value in columns)
+        )
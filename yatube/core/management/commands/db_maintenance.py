@@ -0,0 +1,96 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+# SQLite ≥ 3.32: ANALYZE читает не больше стольких строк индекса.
+ANALYSIS_LIMIT = 1000
+INCREMENTAL = 2
+
+
+class Command(BaseCommand):
+    help = (
+        'Обслуживание базы SQLite без остановки сайта: проверка '
+        'целостности, ANALYZE, incremental vacuum и checkpoint WAL. '
+        'Запускается по расписанию, например из cron раз в сутки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            '--full-check', action='store_true',
+            help='integrity_check вместо быстрого quick_check.',
+        )
+        parser.add_argument(
+            '--vacuum-pages', type=int, default=0,
+            help='Сколько свободных страниц вернуть, 0 — все.',
+        )
+        parser.add_argument(
+            '--convert', action='store_true',
+            help='Включить auto_vacuum=INCREMENTAL полным VACUUM '
+                 '(блокирует запись на время переписывания файла).',
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError('Команда обслуживает только SQLite.')
+        with connection.cursor() as cursor:
+            self.check_integrity(cursor, options['full_check'])
+            self.analyze(cursor)
+            self.vacuum(cursor, options['vacuum_pages'], options['convert'])
+            self.checkpoint(cursor)
+
+    def pragma(self, cursor, sql):
+        # Прагма с результатом делает шаг на строку: читаем всё.
+        cursor.execute(f'PRAGMA {sql}')
+        return cursor.fetchall()
+
+    def check_integrity(self, cursor, full):
+        name = 'integrity_check' if full else 'quick_check'
+        problems = [row[0] for row in self.pragma(cursor, name)]
+        if problems != ['ok']:
+            raise CommandError(
+                f'{name} нашёл повреждения:\n' + '\n'.join(problems)
+            )
+        self.stdout.write(f'{name}: ok')
+
+    def analyze(self, cursor):
+        self.pragma(cursor, f'analysis_limit={ANALYSIS_LIMIT}')
+        cursor.execute('ANALYZE')
+        self.stdout.write('ANALYZE: статистика планировщика обновлена')
+
+    def vacuum(self, cursor, pages, convert):
+        (mode,), = self.pragma(cursor, 'auto_vacuum')
+        (free,), = self.pragma(cursor, 'freelist_count')
+        if mode != INCREMENTAL:
+            if not convert:
+                self.stdout.write(self.style.WARNING(
+                    f'vacuum: свободных страниц {free}, но auto_vacuum '
+                    'не INCREMENTAL — запустите с --convert'
+                ))
+                return
+            self.pragma(cursor, 'auto_vacuum=INCREMENTAL')
+            cursor.execute('VACUUM')
+            self.stdout.write(
+                f'VACUUM: auto_vacuum=INCREMENTAL, освобождено {free} стр.'
+            )
+            return
+        self.pragma(cursor, f'incremental_vacuum({pages})'
+                    if pages else 'incremental_vacuum')
+        (left,), = self.pragma(cursor, 'freelist_count')
+        self.stdout.write(
+            f'incremental_vacuum: освобождено {free - left} стр., '
+            f'осталось {left}'
+        )
+
+    def checkpoint(self, cursor):
+        (busy, log, done), = self.pragma(cursor, 'wal_checkpoint(TRUNCATE)')
+        if log < 0:
+            self.stdout.write('wal_checkpoint: база не в режиме WAL')
+        elif busy:
+            self.stdout.write(self.style.WARNING(
+                f'wal_checkpoint: перенесено {done} из {log} стр., '
+                'журнал занят читателями'
+            ))
+        else:
+            self.stdout.write(f'wal_checkpoint: перенесено {done} стр.')
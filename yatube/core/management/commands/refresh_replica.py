@@ -0,0 +1,59 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core import replicas
+
+
+class Command(BaseCommand):
+    help = (
+        'Обновляет локальные реплики SQLite копией основной базы и '
+        'отмечает время копии для роутера, см. core.replicas. '
+        'С --interval повторяет копирование, пока не остановят.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Секунд между обновлениями; 0 — обновить один раз.',
+        )
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS].settings_dict['NAME']
+        aliases = settings.DATABASE_REPLICAS
+        for alias in aliases:
+            if connections[alias].vendor != 'sqlite':
+                raise CommandError(f'{alias}: копировать можно только SQLite.')
+            if connections[alias].settings_dict['NAME'] == primary:
+                raise CommandError(f'{alias}: это та же база, что default.')
+        while True:
+            for alias in aliases:
+                self.refresh(primary, alias)
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
+
+    def refresh(self, primary, alias):
+        # Копия за один шаг читает один снимок основной базы и в WAL
+        # не мешает писателям; снимок не старше момента начала.
+        as_of = time.time()
+        source = sqlite3.connect(primary)
+        target = sqlite3.connect(
+            connections[alias].settings_dict['NAME'],
+            timeout=connections[alias].settings_dict['OPTIONS'].get(
+                'timeout', 5
+            ),
+        )
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+        replicas.mark_synced(alias, as_of)
+        self.stdout.write(
+            f'{alias}: копия на {time.strftime("%H:%M:%S")} '
+            f'за {time.time() - as_of:.2f} с'
+        )
@@ -0,0 +1,72 @@
+from django.core.management.base import BaseCommand
+
+from core.models import QueryFingerprint, SlowQuery
+
+
+ORDERS = {
+    'total': '-total_time',
+    'max': '-max_time',
+    'calls': '-calls',
+    'slow': '-slow_calls',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает формы SQL-запросов по затраченному времени '
+        'и последние медленные запросы с планами.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--order', choices=ORDERS, default='total')
+        parser.add_argument(
+            '--view', help='Только медленные запросы этого представления.'
+        )
+        parser.add_argument(
+            '--slow', action='store_true',
+            help='Вывести медленные запросы с планом и стеком.',
+        )
+        parser.add_argument(
+            '--clear', action='store_true', help='Очистить журнал.'
+        )
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            QueryFingerprint.objects.all().delete()
+            self.stdout.write('Журнал запросов очищен.')
+            return
+        if options['slow'] or options['view']:
+            self.show_slow(options['view'], options['limit'])
+        else:
+            self.show_fingerprints(ORDERS[options['order']], options['limit'])
+
+    def show_fingerprints(self, order, limit):
+        self.stdout.write(
+            f'{"отпечаток":16} {"вызовов":>9} {"всего, с":>10} '
+            f'{"среднее, мс":>11} {"макс, мс":>9} {"медл.":>6}  запрос'
+        )
+        for row in QueryFingerprint.objects.order_by(order)[:limit]:
+            self.stdout.write(
+                f'{row.digest:16} {row.calls:9} {row.total_time:10.3f} '
+                f'{row.mean_time * 1000:11.2f} {row.max_time * 1000:9.2f} '
+                f'{row.slow_calls:6}  {row.sql}'
+            )
+
+    def show_slow(self, view, limit):
+        queries = SlowQuery.objects.all()
+        if view:
+            queries = queries.filter(view=view)
+        for query in queries[:limit]:
+            self.stdout.write(
+                f'\n{query.created:%Y-%m-%d %H:%M:%S} '
+                f'{query.duration * 1000:.1f} мс {query.view} {query.path}'
+            )
+            self.stdout.write(query.sql)
+            self.stdout.write(f'Параметры: {query.params}')
+            if query.plan:
+                self.stdout.write('План:')
+                self.stdout.write(query.plan)
+            if query.stack:
+                self.stdout.write('Стек:')
+                self.stdout.write(query.stack.rstrip())
@@ -0,0 +1,298 @@
+"""
+Метрики запросов в памяти процесса с выгрузкой для Prometheus.
+
+Каждый процесс копит гистограммы и счётчики у себя под блокировкой
+и раз в METRICS_FLUSH_INTERVAL секунд сбрасывает снимок в файл
+METRICS_DIR/<pid>.json. Эндпоинт /metrics складывает снимки всех
+процессов, поэтому видит сумму по воркерам. Снимок завершившегося
+процесса прибавляется к общему снимку METRICS_DIR/dead.json и
+удаляется: счётчики не убывают, когда воркер перезапускается.
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: снимки сводятся без блокировки файла.
+    fcntl = None
+
+from django.conf import settings
+
+
+DURATION_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+HISTOGRAMS = {
+    'yatube_request_duration_seconds': (
+        'Полное время обработки запроса.', DURATION_BUCKETS),
+    'yatube_request_db_queries': (
+        'Число SQL-запросов за запрос.', COUNT_BUCKETS),
+    'yatube_request_db_duration_seconds': (
+        'Время SQL-запросов за запрос.', DURATION_BUCKETS),
+    'yatube_request_template_duration_seconds': (
+        'Время рендеринга шаблонов за запрос.', DURATION_BUCKETS),
+    'yatube_response_size_bytes': (
+        'Размер тела ответа.', SIZE_BUCKETS),
+}
+HISTOGRAM_LABELS = ('view',)
+DEAD_SNAPSHOT = 'dead.json'
+LOCK_FILE = 'metrics.lock'
+COUNTERS = {
+    'yatube_requests_total': (
+        'Запросы по представлению и коду ответа.', ('view', 'status')),
+    'yatube_cache_requests_total': (
+        'Обращения к кэшу: попадания и промахи.', ('view', 'result')),
+    'yatube_fragment_cache_total': (
+        'Фрагменты страниц из кэша и отрисованные заново.',
+        ('fragment', 'result')),
+    'yatube_replica_reads_total': (
+        'Выбор базы для чтений: свежая реплика или основная база '
+        'из-за отставания реплик.', ('database', 'reason')),
+}
+
+
+class Registry:
+    """Гистограммы и счётчики одного процесса, безопасные для потоков."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._flushed = 0.0
+
+    def observe(self, name, labels, value):
+        """labels — кортеж значений меток в порядке HISTOGRAM_LABELS."""
+        buckets = HISTOGRAMS[name][1]
+        key = (name, labels)
+        with self._lock:
+            state = self._histograms.get(key)
+            if state is None:
+                # Счётчики корзин, последняя — +Inf; затем сумма и число.
+                state = self._histograms[key] = [0] * (len(buckets) + 3)
+            state[bisect_left(buckets, value)] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def inc(self, name, labels, value=1):
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'histograms': [[name, list(labels), list(state)] for
+                               (name, labels), state in
+                               self._histograms.items()],
+                'counters': [[name, list(labels), value] for
+                             (name, labels), value in
+                             self._counters.items()],
+            }
+
+    def flush(self, force=False):
+        """Сбрасывает снимок в файл процесса не чаще интервала."""
+        now = time.monotonic()
+        if not force and now - self._flushed < settings.METRICS_FLUSH_INTERVAL:
+            return
+        self._flushed = now
+        directory = settings.METRICS_DIR
+        os.makedirs(directory, exist_ok=True)
+        _write(os.path.join(directory, f'{os.getpid()}.json'),
+               self.snapshot())
+
+
+def _write(path, snapshot):
+    temporary = f'{path}.{threading.get_ident()}.tmp'
+    with open(temporary, 'w') as file:
+        json.dump(snapshot, file)
+    os.replace(temporary, path)
+
+
+registry = Registry()
+_local = threading.local()
+
+
+class RequestStats:
+    """Накопитель показателей текущего запроса."""
+    __slots__ = ('queries', 'db_time', 'template_time', 'hits', 'misses')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.hits = 0
+        self.misses = 0
+
+
+def current():
+    """Накопитель запроса, который обрабатывает этот поток, или None."""
+    return getattr(_local, 'stats', None)
+
+
+def start():
+    _local.stats = RequestStats()
+    return _local.stats
+
+
+def finish():
+    _local.stats = None
+
+
+def record_cache(hits, misses):
+    stats = current()
+    if stats is not None:
+        stats.hits += hits
+        stats.misses += misses
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Процесс есть, но принадлежит другому пользователю.
+        pass
+    return True
+
+
+@contextmanager
+def _locked(directory, exclusive):
+    """Блокировка каталога снимков между процессами."""
+    if fcntl is None:
+        yield
+        return
+    with open(os.path.join(directory, LOCK_FILE), 'a') as file:
+        fcntl.flock(file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(file, fcntl.LOCK_UN)
+
+
+def _read(path):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def _dead_pids(directory):
+    names = []
+    for name in os.listdir(directory):
+        pid = name[:-len('.json')]
+        if name.endswith('.json') and pid.isdigit() and not _alive(int(pid)):
+            names.append(name)
+    return names
+
+
+def _retire(directory, names):
+    """Снимки завершившихся процессов переносятся в общий dead.json."""
+    with _locked(directory, exclusive=True):
+        path = os.path.join(directory, DEAD_SNAPSHOT)
+        snapshots = [_read(path)]
+        paths = [os.path.join(directory, name) for name in names]
+        snapshots += [_read(path) for path in paths]
+        _write(path, _snapshot(*_combine(
+            snapshot for snapshot in snapshots if snapshot is not None
+        )))
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _snapshots():
+    """Снимки других процессов вместе с dead.json."""
+    directory = settings.METRICS_DIR
+    if not os.path.isdir(directory):
+        return []
+    dead = _dead_pids(directory)
+    if dead:
+        _retire(directory, dead)
+    own = f'{os.getpid()}.json'
+    snapshots = []
+    with _locked(directory, exclusive=False):
+        for name in os.listdir(directory):
+            if not name.endswith('.json') or name == own:
+                continue
+            snapshot = _read(os.path.join(directory, name))
+            if snapshot is not None:
+                snapshots.append(snapshot)
+    return snapshots
+
+
+def _combine(snapshots):
+    histograms = {}
+    counters = {}
+    for snapshot in snapshots:
+        for name, labels, state in snapshot['histograms']:
+            merged = histograms.setdefault(
+                (name, tuple(labels)), [0] * len(state)
+            )
+            for position, value in enumerate(state):
+                merged[position] += value
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(labels))
+            counters[key] = counters.get(key, 0) + value
+    return histograms, counters
+
+
+def _snapshot(histograms, counters):
+    return {
+        'histograms': [[name, list(labels), state]
+                       for (name, labels), state in histograms.items()],
+        'counters': [[name, list(labels), value]
+                     for (name, labels), value in counters.items()],
+    }
+
+
+def _merged():
+    # Свой процесс берём из памяти: снимок на диске может отставать.
+    return _combine(_snapshots() + [registry.snapshot()])
+
+
+def _labels(names, values):
+    return ','.join(
+        '{}="{}"'.format(
+            name, str(value).replace('\\', '\\\\').replace('"', '\\"')
+        )
+        for name, value in zip(names, values)
+    )
+
+
+def render():
+    """Метрики всех процессов в текстовом формате Prometheus."""
+    histograms, counters = _merged()
+    lines = []
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for (metric, labels), state in sorted(histograms.items()):
+            if metric != name:
+                continue
+            names = HISTOGRAM_LABELS + ('le',)
+            cumulative = 0
+            for bound, count in zip(buckets + ('+Inf',), state):
+                cumulative += count
+                bucket = _labels(names, labels + (bound,))
+                lines.append(f'{name}_bucket{{{bucket}}} {cumulative}')
+            own = _labels(HISTOGRAM_LABELS, labels)
+            lines.append(f'{name}_sum{{{own}}} {state[-2]}')
+            lines.append(f'{name}_count{{{own}}} {state[-1]}')
+    for name, (help_text, names) in COUNTERS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} counter')
+        for (metric, labels), value in sorted(counters.items()):
+            if metric == name:
+                lines.append(f'{name}{{{_labels(names, labels)}}} {value}')
+    return '\n'.join(lines) + '\n'
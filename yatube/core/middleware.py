@@ -0,0 +1,120 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics, querylog, replicas
+
+
+UNRESOLVED = '<unresolved>'
+
+
+class MetricsMiddleware:
+    """
+    Время запроса, число и время SQL-запросов, время шаблонов,
+    обращения к кэшу и размер ответа по имени представления.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    @staticmethod
+    def _count_query(execute, sql, params, many, context):
+        stats = metrics.current()
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if stats is not None:
+                stats.queries += 1
+                stats.db_time += time.perf_counter() - start
+
+    def __call__(self, request):
+        stats = metrics.start()
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(self._count_query)
+                    )
+                response = self.get_response(request)
+        finally:
+            metrics.finish()
+        self.record(request, response, stats, time.perf_counter() - start)
+        return response
+
+    def record(self, request, response, stats, duration):
+        match = request.resolver_match
+        view = (match.view_name if match is not None else UNRESOLVED,)
+        registry = metrics.registry
+        registry.observe('yatube_request_duration_seconds', view, duration)
+        registry.observe('yatube_request_db_queries', view, stats.queries)
+        registry.observe(
+            'yatube_request_db_duration_seconds', view, stats.db_time
+        )
+        registry.observe(
+            'yatube_request_template_duration_seconds', view,
+            stats.template_time,
+        )
+        if not response.streaming:
+            registry.observe(
+                'yatube_response_size_bytes', view, len(response.content)
+            )
+        registry.inc(
+            'yatube_requests_total', view + (str(response.status_code),)
+        )
+        if stats.hits:
+            registry.inc('yatube_cache_requests_total', view + ('hit',),
+                         stats.hits)
+        if stats.misses:
+            registry.inc('yatube_cache_requests_total', view + ('miss',),
+                         stats.misses)
+        registry.flush()
+
+
+class QueryLogMiddleware:
+    """Отпечатки SQL-запросов и журнал медленных запросов."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        querylog.start(request)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(querylog.instrument)
+                    )
+                response = self.get_response(request)
+        finally:
+            querylog.finish()
+        querylog.log.flush()
+        return response
+
+
+class ReplicaMiddleware:
+    """
+    Чтения с реплик не старше последней записи пользователя; после
+    запроса с записью её время запоминается в cookie, см. core.replicas.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        replicas.start(request.COOKIES.get(replicas.COOKIE))
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = replicas.finish()
+        if wrote:
+            # Время после ответа: транзакции запроса уже зафиксированы.
+            response.set_cookie(
+                replicas.COOKIE, f'{time.time():.3f}',
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+        return response
@@ -0,0 +1,52 @@
+# Generated by Django 2.2.16 on 2026-10-17 23:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueryFingerprint',
+            fields=[
+                ('digest', models.CharField(max_length=16, primary_key=True, serialize=False, verbose_name='Отпечаток')),
+                ('sql', models.TextField(verbose_name='Форма запроса')),
+                ('calls', models.BigIntegerField(default=0, verbose_name='Вызовов')),
+                ('total_time', models.FloatField(default=0, verbose_name='Суммарное время, с')),
+                ('max_time', models.FloatField(default=0, verbose_name='Наибольшее время, с')),
+                ('slow_calls', models.BigIntegerField(default=0, verbose_name='Медленных вызовов')),
+                ('last_seen', models.DateTimeField(null=True, verbose_name='Последний вызов')),
+            ],
+            options={
+                'verbose_name': 'Форма запроса',
+                'verbose_name_plural': 'Формы запросов',
+                'ordering': ('-total_time',),
+            },
+        ),
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sql', models.TextField(verbose_name='Запрос')),
+                ('params', models.TextField(blank=True, verbose_name='Параметры')),
+                ('duration', models.FloatField(verbose_name='Время, с')),
+                ('view', models.CharField(max_length=200, verbose_name='Представление')),
+                ('path', models.CharField(max_length=255, verbose_name='Адрес')),
+                ('plan', models.TextField(blank=True, verbose_name='План')),
+                ('stack', models.TextField(blank=True, verbose_name='Стек вызова')),
+                ('created', models.DateTimeField(verbose_name='Время')),
+                ('fingerprint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slow_queries', to='core.QueryFingerprint', verbose_name='Форма запроса')),
+            ],
+            options={
+                'verbose_name': 'Медленный запрос',
+                'verbose_name_plural': 'Медленные запросы',
+                'ordering': ('-created', '-pk'),
+            },
+        ),
+    ]
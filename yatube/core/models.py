@@ -9,3 +9,52 @@ class CreatedModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class QueryFingerprint(models.Model):
+    """Статистика по форме SQL-запроса."""
+    digest = models.CharField('Отпечаток', max_length=16, primary_key=True)
+    sql = models.TextField('Форма запроса')
+    calls = models.BigIntegerField('Вызовов', default=0)
+    total_time = models.FloatField('Суммарное время, с', default=0)
+    max_time = models.FloatField('Наибольшее время, с', default=0)
+    slow_calls = models.BigIntegerField('Медленных вызовов', default=0)
+    last_seen = models.DateTimeField('Последний вызов', null=True)
+
+    class Meta:
+        verbose_name = 'Форма запроса'
+        verbose_name_plural = 'Формы запросов'
+        ordering = ('-total_time',)
+
+    def __str__(self):
+        return self.sql[:80]
+
+    @property
+    def mean_time(self):
+        return self.total_time / self.calls if self.calls else 0
+
+
+class SlowQuery(models.Model):
+    """Медленный запрос с планом и местом вызова."""
+    fingerprint = models.ForeignKey(
+        QueryFingerprint,
+        on_delete=models.CASCADE,
+        related_name='slow_queries',
+        verbose_name='Форма запроса',
+    )
+    sql = models.TextField('Запрос')
+    params = models.TextField('Параметры', blank=True)
+    duration = models.FloatField('Время, с')
+    view = models.CharField('Представление', max_length=200)
+    path = models.CharField('Адрес', max_length=255)
+    plan = models.TextField('План', blank=True)
+    stack = models.TextField('Стек вызова', blank=True)
+    created = models.DateTimeField('Время')
+
+    class Meta:
+        verbose_name = 'Медленный запрос'
+        verbose_name_plural = 'Медленные запросы'
+        ordering = ('-created', '-pk')
+
+    def __str__(self):
+        return f'{self.view}: {self.duration:.3f} с'
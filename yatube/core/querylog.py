@@ -0,0 +1,202 @@
+"""
+Журнал медленных SQL-запросов.
+
+Запросы сводятся к отпечаткам: литералы и списки параметров заменяются
+знаками вопроса, поэтому запросы одной формы копят общую статистику.
+Запросы дольше SLOW_QUERY_THRESHOLD сохраняются целиком вместе с планом
+EXPLAIN, представлением и стеком вызова. Статистика копится в памяти
+процесса и не чаще QUERY_LOG_FLUSH_INTERVAL секунд пишется в базу.
+"""
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+import traceback
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+UNRESOLVED = '<unresolved>'
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%s|\?')
+_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_ROWS = re.compile(r'\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+')
+_SPACE = re.compile(r'\s+')
+# Кадры самой обвязки в стеке вызова бесполезны.
+_OWN_FILES = {
+    __file__, os.path.join(os.path.dirname(__file__), 'middleware.py'),
+}
+
+
+def normalize(sql):
+    """Форма запроса без значений: одинакова для всех его вызовов."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _LIST.sub('(...)', sql)
+    sql = _ROWS.sub('(...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def fingerprint(sql):
+    normalized = normalize(sql)
+    digest = hashlib.sha1(normalized.encode()).hexdigest()[:16]
+    return digest, normalized
+
+
+class QueryLog:
+    """Статистика по отпечаткам и медленные запросы одного процесса."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._slow = []
+        self._flushed = 0.0
+
+    def observe(self, sql, duration, slow=None):
+        digest, normalized = fingerprint(sql)
+        with self._lock:
+            stats = self._stats.get(digest)
+            if stats is None:
+                # Форма запроса, число вызовов, суммарное и наибольшее
+                # время, число медленных вызовов.
+                stats = self._stats[digest] = [normalized, 0, 0.0, 0.0, 0]
+            stats[1] += 1
+            stats[2] += duration
+            stats[3] = max(stats[3], duration)
+            if slow is not None:
+                stats[4] += 1
+                slow['fingerprint_id'] = digest
+                self._slow.append(slow)
+
+    def flush(self, force=False):
+        """Сбрасывает накопленное в базу не чаще интервала."""
+        now = time.monotonic()
+        if not force and (
+                now - self._flushed < settings.QUERY_LOG_FLUSH_INTERVAL):
+            return
+        with self._lock:
+            self._flushed = now
+            stats, self._stats = self._stats, {}
+            slow, self._slow = self._slow, []
+        if not stats:
+            return
+        try:
+            _save(stats, slow)
+        except DatabaseError:
+            logger.exception('Не удалось сохранить журнал запросов')
+
+
+def _save(stats, slow):
+    from .models import QueryFingerprint, SlowQuery
+
+    now = timezone.now()
+    with transaction.atomic():
+        QueryFingerprint.objects.bulk_create(
+            [QueryFingerprint(digest=digest, sql=normalized)
+             for digest, (normalized, *_) in stats.items()],
+            ignore_conflicts=True,
+        )
+        for digest, (_, calls, total, longest, slow_calls) in stats.items():
+            QueryFingerprint.objects.filter(pk=digest).update(
+                calls=F('calls') + calls,
+                total_time=F('total_time') + total,
+                max_time=Greatest('max_time', Value(longest)),
+                slow_calls=F('slow_calls') + slow_calls,
+                last_seen=now,
+            )
+        if not slow:
+            return
+        SlowQuery.objects.bulk_create(
+            SlowQuery(created=now, **query) for query in slow
+        )
+        # Храним только последние SLOW_QUERY_KEEP медленных запросов.
+        border = SlowQuery.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        )[settings.SLOW_QUERY_KEEP:settings.SLOW_QUERY_KEEP + 1]
+        SlowQuery.objects.filter(pk__lte=border).delete()
+
+
+log = QueryLog()
+_local = threading.local()
+
+
+def start(request):
+    _local.request = request
+
+
+def finish():
+    _local.request = None
+
+
+def _view(request):
+    match = request.resolver_match
+    return match.view_name if match is not None else UNRESOLVED
+
+
+def _stack():
+    """Кадры проекта, из которых пришёл запрос, без кода Django."""
+    frames = [
+        frame for frame in traceback.extract_stack()
+        if frame.filename.startswith(settings.BASE_DIR)
+        and frame.filename not in _OWN_FILES
+        and 'site-packages' not in frame.filename
+    ]
+    depth = settings.SLOW_QUERY_STACK_DEPTH
+    return ''.join(traceback.format_list(frames[-depth:]))
+
+
+def _explain(connection, sql, params):
+    """План запроса отдельным курсором в обход обёрток и журналов."""
+    if not connection.features.supports_explaining_query_execution:
+        return ''
+    prefix = connection.ops.explain_query_prefix()
+    try:
+        with connection.wrap_database_errors:
+            cursor = connection.create_cursor()
+            try:
+                cursor.execute(f'{prefix} {sql}', params)
+                rows = cursor.fetchall()
+            finally:
+                cursor.close()
+    except DatabaseError:
+        return ''
+    return '\n'.join(
+        row if isinstance(row, str) else ' '.join(str(c) for c in row)
+        for row in rows
+    )
+
+
+def instrument(execute, sql, params, many, context):
+    """Обёртка connection.execute_wrapper для текущего запроса."""
+    request = getattr(_local, 'request', None)
+    if request is None:
+        return execute(sql, params, many, context)
+    began = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration = time.perf_counter() - began
+    slow = None
+    if duration >= settings.SLOW_QUERY_THRESHOLD:
+        slow = {
+            'sql': sql,
+            'params': repr(params)[:1000],
+            'duration': duration,
+            'view': _view(request),
+            'path': request.path[:255],
+            'plan': '' if many else _explain(
+                context['connection'], sql, params
+            ),
+            'stack': _stack(),
+        }
+    log.observe(sql, duration, slow)
+    return result
@@ -0,0 +1,134 @@
+"""
+Чтение с реплик базы с гарантией «читаю свои записи».
+
+Реплики — алиасы settings.DATABASE_REPLICAS. Время, на которое
+реплика содержит данные основной базы, хранится в общем кэше
+(mark_synced): его пишет тот, кто обновляет реплику, локально —
+команда refresh_replica. На реплику идут только чтения представлений
+с replica_reads, запись и всё остальное — на основную базу.
+
+Реплика выбирается, если она отстаёт не больше REPLICA_MAX_LAG и
+не старше нужного запросу момента: последней записи пользователя
+(cookie на REPLICA_STICKY_SECONDS после записи) и изменения данных
+страницы (fresh_since в cached_page). Иначе чтение идёт на основную.
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from . import metrics
+
+
+SYNCED_KEY = 'replica:synced:{}'
+COOKIE = 'last_write'
+
+_local = threading.local()
+
+
+def mark_synced(alias, as_of):
+    """Реплика alias содержит все записи основной базы до as_of."""
+    cache.set(SYNCED_KEY.format(alias), as_of, timeout=None)
+
+
+def _state():
+    state = getattr(_local, 'state', None)
+    if state is None:
+        state = _local.state = {
+            'active': 0, 'since': 0.0, 'wrote': False, 'choice': None,
+        }
+    return state
+
+
+def start(last_write):
+    """Начало запроса; last_write — значение cookie COOKIE или None."""
+    _local.state = None
+    try:
+        _state()['since'] = float(last_write or 0)
+    except ValueError:
+        pass
+
+
+def finish():
+    """Конец запроса: были ли в нём записи."""
+    wrote = _state()['wrote']
+    _local.state = None
+    return wrote
+
+
+def _choose(since):
+    aliases = settings.DATABASE_REPLICAS
+    synced = cache.get_many([SYNCED_KEY.format(alias) for alias in aliases])
+    now = time.time()
+    recent = {}
+    for alias in aliases:
+        as_of = synced.get(SYNCED_KEY.format(alias))
+        if as_of is not None and now - as_of <= settings.REPLICA_MAX_LAG:
+            recent[alias] = as_of
+    fresh = [alias for alias, as_of in recent.items() if as_of >= since]
+    alias = random.choice(fresh) if fresh else DEFAULT_DB_ALIAS
+    reason = 'fresh' if fresh else 'stale' if recent else 'lag'
+    metrics.registry.inc('yatube_replica_reads_total', (alias, reason))
+    return alias
+
+
+def database():
+    """Алиас для чтений текущего блока; выбор один на блок."""
+    state = _state()
+    if not state['active'] or not settings.DATABASE_REPLICAS:
+        return DEFAULT_DB_ALIAS
+    if state['choice'] is None:
+        state['choice'] = _choose(state['since'])
+    return state['choice']
+
+
+@contextmanager
+def _override(**changes):
+    state = _state()
+    saved = {name: state[name] for name in changes}
+    state.update(changes, choice=None)
+    try:
+        yield
+    finally:
+        state.update(saved, choice=None)
+
+
+def reads():
+    """Чтения блока могут идти на реплику."""
+    return _override(active=_state()['active'] + 1)
+
+
+def fresh_since(timestamp):
+    """Чтения блока видят все записи не позже timestamp."""
+    return _override(since=max(_state()['since'], timestamp))
+
+
+def replica_reads(view):
+    """Представление только читает: его запросы можно слать на реплику."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with reads():
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    """Чтения replica_reads — на свежую реплику, остальное — на основную."""
+
+    def db_for_read(self, model, **hints):
+        return database()
+
+    def db_for_write(self, model, **hints):
+        _state()['wrote'] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db not in settings.DATABASE_REPLICAS
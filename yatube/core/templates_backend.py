@@ -0,0 +1,31 @@
+import time
+
+from django.template import TemplateDoesNotExist
+from django.template.backends import django as backend
+
+from . import metrics
+
+
+class Template(backend.Template):
+    """Шаблон, добавляющий время рендеринга в метрики запроса."""
+
+    def render(self, context=None, request=None):
+        stats = metrics.current()
+        if stats is None:
+            return super().render(context, request)
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            stats.template_time += time.perf_counter() - start
+
+
+class DjangoTemplates(backend.DjangoTemplates):
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            backend.reraise(exc, self)
@@ -0,0 +1,135 @@
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from django.test import SimpleTestCase
+
+from core.cache import SQLiteCache
+
+
+def _incr_many(location, count):
+    cache = SQLiteCache(location, {})
+    for _ in range(count):
+        cache.incr('counter')
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = self.make_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.location, {'OPTIONS': options})
+
+    def test_set_get_and_expiry(self):
+        """Значение читается до истечения срока и пропадает после."""
+        self.cache.set('key', {'value': 1}, timeout=0.2)
+
+        self.assertEqual(self.cache.get('key'), {'value': 1})
+        time.sleep(0.3)
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_shared_between_instances(self):
+        """Экземпляры с одним файлом (разные процессы) видят общие данные."""
+        self.cache.set('key', 'value')
+
+        self.assertEqual(self.make_cache().get('key'), 'value')
+        self.make_cache().clear()
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_get_many_and_set_many(self):
+        """Пакетные операции выполняются одним запросом."""
+        self.cache.set_many({'a': 1, 'b': 'two', 'c': [3]})
+
+        self.assertEqual(
+            self.cache.get_many(['a', 'b', 'c', 'missing']),
+            {'a': 1, 'b': 'two', 'c': [3]}
+        )
+
+    def test_large_values_are_compressed(self):
+        """Большие значения сжимаются и читаются без изменений."""
+        page = '<article>Пост</article>' * 1000
+        self.cache.set('page', page)
+
+        size = self.cache._db.execute(
+            'SELECT size FROM cache WHERE key = ?',
+            (self.cache.make_key('page'),)
+        ).fetchone()[0]
+        self.assertLess(size, len(page.encode()) / 10)
+        self.assertEqual(self.cache.get('page'), page)
+
+    def test_add_and_incr(self):
+        """add не перезаписывает ключ, incr меняет число."""
+        self.assertTrue(self.cache.add('counter', 1))
+        self.assertFalse(self.cache.add('counter', 10))
+
+        self.assertEqual(self.cache.incr('counter', 5), 6)
+        self.assertEqual(self.cache.decr('counter'), 5)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_incr_is_atomic_across_processes(self):
+        """Параллельные incr из разных процессов не теряют обновлений."""
+        self.cache.set('counter', 0)
+        processes = [
+            multiprocessing.Process(
+                target=_incr_many, args=(self.location, 50)
+            )
+            for _ in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        self.assertEqual(self.cache.get('counter'), 200)
+
+    def test_lru_eviction_by_entries(self):
+        """При переполнении вытесняются давно не читанные ключи."""
+        cache = self.make_cache(MAX_ENTRIES=10, CULL_FREQUENCY=2)
+        cache.ACCESS_RESOLUTION = 0
+        for number in range(10):
+            cache.set(f'key-{number}', number)
+        cache.get('key-0')
+
+        cache.set('key-10', 10)
+
+        self.assertEqual(cache.get('key-0'), 0)
+        self.assertIsNone(cache.get('key-1'))
+        self.assertEqual(cache.get('key-10'), 10)
+
+    def test_read_while_database_locked(self):
+        """Занятая другим писателем база не мешает чтению."""
+        cache = self.make_cache(BUSY_TIMEOUT=5)
+        cache.ACCESS_RESOLUTION = 0
+        cache.set('key', 'value')
+        writer = sqlite3.connect(self.location, isolation_level=None)
+        writer.execute('BEGIN IMMEDIATE')
+        try:
+            start = time.monotonic()
+            value = cache.get('key')
+            elapsed = time.monotonic() - start
+        finally:
+            writer.execute('ROLLBACK')
+            writer.close()
+
+        self.assertEqual(value, 'value')
+        self.assertLess(elapsed, 1)
+
+    def test_eviction_by_size(self):
+        """Объём кэша ограничен MAX_SIZE."""
+        cache = self.make_cache(MAX_SIZE=4096, COMPRESS_MIN_SIZE=10 ** 6)
+        for number in range(20):
+            cache.set(f'key-{number}', os.urandom(512))
+
+        size = cache._db.execute(
+            'SELECT bytes FROM cache_stats'
+        ).fetchone()[0]
+        self.assertLessEqual(size, 4096)
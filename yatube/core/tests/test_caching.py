@@ -0,0 +1,118 @@
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from core import caching
+
+
+LOCMEM = {'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': 'caching-tests',
+}}
+
+
+@override_settings(CACHES=LOCMEM, CACHE_REFRESH_WORKERS=0,
+                   CACHE_LOCK_WAIT=2)
+class GetOrComputeTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def compute(self, value='fresh', delay=0):
+        def run():
+            self.calls += 1
+            time.sleep(delay)
+            return value
+        return run
+
+    def put(self, value, version='', expires_in=60, delta=0.01):
+        cache.set('key', (value, version, time.time() + expires_in, delta))
+
+    def test_concurrent_misses_compute_once(self):
+        """Одновременные промахи считают значение один раз."""
+        results = []
+        compute = self.compute(delay=0.2)
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                caching.get_or_compute('key', compute, 60)
+            ))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, ['fresh'] * 5)
+
+    @override_settings(CACHE_REFRESH_WORKERS=1)
+    def test_expired_value_served_while_refreshing(self):
+        """Истёкшее значение отдаётся сразу, обновление идёт в фоне."""
+        self.put('stale', expires_in=-1)
+
+        value = caching.get_or_compute('key', self.compute(delay=0.1), 60)
+
+        self.assertEqual(value, 'stale')
+        deadline = time.monotonic() + 2
+        while cache.get('key')[0] != 'fresh' and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(cache.get('key')[0], 'fresh')
+        self.assertEqual(self.calls, 1)
+
+    def test_new_version_recomputed_by_lock_holder(self):
+        """Смена версии: держатель блокировки считает, остальным — старое."""
+        self.put('old', version='1')
+
+        self.assertTrue(caching._acquire('key'))
+        self.assertEqual(
+            caching.get_or_compute('key', self.compute(), 60, version='2'),
+            'old',
+        )
+        caching._release('key')
+        self.assertEqual(
+            caching.get_or_compute('key', self.compute(), 60, version='2'),
+            'fresh',
+        )
+        self.assertEqual(self.calls, 1)
+
+    def test_versioned_reports_served_version(self):
+        """Прежнее значение на время пересчёта отдаётся со своей версией."""
+        self.put('old', version='1')
+
+        self.assertTrue(caching._acquire('key'))
+        stale = caching.get_or_compute_versioned(
+            'key', self.compute(), 60, version='2'
+        )
+        caching._release('key')
+        fresh = caching.get_or_compute_versioned(
+            'key', self.compute(), 60, version='2'
+        )
+
+        self.assertEqual(stale, ('old', '1'))
+        self.assertEqual(fresh, ('fresh', '2'))
+
+    def test_probabilistic_early_expiry(self):
+        """Дорогое значение пересчитывается раньше срока."""
+        self.put('cached', expires_in=100, delta=1)
+
+        with mock.patch('core.caching.random.random', return_value=0.9):
+            self.assertEqual(
+                caching.get_or_compute('key', self.compute(), 60), 'cached'
+            )
+        with mock.patch('core.caching.random.random', return_value=1e-60):
+            self.assertEqual(
+                caching.get_or_compute('key', self.compute(), 60), 'fresh'
+            )
+        self.assertEqual(self.calls, 1)
+
+    def test_uncacheable_result_not_stored(self):
+        """None от compute не кэшируется и снимает блокировку."""
+        self.assertIsNone(
+            caching.get_or_compute('key', self.compute(None), 60)
+        )
+        self.assertIsNone(cache.get('key'))
+        self.assertTrue(caching._acquire('key'))
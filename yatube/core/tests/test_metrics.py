@@ -0,0 +1,179 @@
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import metrics
+
+
+User = get_user_model()
+METRICS_DIR = tempfile.mkdtemp()
+
+
+@override_settings(METRICS_DIR=METRICS_DIR, METRICS_TOKEN='secret')
+class MetricsTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(METRICS_DIR, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        metrics.registry = metrics.Registry()
+        for name in os.listdir(METRICS_DIR):
+            os.remove(os.path.join(METRICS_DIR, name))
+
+    def test_histogram_rendered_cumulatively(self):
+        """Корзины гистограммы накопительные, есть сумма и число."""
+        registry = metrics.registry
+        registry.observe('yatube_request_db_queries', ('posts:index',), 1)
+        registry.observe('yatube_request_db_queries', ('posts:index',), 4)
+        registry.inc('yatube_requests_total', ('x"y', '200'))
+
+        text = metrics.render()
+
+        prefix = 'yatube_request_db_queries_bucket{view="posts:index",'
+        self.assertIn(f'{prefix}le="0"}} 0', text)
+        self.assertIn(f'{prefix}le="1"}} 1', text)
+        self.assertIn(f'{prefix}le="3"}} 1', text)
+        self.assertIn(f'{prefix}le="5"}} 2', text)
+        self.assertIn(f'{prefix}le="+Inf"}} 2', text)
+        self.assertIn(
+            'yatube_request_db_queries_sum{view="posts:index"} 5', text
+        )
+        self.assertIn(
+            'yatube_request_db_queries_count{view="posts:index"} 2', text
+        )
+        self.assertIn(
+            'yatube_requests_total{view="x\\"y",status="200"} 1', text
+        )
+
+    def test_snapshots_of_other_processes_merged(self):
+        """Снимки других воркеров складываются с метриками процесса."""
+        metrics.registry.inc('yatube_requests_total', ('posts:index', '200'))
+        with open(os.path.join(METRICS_DIR, '1.json'), 'w') as file:
+            json.dump({
+                'histograms': [],
+                'counters': [
+                    ['yatube_requests_total', ['posts:index', '200'], 4],
+                ],
+            }, file)
+
+        self.assertIn(
+            'yatube_requests_total{view="posts:index",status="200"} 5',
+            metrics.render(),
+        )
+
+    def test_middleware_records_view_metrics(self):
+        """Запрос страницы попадает в метрики под именем представления."""
+        client = Client()
+        client.get(reverse('posts:index'))
+        client.get(reverse('posts:index'))
+
+        text = client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret'
+        ).content.decode()
+
+        self.assertIn(
+            'yatube_requests_total{view="posts:index",status="200"} 2', text
+        )
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="posts:index"} 2',
+            text,
+        )
+        self.assertIn(
+            'yatube_cache_requests_total{view="posts:index",result="hit"}',
+            text,
+        )
+        self.assertIn(
+            'yatube_request_template_duration_seconds_count'
+            '{view="posts:index"} 2', text
+        )
+        self.assertTrue(os.listdir(METRICS_DIR))
+
+    def test_query_log_flush_not_counted(self):
+        """Запись журнала запросов не входит в SQL-запросы страницы."""
+        def queries():
+            cache.clear()
+            metrics.registry = metrics.Registry()
+            Client().get(reverse('posts:index'))
+            return metrics.registry.snapshot()['histograms']
+
+        with override_settings(QUERY_LOG_FLUSH_INTERVAL=float('inf')):
+            without_flush = queries()
+        with override_settings(QUERY_LOG_FLUSH_INTERVAL=0):
+            with_flush = queries()
+
+        self.assertEqual(
+            [state for name, _, state in with_flush
+             if name == 'yatube_request_db_queries'],
+            [state for name, _, state in without_flush
+             if name == 'yatube_request_db_queries'],
+        )
+
+    def test_snapshots_of_dead_processes_kept_in_total(self):
+        """Снимки завершившихся процессов переходят в dead.json."""
+        line = 'yatube_requests_total{view="posts:index",status="200"}'
+        paths = []
+        for pid in (4194301, 4194303):
+            paths.append(os.path.join(METRICS_DIR, f'{pid}.json'))
+            with open(paths[-1], 'w') as file:
+                json.dump({
+                    'histograms': [],
+                    'counters': [
+                        ['yatube_requests_total', ['posts:index', '200'], 4],
+                    ],
+                }, file)
+
+        with mock.patch('core.metrics.os.kill',
+                        side_effect=ProcessLookupError):
+            first = metrics.render()
+            second = metrics.render()
+
+        self.assertIn(f'{line} 8', first)
+        self.assertIn(f'{line} 8', second)
+        self.assertFalse(any(os.path.exists(path) for path in paths))
+        self.assertTrue(
+            os.path.exists(os.path.join(METRICS_DIR, metrics.DEAD_SNAPSHOT))
+        )
+
+    def test_metrics_access(self):
+        """Метрики видны персоналу и по токену, остальным — 404."""
+        staff = User.objects.create_user(username='staff', is_staff=True)
+        user = User.objects.create_user(username='user')
+        url = reverse('metrics')
+        remote = {'REMOTE_ADDR': '203.0.113.5'}
+        staff_client = Client(**remote)
+        staff_client.force_login(staff)
+        user_client = Client(**remote)
+        user_client.force_login(user)
+        guest_client = Client(**remote)
+
+        self.assertEqual(staff_client.get(url).status_code, 200)
+        self.assertEqual(
+            guest_client.get(
+                url, HTTP_AUTHORIZATION='Bearer secret'
+            ).status_code, 200
+        )
+        self.assertEqual(
+            guest_client.get(
+                url, HTTP_AUTHORIZATION='Bearer wrong'
+            ).status_code, 404
+        )
+        self.assertEqual(user_client.get(url).status_code, 404)
+        # Локальный адрес — это и прокси, сам по себе он не даёт доступа.
+        self.assertEqual(Client().get(url).status_code, 404)
+        with override_settings(METRICS_ALLOWED_IPS=('127.0.0.1',)):
+            self.assertEqual(Client().get(url).status_code, 200)
+        with override_settings(METRICS_TOKEN=None):
+            self.assertEqual(
+                guest_client.get(
+                    url, HTTP_AUTHORIZATION='Bearer None'
+                ).status_code, 404
+            )
@@ -0,0 +1,101 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import querylog
+from core.models import QueryFingerprint, SlowQuery
+from posts.models import Follow, Post
+
+
+User = get_user_model()
+
+
+@override_settings(SLOW_QUERY_THRESHOLD=0, QUERY_LOG_FLUSH_INTERVAL=0)
+class QueryLogTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Post.objects.create(author=cls.author, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        querylog.log = querylog.QueryLog()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_fingerprint_ignores_values(self):
+        """Запросы одной формы с разными значениями дают один отпечаток."""
+        first = querylog.fingerprint(
+            "SELECT * FROM t WHERE a = 1 AND b = 'x' AND c IN (%s, %s)"
+        )
+        second = querylog.fingerprint(
+            "SELECT *  FROM t WHERE a = 25 AND b = 'it''s' AND c IN (%s)"
+        )
+
+        self.assertEqual(first, second)
+        self.assertEqual(
+            first[1], 'SELECT * FROM t WHERE a = ? AND b = ? AND c IN (...)'
+        )
+        self.assertEqual(
+            querylog.normalize('INSERT INTO t VALUES (%s, %s), (%s, %s)'),
+            'INSERT INTO t VALUES (...)',
+        )
+
+    def test_slow_queries_captured_with_plan_and_stack(self):
+        """Медленный запрос сохраняется с планом, представлением и стеком."""
+        self.client.get(reverse('posts:follow_index'))
+
+        query = SlowQuery.objects.filter(
+            view='posts:follow_index', sql__contains='posts_timeline'
+        ).first()
+        self.assertIsNotNone(query)
+        self.assertEqual(query.path, reverse('posts:follow_index'))
+        self.assertTrue(query.plan)
+        self.assertIn('posts/views.py', query.stack)
+        self.assertNotIn('core/middleware.py', query.stack)
+        self.assertGreaterEqual(query.fingerprint.slow_calls, 1)
+
+    def test_stats_accumulate_per_fingerprint(self):
+        """Повторные запросы копятся в статистике их отпечатка."""
+        url = reverse('posts:profile', kwargs={'username': 'author'})
+        self.client.get(url)
+        calls = dict(QueryFingerprint.objects.values_list('digest', 'calls'))
+        cache.clear()
+        self.client.get(url)
+
+        for fingerprint in QueryFingerprint.objects.filter(pk__in=calls):
+            self.assertEqual(fingerprint.calls, calls[fingerprint.pk] * 2)
+            self.assertGreaterEqual(
+                fingerprint.total_time, fingerprint.max_time
+            )
+
+    @override_settings(SLOW_QUERY_KEEP=2)
+    def test_only_recent_slow_queries_kept(self):
+        """Хранятся только последние SLOW_QUERY_KEEP медленных запросов."""
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+
+        self.assertEqual(SlowQuery.objects.count(), 2)
+
+    def test_command_lists_fingerprints_and_slow_queries(self):
+        """Команда slow_queries показывает формы и медленные запросы."""
+        self.client.get(reverse('posts:follow_index'))
+        digest = QueryFingerprint.objects.first().digest
+
+        summary = StringIO()
+        call_command('slow_queries', stdout=summary)
+        details = StringIO()
+        call_command(
+            'slow_queries', '--view', 'posts:follow_index', stdout=details
+        )
+
+        self.assertIn(digest, summary.getvalue())
+        self.assertIn('План:', details.getvalue())
+        self.assertIn('posts_timeline', details.getvalue())
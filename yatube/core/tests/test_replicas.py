@@ -0,0 +1,84 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.test import Client, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import replicas
+from posts.models import Post
+
+
+User = get_user_model()
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    """Чтения на реплику, пока она не отстаёт от нужных данных."""
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        reader = User.objects.create_user(username='reader')
+        Post.objects.create(author=self.author, text='Тестовый пост')
+        self.client = Client()
+        self.client.force_login(reader)
+        self.url = reverse('posts:profile', kwargs={'username': 'author'})
+        self.client.get(self.url)
+
+    def queries(self, url):
+        with CaptureQueriesContext(connections['replica']) as replica:
+            with CaptureQueriesContext(connections['default']) as primary:
+                response = self.client.get(url)
+        return (
+            response,
+            [query['sql'] for query in replica.captured_queries],
+            [query['sql'] for query in primary.captured_queries],
+        )
+
+    def test_reads_go_to_fresh_replica(self):
+        """Свежая реплика обслуживает все чтения страницы."""
+        replicas.mark_synced('replica', time.time())
+
+        response, replica, primary = self.queries(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(replica)
+        self.assertEqual(primary, [])
+
+    def test_lagging_or_unknown_replica_is_skipped(self):
+        """Реплика без отметки или с большим отставанием не читается."""
+        _, unknown, _ = self.queries(self.url)
+        replicas.mark_synced('replica', time.time() - 60)
+        _, lagging, _ = self.queries(self.url)
+
+        self.assertEqual(unknown, [])
+        self.assertEqual(lagging, [])
+
+    def test_writer_reads_own_writes(self):
+        """После записи пользователь читает основную базу до синхронизации."""
+        replicas.mark_synced('replica', time.time())
+        follow = self.client.get(
+            reverse('posts:profile_follow', kwargs={'username': 'author'})
+        )
+
+        response, replica, _ = self.queries(self.url)
+        replicas.mark_synced('replica', time.time())
+        _, synced, _ = self.queries(self.url)
+
+        self.assertIn(replicas.COOKIE, follow.cookies)
+        self.assertEqual(replica, [])
+        self.assertContains(response, 'Отписаться')
+        self.assertTrue(synced)
+
+    def test_page_is_not_rendered_from_stale_replica(self):
+        """Страница после изменения данных рисуется с основной базы."""
+        replicas.mark_synced('replica', time.time())
+        Post.objects.create(author=self.author, text='Новый пост')
+
+        response, replica, _ = self.queries(reverse('posts:index'))
+
+        self.assertContains(response, 'Новый пост')
+        self.assertFalse(any('posts_post' in sql for sql in replica))
@@ -0,0 +1,56 @@
+from io import StringIO
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+
+class BackendOptionsTests(TestCase):
+    def test_new_connection_applies_init_command(self):
+        """Прагмы из init_command применены к соединению."""
+        with connection.cursor() as cursor:
+            values = {
+                name: cursor.execute(f'PRAGMA {name}').fetchone()[0]
+                for name in ('synchronous', 'cache_size', 'temp_store')
+            }
+
+        self.assertEqual(
+            values, {'synchronous': 1, 'cache_size': -20000, 'temp_store': 2}
+        )
+
+
+class UnknownModeTests(SimpleTestCase):
+    def test_unknown_transaction_mode_is_rejected(self):
+        """Опечатка в transaction_mode видна при подключении."""
+        handler = ConnectionHandler({'default': {
+            'ENGINE': 'core.backends.sqlite3',
+            'NAME': ':memory:',
+            'OPTIONS': {'transaction_mode': 'LAZY'},
+        }})
+
+        with self.assertRaises(ImproperlyConfigured):
+            handler['default'].get_connection_params()
+
+
+class TransactionModeTests(TransactionTestCase):
+    def test_atomic_takes_write_lock_at_begin(self):
+        """atomic начинается с BEGIN IMMEDIATE."""
+        with CaptureQueriesContext(connection) as context:
+            with transaction.atomic():
+                pass
+
+        self.assertEqual(context.captured_queries[0]['sql'], 'BEGIN IMMEDIATE')
+
+    def test_maintenance_runs_online(self):
+        """db_maintenance проверяет, анализирует и чистит базу."""
+        out = StringIO()
+
+        call_command('db_maintenance', stdout=out)
+
+        output = out.getvalue()
+        self.assertIn('quick_check: ok', output)
+        self.assertIn('ANALYZE', output)
+        self.assertIn('incremental_vacuum', output)
@@ -1,5 +1,11 @@
+import hmac
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
 
+from . import metrics
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -11,3 +17,27 @@ def csrf_failure(request, reason=''):
 
 def page_internal_server_error(request):
     return render(request, 'core/500.html', status=500)
+
+
+def _metrics_token(request):
+    token = settings.METRICS_TOKEN
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    return bool(token) and hmac.compare_digest(
+        header.encode(), f'Bearer {token}'.encode()
+    )
+
+
+def metrics_export(request):
+    """
+    Метрики для Prometheus: персоналу, сборщику с METRICS_TOKEN
+    и с адресов METRICS_ALLOWED_IPS.
+    """
+    if not (request.user.is_staff
+            or _metrics_token(request)
+            or request.META.get('REMOTE_ADDR')
+            in settings.METRICS_ALLOWED_IPS):
+        raise Http404
+    return HttpResponse(
+        metrics.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
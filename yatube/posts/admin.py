@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Group, Post, Comment, Follow
+from .models import Group, Post, Comment, Follow, Timeline
 
 
 @admin.register(Post)
@@ -9,8 +9,23 @@ class PostAdmin(admin.ModelAdmin):
     search_fields = ('text',)
     list_filter = ('created',)
     list_editable = ('group',)
+    readonly_fields = ('comments_count',)
     empty_value_display = '-пусто-'
 
+    def save_model(self, request, obj, form, change):
+        # Счётчик комментариев обновляется отдельно и не перезаписывается.
+        if not change:
+            return super().save_model(request, obj, form, change)
+        names = {field.name for field in Post._meta.concrete_fields}
+        obj.save(update_fields=[name for name in form.fields if name in names])
+
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск по полнотекстовому индексу вместо LIKE по всей таблице.
+        if not search_term.strip():
+            return queryset, False
+        found = Post.objects.search(search_term).values('pk')
+        return queryset.filter(pk__in=found), False
+
 
 @admin.register(Group)
 class GroupAdmin(admin.ModelAdmin):
@@ -30,3 +45,10 @@ class FollowAdmin(admin.ModelAdmin):
     list_display = ('pk', 'user', 'author', )
     list_filter = ('user',)
     empty_value_display = '-пусто-'
+
+
+@admin.register(Timeline)
+class TimelineAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'user', 'post', )
+    list_filter = ('user',)
+    raw_id_fields = ('post',)
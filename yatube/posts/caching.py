@@ -0,0 +1,185 @@
+import hashlib
+import time
+from functools import wraps
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, patch_vary_headers,
+)
+from django.utils.http import http_date
+
+from core import holes, replicas
+from core.caching import get_or_compute_versioned
+
+from . import follows
+from .models import Post
+
+
+GENERATION_KEY = 'gen:{}'
+MODIFIED_KEY = 'modified:{}'
+PAGE_KEY = 'page:{view}:{request}'
+POST_AUTHOR_KEY = 'post_author:{}'
+
+
+def _initial_generation():
+    # Счётчик стартует со времени, а не с единицы: после вытеснения
+    # ключа из кэша старые страницы не совпадут с новым поколением.
+    return int(time.time() * 1000)
+
+
+def generations(namespaces):
+    """
+    Текущие поколения пространств имён и время последнего изменения
+    любого из них (unix time) одним запросом к кэшу.
+    """
+    keys = [(GENERATION_KEY.format(quote(namespace)),
+             MODIFIED_KEY.format(quote(namespace)))
+            for namespace in namespaces]
+    found = cache.get_many([key for pair in keys for key in pair])
+    missing = {}
+    for generation_key, modified_key in keys:
+        if generation_key not in found:
+            missing[generation_key] = _initial_generation()
+        if modified_key not in found:
+            # Время изменения неизвестно: считаем, что сейчас.
+            missing[modified_key] = time.time()
+    if missing:
+        cache.set_many(missing, timeout=None)
+        found.update(missing)
+    return (
+        [found[generation_key] for generation_key, _ in keys],
+        max((found[modified_key] for _, modified_key in keys), default=0),
+    )
+
+
+def bump(*namespaces):
+    """Делает устаревшими все страницы пространств имён за O(1)."""
+    for namespace in namespaces:
+        key = GENERATION_KEY.format(quote(namespace))
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_generation(), timeout=None)
+    now = time.time()
+    cache.set_many({MODIFIED_KEY.format(quote(namespace)): now
+                    for namespace in namespaces}, timeout=None)
+
+
+def post_author(post_id):
+    """Username автора поста: автор поста не меняется, кэшируем навсегда."""
+    key = POST_AUTHOR_KEY.format(post_id)
+    username = cache.get(key)
+    if username is None:
+        username = (Post.objects
+                    .filter(pk=post_id)
+                    .values_list('author__username', flat=True)
+                    .first())
+        if username is not None:
+            cache.set(key, username, timeout=None)
+    return username
+
+
+def _user_key(request):
+    if not request.user.is_authenticated:
+        return 'anon'
+    # Форма комментария несёт CSRF-токен из cookie пользователя,
+    # кнопки подписки на карточках — его подписки.
+    csrf = request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')
+    following = follows.following_version(request.user.pk)
+    return f'{request.user.pk}:{csrf}:{following}'
+
+
+def _etag(key, version, user_key):
+    return 'W/"{}"'.format(hashlib.md5(
+        f'{key}:{version}:{user_key}'.encode()
+    ).hexdigest())
+
+
+def _validators(response, etag, last_modified, private):
+    """Заголовки условного GET: страницу можно хранить, но сверять."""
+    if response.status_code not in (200, 304):
+        return response
+    response['ETag'] = etag
+    if last_modified is not None and response.status_code == 200:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, no_cache=True,
+                        **{'private' if private else 'public': True})
+    patch_vary_headers(response, ('Cookie',))
+    return response
+
+
+def cached_page(namespaces, timeout=None):
+    """
+    Кэширование страницы по поколениям пространств имён.
+
+    namespaces(request, **kwargs) возвращает пространства, от которых
+    зависит страница; смена любого поколения делает страницу устаревшей.
+    Пересчёт защищён от лавины запросов, см. core.caching.
+    Страница одна на всех пользователей: их фрагменты подставляются
+    на каждый запрос, см. core.holes.
+
+    Поколения и пользователь дают ETag без рендеринга, поэтому на
+    If-None-Match и If-Modified-Since неизменная страница отвечает 304.
+    Прежняя страница, отданная на время пересчёта, получает ETag своей
+    версии и без даты изменения: следующий запрос её не подтвердит.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            request_key = hashlib.md5(
+                request.get_full_path().encode()
+            ).hexdigest()
+            key = PAGE_KEY.format(view=view.__name__, request=request_key)
+            current, modified = generations(
+                namespaces(request, *args, **kwargs)
+            )
+            version = '.'.join(str(generation) for generation in current)
+            user_key = _user_key(request)
+            etag = _etag(key, version, user_key)
+            # Время изменения не учитывает смену пользователя, поэтому
+            # вошедшим достаточно ETag.
+            private = user_key != 'anon'
+            last_modified = None if private else int(modified)
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            )
+            if response is not None:
+                return _validators(response, etag, last_modified, private)
+            rendered = []
+
+            def render():
+                request.punch_holes = True
+                try:
+                    # Реплика не старше данных страницы: иначе старая
+                    # версия попадёт в кэш под новым поколением.
+                    with replicas.fresh_since(modified):
+                        response = view(request, *args, **kwargs)
+                finally:
+                    request.punch_holes = False
+                rendered.append(response)
+                if response.status_code == 200 and not response.cookies:
+                    return response.content, response['Content-Type']
+                return None
+
+            cached, served = get_or_compute_versioned(
+                key, render, timeout or settings.PAGE_CACHE_TIMEOUT, version
+            )
+            # Страница, посчитанная в этом запросе, отдаётся как есть.
+            if rendered:
+                response = rendered[0]
+            else:
+                content, content_type = cached
+                response = HttpResponse(content, content_type=content_type)
+                if served != version:
+                    etag = _etag(key, served, user_key)
+                    last_modified = None
+            return _validators(
+                holes.fill(request, response), etag, last_modified, private
+            )
+        return wrapper
+    return decorator
@@ -0,0 +1,70 @@
+"""
+Кэш отрисованных карточек постов, общий для всех списков.
+
+Ключ карточки — id поста и отпечаток всего, что в ней выводится:
+текста, даты, картинки и готовности её миниатюры, группы и имени
+автора. Правка поста, смена картинки или группы дают новый ключ без
+отдельного сброса, старые карточки истекают сами. Страница достаёт
+все карточки одним get_many и рисует только недостающие.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.safestring import mark_safe
+
+from core import holes
+from core.metrics import registry
+
+
+CARD_KEY = 'card:{pk}:{digest}'
+TEMPLATE = 'includes/post_card.html'
+
+
+def version(post):
+    """Отпечаток полей поста, от которых зависит его карточка."""
+    thumbnail = (getattr(post, 'thumbnails', None) or {}).get('card')
+    parts = (
+        post.text,
+        post.created.isoformat(),
+        post.image.name or '',
+        thumbnail.name if thumbnail is not None else '',
+        post.group.slug if post.group_id else '',
+        post.author.username,
+        post.author.first_name,
+        post.author.last_name,
+    )
+    return hashlib.md5('\0'.join(parts).encode()).hexdigest()
+
+
+def render(context, posts, follow_buttons=False):
+    """
+    Готовые карточки постов по порядку. Карточка рисуется в контексте
+    страницы, поэтому её шаблон не должен зависеть от пользователя:
+    кнопка подписки добавляется после карточки отдельным фрагментом.
+    """
+    posts = list(posts)
+    keys = [CARD_KEY.format(pk=post.pk, digest=version(post))
+            for post in posts]
+    found = cache.get_many(keys)
+    missing = {}
+    template = context.template.engine.get_template(TEMPLATE)
+    cards = []
+    for key, post in zip(keys, posts):
+        card = found.get(key)
+        if card is None:
+            with context.push(post=post):
+                card = missing[key] = template.render(context)
+        if follow_buttons:
+            card += holes.place(
+                context, 'follow_button', author=post.author.username,
+                author_id=post.author_id, card=1,
+            )
+        cards.append(mark_safe(card))
+    if missing:
+        cache.set_many(missing, settings.POST_CARD_TIMEOUT)
+    registry.inc('yatube_fragment_cache_total', ('post_card', 'hit'),
+                 len(keys) - len(missing))
+    registry.inc('yatube_fragment_cache_total', ('post_card', 'miss'),
+                 len(missing))
+    return cards
@@ -0,0 +1,45 @@
+from django.db.models import F
+
+from .models import Follow, Post, UserStats
+
+
+def count_user(user_id):
+    """Пересчёт счётчиков пользователя по таблицам постов и подписок."""
+    return {
+        'posts_count': Post.objects.filter(author=user_id).count(),
+        'followers_count': Follow.objects.filter(author=user_id).count(),
+        'following_count': Follow.objects.filter(user=user_id).count(),
+    }
+
+
+def recount_user(user_id):
+    stats, _ = UserStats.objects.update_or_create(
+        user_id=user_id, defaults=count_user(user_id)
+    )
+    return stats
+
+
+def user_stats(user):
+    """Счётчики пользователя; отсутствующая строка создаётся пересчётом."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        return recount_user(user.pk)
+
+
+def _change(queryset, field, delta):
+    # Разошедшийся счётчик не уходит в минус, его чинит recount_stats.
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def change_user(user_id, **deltas):
+    # Строку создаёт сигнал пользователя; при её отсутствии счётчик
+    # восстановит пересчёт при первом чтении.
+    for field, delta in deltas.items():
+        _change(UserStats.objects.filter(user_id=user_id), field, delta)
+
+
+def change_comments(post_id, delta):
+    _change(Post.objects.filter(pk=post_id), 'comments_count', delta)
@@ -0,0 +1,137 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Q
+
+from .models import Follow, Post, Timeline, UserStats
+
+
+PULLED_AUTHORS_KEY = 'feed:pulled_authors'
+
+
+def is_pulled_author(author):
+    """
+    Автор с большим числом подписчиков не рассылается по лентам,
+    его посты подмешиваются в ленту при чтении.
+    """
+    # Только чтение: пересчёт внутри сигнала сохранения посчитал бы
+    # сохраняемый объект дважды.
+    followers = (UserStats.objects
+                 .filter(user=author.pk)
+                 .values_list('followers_count', flat=True)
+                 .first())
+    if followers is None:
+        followers = Follow.objects.filter(author=author).count()
+    return followers > settings.FEED_FANOUT_LIMIT
+
+
+def _pulled_authors_query():
+    return (UserStats.objects
+            .filter(followers_count__gt=settings.FEED_FANOUT_LIMIT)
+            .values('user'))
+
+
+def pulled_authors(user):
+    """Авторы из подписок пользователя, чьи посты читаются при запросе."""
+    pulled = cache.get(PULLED_AUTHORS_KEY)
+    if pulled is None:
+        pulled = [row['user'] for row in _pulled_authors_query()]
+        cache.set(PULLED_AUTHORS_KEY, pulled, settings.FEED_PULLED_TIMEOUT)
+    if not pulled:
+        return []
+    return list(Follow.objects
+                .filter(user=user, author__in=pulled)
+                .values_list('author', flat=True))
+
+
+def _bulk_push(entries):
+    Timeline.objects.bulk_create(
+        entries,
+        batch_size=settings.FEED_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def push_post(post):
+    """Рассылка нового поста по лентам подписчиков автора."""
+    if is_pulled_author(post.author):
+        return
+    followers = (Follow.objects
+                 .filter(author=post.author)
+                 .values_list('user', flat=True)
+                 .iterator())
+    _bulk_push(Timeline(user_id=user_id, post=post, created=post.created)
+               for user_id in followers)
+
+
+def push_author(user, author):
+    """Добавление в ленту постов автора, на которого подписались."""
+    if is_pulled_author(author):
+        return
+    posts = (Post.objects
+             .filter(author=author)
+             .values_list('pk', 'created')
+             .iterator())
+    _bulk_push(Timeline(user=user, post_id=post_id, created=created)
+               for post_id, created in posts)
+
+
+def backfill_rows(follows):
+    """Строки лент (user, post, created) для набора подписок."""
+    return (Post.objects
+            .filter(author__following__in=follows)
+            .exclude(author__in=_pulled_authors_query())
+            .order_by()
+            .values_list('author__following__user', 'pk', 'created'))
+
+
+def backfill(follows):
+    """Заполнение лент по набору подписок одним потоковым запросом."""
+    _bulk_push(Timeline(user_id=user_id, post_id=post_id, created=created)
+               for user_id, post_id, created in
+               backfill_rows(follows).iterator())
+
+
+def forget_pulled_authors():
+    cache.delete(PULLED_AUTHORS_KEY)
+
+
+def rebalance_author(author_id, delta):
+    """
+    Смена доставки автора, чьё число подписчиков после изменения на
+    delta перешло FEED_FANOUT_LIMIT: ставший рассылаемым дописывается
+    в ленты всех подписчиков (пока он подмешивался, его посты туда не
+    попадали), ставший подмешиваемым из лент удаляется.
+    Возвращает True, если доставка сменилась.
+    """
+    followers = (UserStats.objects
+                 .filter(user=author_id)
+                 .values_list('followers_count', flat=True)
+                 .first())
+    if followers is None:
+        return False
+    limit = settings.FEED_FANOUT_LIMIT
+    was_pulled = followers - delta > limit
+    if was_pulled == (followers > limit):
+        return False
+    if was_pulled:
+        backfill(Follow.objects.filter(author=author_id))
+    else:
+        Timeline.objects.filter(post__author=author_id).delete()
+    return True
+
+
+def drop_author(user, author):
+    """Удаление из ленты постов автора, от которого отписались."""
+    Timeline.objects.filter(user=user, post__author=author).delete()
+
+
+def follow_feed(user):
+    """Посты ленты подписок: материализованная часть и авторы-«звёзды»."""
+    pulled = pulled_authors(user)
+    if not pulled:
+        return (Post.objects
+                .filter(timeline__user=user)
+                .annotate(feed_created=F('timeline__created'))
+                .order_by('-feed_created', '-pk'))
+    pushed = Timeline.objects.filter(user=user).values('post')
+    return Post.objects.filter(Q(pk__in=pushed) | Q(author__in=pulled))
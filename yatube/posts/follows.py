@@ -0,0 +1,118 @@
+"""
+Подписки на авторов по username, по одному или пачкой.
+
+Авторы и уже оформленные подписки читаются одним запросом, новые
+подписки вставляются одним INSERT с пропуском конфликтов, поэтому
+повторный или параллельный клик не падает на уникальном ограничении.
+bulk_create не шлёт сигналы, их получают только реально вставленные
+подписки — счётчики, ленты и кэш страниц обновляются как при save().
+Транзакция берёт блокировку записи сразу (transaction_mode IMMEDIATE),
+так что проверка и вставка не пересекаются с другой подпиской.
+
+Для кнопок подписки на странице множество id авторов, на которых
+подписан пользователь, хранится в кэше и читается раз за запрос
+(following_of); сигналы подписок сбрасывают его после фиксации.
+Вместе с множеством меняется версия подписок пользователя: она
+входит в ETag страниц, где есть кнопки подписки.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import router, transaction
+from django.db.models import Exists, OuterRef
+from django.db.models.signals import post_save
+
+from .models import Follow
+
+
+User = get_user_model()
+
+FOLLOWING_KEY = 'following:{}'
+FOLLOWING_VERSION_KEY = 'following_version:{}'
+
+
+def follow(user, usernames):
+    """
+    Подписывает user на авторов. Возвращает {username: подписка новая}
+    для всех найденных авторов; на себя подписаться нельзя.
+    """
+    database = router.db_for_write(Follow)
+    with transaction.atomic(using=database):
+        authors = list(
+            User.objects.using(database)
+            .filter(username__in=set(usernames))
+            .only('pk', 'username')
+            .annotate(followed=Exists(Follow.objects.filter(
+                user=user.pk, author=OuterRef('pk')
+            )))
+        )
+        new = [Follow(user=user, author=author) for author in authors
+               if not author.followed and author.pk != user.pk]
+        Follow.objects.using(database).bulk_create(
+            new, ignore_conflicts=True
+        )
+        for instance in new:
+            post_save.send(
+                sender=Follow, instance=instance, created=True,
+                update_fields=None, raw=False, using=database,
+            )
+    created = {instance.author.username for instance in new}
+    return {author.username: author.username in created
+            for author in authors}
+
+
+def unfollow(user, usernames):
+    """Отписывает user от авторов; возвращает username отписанных."""
+    database = router.db_for_write(Follow)
+    with transaction.atomic(using=database):
+        follows = list(
+            Follow.objects.using(database)
+            .filter(user=user, author__username__in=set(usernames))
+            .select_related('author')
+        )
+        for instance in follows:
+            instance.user = user
+            instance.delete()
+    return {instance.author.username for instance in follows}
+
+
+def following(user_id):
+    """Множество id авторов, на которых подписан пользователь."""
+    key = FOLLOWING_KEY.format(user_id)
+    authors = cache.get(key)
+    if authors is None:
+        authors = frozenset(Follow.objects
+                            .filter(user=user_id)
+                            .values_list('author', flat=True))
+        cache.set(key, authors, settings.FOLLOWING_TIMEOUT)
+    return authors
+
+
+def following_version(user_id):
+    """Версия подписок пользователя, меняется с каждой подпиской."""
+    key = FOLLOWING_VERSION_KEY.format(user_id)
+    version = cache.get(key)
+    if version is None:
+        # Как у поколений страниц: после вытеснения ключа версия
+        # не совпадёт ни с одной выданной раньше.
+        version = time.time_ns()
+        cache.set(key, version, timeout=None)
+    return version
+
+
+def forget_following(user_id):
+    cache.delete(FOLLOWING_KEY.format(user_id))
+    cache.set(FOLLOWING_VERSION_KEY.format(user_id), time.time_ns(),
+              timeout=None)
+
+
+def following_of(request):
+    """Подписки текущего пользователя: одно чтение кэша на запрос."""
+    if not hasattr(request, '_following'):
+        request._following = (
+            following(request.user.pk)
+            if request.user.is_authenticated else frozenset()
+        )
+    return request._following
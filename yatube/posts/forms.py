@@ -1,6 +1,9 @@
 from django import forms
+from django.core.exceptions import ValidationError
+from PIL import Image
 
-from .models import Post, Comment
+from .images import ingest
+from .models import Comment, Group, Post
 
 
 class PostForm(forms.ModelForm):
@@ -8,8 +11,46 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ('text', 'group', 'image')
 
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        # Новая загрузка перекодируется, сохранённый файл остаётся как есть.
+        if image and hasattr(image, 'content_type'):
+            try:
+                return ingest(image)
+            except (OSError, ValueError, Image.DecompressionBombError):
+                # Заголовок прочитался, а данные битые или не декодируются.
+                raise ValidationError(
+                    'Не удалось прочитать изображение.',
+                    code='invalid_image',
+                )
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
         model = Comment
         fields = ('text',)
+
+
+class SearchForm(forms.Form):
+    q = forms.CharField(label='Поиск', max_length=200, required=False)
+    group = forms.ModelChoiceField(
+        Group.objects.all(), label='Группа', required=False
+    )
+    author = forms.CharField(label='Автор', max_length=150, required=False)
+    date_from = forms.DateField(label='С даты', required=False)
+    date_to = forms.DateField(label='По дату', required=False)
+
+    def search(self, queryset):
+        """Посты по запросу с учётом фильтров формы."""
+        data = self.cleaned_data
+        queryset = queryset.search(data['q'])
+        if data['group']:
+            queryset = queryset.filter(group=data['group'])
+        if data['author']:
+            queryset = queryset.filter(author__username=data['author'])
+        if data['date_from']:
+            queryset = queryset.filter(created__date__gte=data['date_from'])
+        if data['date_to']:
+            queryset = queryset.filter(created__date__lte=data['date_to'])
+        return queryset
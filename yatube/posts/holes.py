@@ -0,0 +1,34 @@
+"""Пользовательские фрагменты общих страниц постов, см. core.holes."""
+from core.holes import register
+
+from . import follows
+from .forms import CommentForm
+
+
+@register('switcher', 'includes/switcher.html')
+def switcher(request, **flags):
+    return flags
+
+
+@register('follow_button', 'includes/follow_button.html')
+def follow_button(request, author, author_id, card=''):
+    """
+    Кнопка подписки на автора; на карточке своих постов её нет.
+    Подписки читаются одним множеством на все кнопки страницы.
+    """
+    author_id = int(author_id)
+    return {
+        'author': author,
+        'following': author_id in follows.following_of(request),
+        'card': bool(card),
+        'own': bool(card) and author_id == request.user.pk,
+    }
+
+
+@register('post_controls', 'includes/post_controls.html')
+def post_controls(request, post_id, author):
+    return {
+        'post_id': post_id,
+        'is_author': request.user.username == author,
+        'form': CommentForm(),
+    }
@@ -0,0 +1,139 @@
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image, ImageOps
+
+
+# Графика без потерь часто меньше в PNG, чем в JPEG.
+LOSSLESS_FORMATS = ('PNG', 'GIF')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _pool():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn: дочерние процессы не наследуют соединения и потоки.
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+    return _executor
+
+
+def _discard(pool):
+    """Сломанный пул заменяется новым при следующей загрузке."""
+    global _executor
+    with _executor_lock:
+        if _executor is pool:
+            _executor = None
+    pool.shutdown(wait=False)
+
+
+def _reencode_in_pool(arguments):
+    pool = _pool()
+    future = pool.submit(reencode, *arguments)
+    try:
+        return future.result(timeout=settings.IMAGE_TIMEOUT)
+    except BrokenProcessPool:
+        # Процесс пула упал (нехватка памяти, сбой кодека): пул больше
+        # не принимает задачи.
+        _discard(pool)
+    except TimeoutError:
+        future.cancel()
+    raise ValidationError(
+        'Не удалось обработать изображение.', code='image_failed',
+    )
+
+
+def _has_alpha(image):
+    return (image.mode in ('RGBA', 'LA', 'PA')
+            or 'transparency' in image.info)
+
+
+def _save(image, kind, quality):
+    output = io.BytesIO()
+    if kind == 'png':
+        image.save(output, 'PNG', optimize=True)
+    else:
+        image.save(output, 'JPEG', quality=quality, optimize=True,
+                   progressive=True)
+    return output.getvalue(), kind
+
+
+def reencode(source, max_side, quality):
+    """
+    Поворот по EXIF, уменьшение до max_side по большей стороне и
+    перекодирование без метаданных: JPEG, с прозрачностью — PNG;
+    для PNG и GIF остаётся меньший из JPEG и PNG.
+    Выполняется в процессе пула; source — путь к файлу или байты.
+    Возвращает (байты, расширение).
+    """
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    with Image.open(source) as image:
+        lossless = image.format in LOSSLESS_FORMATS
+        image.draft('RGB', (max_side, max_side))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+        if _has_alpha(image):
+            return _save(image.convert('RGBA'), 'png', quality)
+        image = image.convert('RGB')
+        encoded = _save(image, 'jpg', quality)
+        if lossless:
+            encoded = min(encoded, _save(image, 'png', quality),
+                          key=lambda result: len(result[0]))
+        return encoded
+
+
+def validate(upload):
+    """
+    Проверка размера файла и числа пикселей по заголовку,
+    без декодирования изображения.
+    """
+    if upload.size > settings.IMAGE_MAX_BYTES:
+        raise ValidationError(
+            'Файл больше %(limit)d МБ.',
+            code='file_too_large',
+            params={'limit': settings.IMAGE_MAX_BYTES // 2 ** 20},
+        )
+    upload.seek(0)
+    with Image.open(upload) as image:
+        width, height = image.size
+    upload.seek(0)
+    if width * height > settings.IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            'Изображение больше %(limit)d пикселей.',
+            code='too_many_pixels',
+            params={'limit': settings.IMAGE_MAX_PIXELS},
+        )
+
+
+def ingest(upload):
+    """Проверенная и перекодированная копия загруженной картинки."""
+    validate(upload)
+    if hasattr(upload, 'temporary_file_path'):
+        # Большой файл уже на диске: процессу пула передаём только путь.
+        source = upload.temporary_file_path()
+    else:
+        source = upload.read()
+        upload.seek(0)
+    arguments = (source, settings.IMAGE_MAX_SIDE, settings.IMAGE_QUALITY)
+    if settings.IMAGE_WORKERS:
+        content, extension = _reencode_in_pool(arguments)
+    else:
+        content, extension = reencode(*arguments)
+    name = os.path.splitext(os.path.basename(upload.name))[0]
+    return SimpleUploadedFile(
+        f'{name}.{extension}', content,
+        content_type='image/png' if extension == 'png' else 'image/jpeg',
+    )
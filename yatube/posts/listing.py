@@ -0,0 +1,143 @@
+"""
+Двухуровневый кэш списков постов.
+
+Первый уровень — упорядоченные id постов страницы под ключом из SQL
+запроса id. Он версионируется поколениями пространств списков
+(LIST_NAMESPACE), которые меняются только при появлении, удалении
+или переносе поста между группами, но не при его правке.
+
+Второй уровень — объекты Post, User и Group, по ключу на объект.
+Посты страницы берутся одним get_many, их авторы и группы — вторым,
+промахи добираются из базы через in_bulk. Правка объекта сбрасывает
+только его ключ, поэтому после правки поста из базы читается он один.
+"""
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from core.caching import get_or_compute
+
+from . import caching
+from .models import Group, Post
+
+
+User = get_user_model()
+
+IDS_KEY = 'ids:{}'
+OBJECT_KEY = 'obj:{model}:{pk}'
+LIST_NAMESPACE = 'list:{}'
+# Поля, которые нужны карточкам постов в списках, как в for_feed.
+FIELDS = {
+    Post: ('text', 'created', 'image', 'author', 'group'),
+    User: ('username', 'first_name', 'last_name'),
+    Group: ('slug',),
+}
+
+
+def object_key(model, pk):
+    return OBJECT_KEY.format(model=model._meta.label_lower, pk=pk)
+
+
+def forget(instance):
+    """Сбрасывает закэшированный объект после его изменения."""
+    cache.delete(object_key(type(instance), instance.pk))
+
+
+def load(wanted):
+    """
+    Объекты {модель: id} одним get_many, промахи — in_bulk по модели.
+    Возвращает {(модель, id): объект} без удалённых объектов.
+    """
+    keys = {object_key(model, pk): (model, pk)
+            for model, ids in wanted.items() for pk in ids}
+    found = {keys[key]: value
+             for key, value in cache.get_many(keys).items()}
+    loaded = {}
+    for model, ids in wanted.items():
+        missing = [pk for pk in ids if (model, pk) not in found]
+        if not missing:
+            continue
+        objects = model.objects.only(*FIELDS[model]).in_bulk(missing)
+        for pk, obj in objects.items():
+            found[model, pk] = obj
+            loaded[object_key(model, pk)] = obj
+    if loaded:
+        cache.set_many(loaded, settings.OBJECT_CACHE_TIMEOUT)
+    return found
+
+
+def posts(ids):
+    """Посты по id в том же порядке, с авторами и группами из кэша."""
+    found = load({Post: ids})
+    page = [found[Post, pk] for pk in ids if (Post, pk) in found]
+    related = load({
+        User: {post.author_id for post in page},
+        Group: {post.group_id for post in page} - {None},
+    })
+    for post in page:
+        post.author = related.get((User, post.author_id))
+        # Группу могли удалить: SET_NULL обновляет посты без сигналов.
+        post.group = related.get((Group, post.group_id))
+    return [post for post in page if post.author is not None]
+
+
+def _ids_key(queryset):
+    sql, params = queryset.query.sql_with_params()
+    return IDS_KEY.format(
+        hashlib.md5(f'{sql}:{params}'.encode()).hexdigest()
+    )
+
+
+def _version(namespaces):
+    generations, _ = caching.generations(
+        LIST_NAMESPACE.format(namespace) for namespace in namespaces
+    )
+    return '.'.join(str(generation) for generation in generations)
+
+
+def remember(page):
+    """Кладёт в кэш посты, загруженные вместе с авторами и группами."""
+    objects = {}
+    for post in page:
+        objects[object_key(Post, post.pk)] = post
+        objects[object_key(User, post.author_id)] = post.author
+        if post.group_id is not None:
+            objects[object_key(Group, post.group_id)] = post.group
+    if objects:
+        cache.set_many(objects, settings.OBJECT_CACHE_TIMEOUT)
+
+
+def cached_slice(queryset, start, stop, namespaces):
+    """
+    queryset[start:stop] через кэш упорядоченных id и объектов.
+    Без списка id страница читается исходным запросом с JOIN, который
+    заодно заполняет кэш объектов: холодная страница — тот же запрос.
+    """
+    fetched = []
+
+    def compute():
+        fetched.extend(queryset[start:stop])
+        remember(fetched)
+        return [post.pk for post in fetched]
+
+    ids = get_or_compute(
+        _ids_key(queryset.values_list('pk', flat=True)[start:stop]),
+        compute, settings.PAGE_CACHE_TIMEOUT, _version(namespaces),
+    )
+    return fetched or posts(ids)
+
+
+def cached_count(queryset, namespaces):
+    query = queryset.values('pk').order_by()
+    return get_or_compute(
+        _ids_key(query) + ':count', queryset.count,
+        settings.PAGE_CACHE_TIMEOUT, _version(namespaces),
+    )
+
+
+def bump(*namespaces):
+    """Списки пространств изменились: пост появился, исчез или переехал."""
+    caching.bump(*(LIST_NAMESPACE.format(namespace)
+                   for namespace in namespaces))
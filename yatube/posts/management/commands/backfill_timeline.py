@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import feed
+from posts.models import Follow, Timeline
+
+
+class Command(BaseCommand):
+    help = 'Заполняет материализованные ленты подписок по таблице Follow.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', help='Пересобрать ленту только этого пользователя.'
+        )
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Удалить существующие записи ленты перед заполнением.'
+        )
+
+    def handle(self, *args, **options):
+        follows = Follow.objects.all()
+        entries = Timeline.objects.all()
+        if options['user']:
+            follows = follows.filter(user__username=options['user'])
+            entries = entries.filter(user__username=options['user'])
+        with transaction.atomic():
+            if options['clear']:
+                entries.delete()
+            feed.backfill(follows)
+        self.stdout.write(self.style.SUCCESS(
+            f'Записей в лентах: {entries.count()}'
+        ))
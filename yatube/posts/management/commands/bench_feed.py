@@ -0,0 +1,98 @@
+import random
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import feed
+from posts.models import Follow, Post
+
+
+User = get_user_model()
+
+
+class Rollback(Exception):
+    """Синтетический граф не сохраняется в базе."""
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает ленту подписок через JOIN по Follow '
+        'и материализованную ленту на синтетическом графе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--follows', type=int, default=30,
+                            help='Подписок на одного читателя.')
+        parser.add_argument('--readers', type=int, default=20,
+                            help='Сколько лент читать в каждом замере.')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        try:
+            with transaction.atomic():
+                readers = self.build_graph(options)
+                self.report('join', self.measure(
+                    lambda user: Post.objects.filter(
+                        author__following__user=user),
+                    readers, options['repeat'],
+                ))
+                self.report('timeline', self.measure(
+                    feed.follow_feed, readers, options['repeat'],
+                ))
+                raise Rollback
+        except Rollback:
+            pass
+
+    def build_graph(self, options):
+        User.objects.bulk_create(
+            User(username=f'bench-feed-{number}')
+            for number in range(options['users'])
+        )
+        users = list(User.objects.filter(username__startswith='bench-feed-'))
+        # Степенное распределение: немногие авторы пишут больше всех,
+        # немногие (другие) собирают большую часть подписчиков.
+        weights = [1 / (rank + 1) for rank in range(len(users))]
+        authors = random.choices(users, weights, k=options['posts'])
+        random.shuffle(users)
+        Post.objects.bulk_create(
+            (Post(author=author, text='bench') for author in authors),
+            batch_size=settings.FEED_BATCH_SIZE,
+        )
+        follows = []
+        for user in users:
+            following = set(random.choices(
+                users, weights, k=options['follows']
+            ))
+            following.discard(user)
+            follows.extend(Follow(user=user, author=author)
+                           for author in following)
+        Follow.objects.bulk_create(
+            follows, batch_size=settings.FEED_BATCH_SIZE
+        )
+        feed.backfill(Follow.objects.all())
+        return random.sample(users, min(options['readers'], len(users)))
+
+    def measure(self, get_posts, readers, repeat):
+        timings = []
+        for _ in range(repeat):
+            for user in readers:
+                start = time.perf_counter()
+                list(get_posts(user)[:settings.POSTS_PER_PAGE])
+                timings.append((time.perf_counter() - start) * 1000)
+        return timings
+
+    def report(self, name, timings):
+        timings.sort()
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        self.stdout.write(
+            f'{name:>10}: mean {statistics.mean(timings):.2f} ms, '
+            f'p95 {p95:.2f} ms, n={len(timings)}'
+        )
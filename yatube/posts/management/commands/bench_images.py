@@ -0,0 +1,81 @@
+import io
+import shutil
+import statistics
+import tempfile
+import time
+
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from PIL import Image
+
+from posts import images
+
+
+# Тег EXIF Orientation: 6 — снимок повёрнут на 90° по часовой стрелке.
+ORIENTATION = 0x0112
+
+
+def phone_photo(width, height):
+    """Снимок «с телефона»: шум поверх градиента, JPEG 95 с EXIF."""
+    gradient = Image.linear_gradient('L').resize((width, height))
+    noise = Image.effect_noise((width, height), 40)
+    image = Image.merge('RGB', (gradient, noise, gradient.rotate(180)))
+    exif = Image.Exif()
+    exif[ORIENTATION] = 6
+    file = io.BytesIO()
+    image.save(file, 'JPEG', quality=95, exif=exif.tobytes())
+    return file.getvalue()
+
+
+def screenshot(width, height):
+    image = Image.new('RGB', (width, height), 'white')
+    image.paste((40, 90, 200), (0, 0, width, height // 8))
+    file = io.BytesIO()
+    image.save(file, 'PNG')
+    return file.getvalue()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает задержку загрузки и объём сохранённых картинок '
+        'без обработки и с проверкой и перекодированием.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument('--workers', type=int, default=2,
+                            help='Процессов пула; 0 — в текущем процессе.')
+
+    def handle(self, *args, **options):
+        samples = {
+            'photo 4032x3024': ('photo.jpg', phone_photo(4032, 3024)),
+            'screenshot 2560x1440': ('shot.png', screenshot(2560, 1440)),
+        }
+        directory = tempfile.mkdtemp()
+        storage = FileSystemStorage(location=directory)
+        try:
+            with override_settings(IMAGE_WORKERS=options['workers']):
+                for label, (name, content) in samples.items():
+                    for mode in ('as is', 'ingested'):
+                        self.bench(storage, label, mode, name, content,
+                                   options['repeat'])
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def bench(self, storage, label, mode, name, content, repeat):
+        timings = []
+        stored = 0
+        for _ in range(repeat):
+            upload = SimpleUploadedFile(name, content)
+            start = time.perf_counter()
+            if mode == 'ingested':
+                upload = images.ingest(upload)
+            saved = storage.save(f'posts/{upload.name}', upload)
+            timings.append((time.perf_counter() - start) * 1000)
+            stored = storage.size(saved)
+        self.stdout.write(
+            f'{label}, {mode}: {statistics.median(timings):.1f} ms, '
+            f'{len(content) // 1024} KB -> {stored // 1024} KB'
+        )
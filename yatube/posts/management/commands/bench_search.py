@@ -0,0 +1,103 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import search
+from posts.models import Post
+
+
+User = get_user_model()
+
+STEMS = (
+    'кот', 'собак', 'город', 'дорог', 'книг', 'музык', 'погод', 'работ',
+    'школ', 'поезд', 'праздник', 'снег', 'лес', 'рек', 'гор', 'мор',
+    'друг', 'семь', 'кухн', 'сад', 'фейерверк',
+)
+ENDINGS = ('', 'а', 'ы', 'у', 'ой', 'ами', 'ах', 'е', 'ом', 'и')
+FILLER = (
+    'сегодня', 'вчера', 'очень', 'наконец', 'снова', 'вместе', 'долго',
+    'быстро', 'тихо', 'весело', 'видел', 'читала', 'гуляли', 'думаю',
+)
+
+
+class Rollback(Exception):
+    """Синтетические посты не сохраняются в базе."""
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает поиск LIKE по тексту постов и полнотекстовый '
+        'поиск FTS5 на синтетических постах.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        try:
+            with transaction.atomic():
+                self.build_posts(options['posts'])
+                # Редкое слово, частое слово и фраза из двух слов.
+                for query in ('фейерверками', 'кот', 'снег горы'):
+                    self.compare(query, options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def build_posts(self, count):
+        author = User.objects.create(username='bench-search')
+        rare = set(random.sample(range(count), max(count // 1000, 1)))
+        Post.objects.bulk_create(
+            (Post(author=author, text=self.text(number in rare))
+             for number in range(count)),
+            batch_size=500,
+        )
+        start = time.perf_counter()
+        search.rebuild()
+        self.stdout.write(
+            f'Индекс {count} постов: {time.perf_counter() - start:.1f} s'
+        )
+
+    def text(self, rare):
+        words = random.choices(FILLER, k=8) + [
+            random.choice(STEMS[:-1]) + random.choice(ENDINGS)
+            for _ in range(4)
+        ]
+        if rare:
+            words.append('фейерверками')
+        random.shuffle(words)
+        return ' '.join(words)
+
+    def timed(self, operation, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = operation()
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings), result
+
+    def measure(self, queryset, repeat):
+        page, _ = self.timed(lambda: list(queryset[:10]), repeat)
+        count, found = self.timed(queryset.count, repeat)
+        return page, count, found
+
+    def compare(self, query, repeat):
+        like = Post.objects.all()
+        for word in query.split():
+            like = like.filter(text__icontains=word)
+        results = {
+            'like': self.measure(like, repeat),
+            'fts': self.measure(Post.objects.search(query), repeat),
+        }
+        for name, (page, count, found) in results.items():
+            self.stdout.write(
+                f'«{query}», {name}: страница {page:.1f} ms, '
+                f'подсчёт {count:.1f} ms, найдено {found}'
+            )
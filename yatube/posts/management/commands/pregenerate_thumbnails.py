@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Создаёт недостающие миниатюры картинок постов.'
+
+    def handle(self, *args, **options):
+        names = (Post.objects
+                 .exclude(image='')
+                 .values_list('image', flat=True)
+                 .distinct()
+                 .iterator())
+        count = 0
+        for name in names:
+            thumbnails.generate(name)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено картинок: {count}'
+        ))
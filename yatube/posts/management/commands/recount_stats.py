@@ -0,0 +1,88 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from posts.models import Comment, Follow, Post, UserStats
+
+
+User = get_user_model()
+
+
+def grouped(queryset, field, ids):
+    # Без order_by() сортировка Meta.ordering попадает в GROUP BY.
+    return dict(queryset
+                .filter(**{f'{field}__in': ids})
+                .order_by()
+                .values_list(field)
+                .annotate(count=Count('pk')))
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов, комментариев и подписок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def batches(self, queryset, size):
+        last = 0
+        while True:
+            ids = list(queryset
+                       .filter(pk__gt=last)
+                       .order_by('pk')
+                       .values_list('pk', flat=True)[:size])
+            if not ids:
+                return
+            yield ids
+            last = ids[-1]
+
+    def handle(self, *args, **options):
+        size = options['batch_size']
+        users = posts = 0
+        for ids in self.batches(User.objects.all(), size):
+            with transaction.atomic():
+                users += self.repair_users(ids)
+        for ids in self.batches(Post.objects.all(), size):
+            with transaction.atomic():
+                posts += self.repair_posts(ids)
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено счётчиков: пользователей {users}, постов {posts}'
+        ))
+
+    def repair_users(self, ids):
+        posts = grouped(Post.objects, 'author', ids)
+        followers = grouped(Follow.objects, 'author', ids)
+        following = grouped(Follow.objects, 'user', ids)
+        existing = UserStats.objects.in_bulk(ids)
+        repaired = 0
+        for user_id in ids:
+            actual = {
+                'posts_count': posts.get(user_id, 0),
+                'followers_count': followers.get(user_id, 0),
+                'following_count': following.get(user_id, 0),
+            }
+            stats = existing.get(user_id)
+            if stats is not None and all(
+                getattr(stats, field) == value
+                for field, value in actual.items()
+            ):
+                continue
+            UserStats.objects.update_or_create(
+                user_id=user_id, defaults=actual
+            )
+            repaired += 1
+        return repaired
+
+    def repair_posts(self, ids):
+        actual = grouped(Comment.objects, 'post', ids)
+        repaired = 0
+        rows = Post.objects.filter(pk__in=ids).values_list(
+            'pk', 'comments_count'
+        )
+        for post_id, comments_count in rows:
+            if comments_count != actual.get(post_id, 0):
+                Post.objects.filter(pk=post_id).update(
+                    comments_count=actual.get(post_id, 0)
+                )
+                repaired += 1
+        return repaired
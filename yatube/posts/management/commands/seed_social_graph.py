@@ -0,0 +1,348 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import accumulate, islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count, Max, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from faker import Faker
+
+from posts import caching, feed, listing, search
+from posts.models import Comment, Follow, Group, Post, Timeline, UserStats
+
+
+User = get_user_model()
+
+# Тексты собираются из готовых предложений: Faker на каждый пост
+# обходился бы дороже самой вставки.
+SENTENCES = 5000
+NAMES = 1000
+# Распределение Парето со средним 3: большинство подписывается на
+# немногих, единицы — на тысячи авторов.
+FOLLOWS_ALPHA = 1.5
+
+
+def chunked(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def drop_indexes(*models):
+    """
+    Удаляет неуникальные индексы таблиц на время вставки и возвращает
+    их описания: построить индекс заново быстрее, чем обновлять его
+    на каждой строке.
+    """
+    if connection.vendor != 'sqlite':
+        return []
+    with connection.cursor() as cursor:
+        names = []
+        for model in models:
+            cursor.execute('PRAGMA index_list({})'.format(
+                connection.ops.quote_name(model._meta.db_table)
+            ))
+            # Уникальные индексы (первичные ключи, UNIQUE и ограничения
+            # уникальности) остаются: без них вставка пропустит дубли.
+            names += [name for _, name, unique, *_ in cursor.fetchall()
+                      if not unique]
+        if not names:
+            return []
+        placeholders = ', '.join(['%s'] * len(names))
+        cursor.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' "
+            f'AND sql IS NOT NULL AND name IN ({placeholders})',
+            names,
+        )
+        indexes = cursor.fetchall()
+        for name, _ in indexes:
+            cursor.execute(f'DROP INDEX {connection.ops.quote_name(name)}')
+    return indexes
+
+
+def restore_indexes(indexes):
+    with connection.cursor() as cursor:
+        for _, sql in indexes:
+            cursor.execute(sql)
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическим социальным графом: пользователи, '
+        'группы, посты, комментарии и подписки со степенными '
+        'распределениями числа постов и подписчиков.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--comments', type=int, default=40000)
+        parser.add_argument('--follows', type=int, default=20,
+                            help='Среднее число подписок пользователя.')
+        parser.add_argument('--skew', type=float, default=1.0,
+                            help='Показатель степенного закона популярности.')
+        parser.add_argument('--days', type=int, default=365,
+                            help='За сколько дней распределить посты.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=50000)
+        parser.add_argument('--prefix', default='seed',
+                            help='Префикс имён пользователей и групп.')
+        parser.add_argument('--password',
+                            help='Общий пароль пользователей; без него '
+                                 'войти под ними нельзя.')
+        parser.add_argument('--skip-timeline', action='store_true',
+                            help='Не заполнять материализованные ленты.')
+        parser.add_argument('--with-search', action='store_true',
+                            help='Проиндексировать созданные посты для '
+                                 'поиска; стемминг дольше самой вставки.')
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.prefix = options['prefix']
+        if User.objects.filter(username__startswith=f'{self.prefix}-'
+                               ).exists():
+            raise CommandError(
+                f'Пользователи с префиксом {self.prefix} уже есть, '
+                'укажите другой --prefix.'
+            )
+        random.seed(options['seed'])
+        fake = Faker('ru_RU')
+        fake.seed_instance(options['seed'])
+        self.sentences = [fake.sentence() for _ in range(SENTENCES)]
+        self.first_names = [fake.first_name() for _ in range(NAMES)]
+        self.last_names = [fake.last_name() for _ in range(NAMES)]
+        self.now = timezone.now()
+        self.start = self.now - timedelta(days=options['days'])
+
+        total = time.perf_counter()
+        indexes = drop_indexes(User, Group, Post, Comment, Follow)
+        try:
+            with self.stage('пользователи'):
+                users = self.seed_users(options['users'])
+            with self.stage('группы'):
+                groups = self.seed_groups(options['groups'])
+            # Порядок популярности авторов по постам и по подписчикам
+            # разный: плодовитый автор не обязательно популярен.
+            weights = list(accumulate(
+                1 / (rank + 1) ** options['skew'] for rank in range(len(users))
+            ))
+            writers = random.sample(users, len(users))
+            stars = random.sample(users, len(users))
+            with self.stage('посты'):
+                posts = self.seed_posts(options['posts'], writers, weights,
+                                        groups)
+            with self.stage('комментарии'):
+                self.seed_comments(options['comments'], writers, weights,
+                                   posts)
+            with self.stage('подписки'):
+                self.seed_follows(options['follows'], users, stars, weights)
+        finally:
+            with self.stage('индексы'):
+                restore_indexes(indexes)
+        with self.stage('счётчики'):
+            self.seed_counters(users, posts)
+        if not options['skip_timeline']:
+            with self.stage('ленты'):
+                self.seed_timeline(users)
+        if options['with_search'] and posts[0] is not None:
+            with self.stage('поисковый индекс'):
+                search.index_range(*posts,
+                                   batch_size=options['batch_size'])
+        cache.delete(feed.PULLED_AUTHORS_KEY)
+        caching.bump('global')
+        listing.bump('global')
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.perf_counter() - total:.1f} с'
+        ))
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        yield
+        self.stdout.write(f'{name}: {time.perf_counter() - start:.1f} с')
+
+    def insert(self, model, fields, rows):
+        """Вставка кортежей пачками через executemany, минуя модели."""
+        meta = model._meta
+        quote = connection.ops.quote_name
+        columns = ', '.join(quote(meta.get_field(name).column)
+                            for name in fields)
+        placeholders = ', '.join(['%s'] * len(fields))
+        sql = (f'INSERT INTO {quote(meta.db_table)} ({columns}) '
+               f'VALUES ({placeholders})')
+        count = 0
+        with connection.cursor() as cursor:
+            for chunk in chunked(rows, self.options['batch_size']):
+                with transaction.atomic():
+                    cursor.executemany(sql, chunk)
+                count += len(chunk)
+        return count
+
+    def moment(self, fraction):
+        """Время внутри периода генерации, fraction от 0 до 1."""
+        return connection.ops.adapt_datetimefield_value(
+            self.start + (self.now - self.start) * fraction
+        )
+
+    def text(self, low, high):
+        return ' '.join(random.sample(self.sentences,
+                                      random.randint(low, high)))
+
+    def seed_users(self, count):
+        password = make_password(self.options['password'])
+        joined = self.moment(0)
+        self.insert(User, (
+            'password', 'is_superuser', 'username', 'first_name',
+            'last_name', 'email', 'is_staff', 'is_active', 'date_joined',
+        ), (
+            (password, False, f'{self.prefix}-{number}',
+             random.choice(self.first_names), random.choice(self.last_names),
+             '', False, True, joined)
+            for number in range(count)
+        ))
+        return list(User.objects
+                    .filter(username__startswith=f'{self.prefix}-')
+                    .order_by('pk')
+                    .values_list('pk', flat=True))
+
+    def seed_groups(self, count):
+        Group.objects.bulk_create(
+            Group(title=self.sentences[number].rstrip('.')[:200],
+                  slug=f'{self.prefix}-group-{number}',
+                  description=self.text(1, 3))
+            for number in range(count)
+        )
+        return list(Group.objects
+                    .filter(slug__startswith=f'{self.prefix}-group-')
+                    .values_list('pk', flat=True))
+
+    def seed_posts(self, count, writers, weights, groups):
+        """Возвращает диапазон id вставленных постов."""
+        before = Post.objects.aggregate(last=Max('pk'))['last'] or 0
+
+        def rows():
+            for offset in range(0, count, self.options['batch_size']):
+                size = min(self.options['batch_size'], count - offset)
+                authors = random.choices(writers, cum_weights=weights,
+                                         k=size)
+                for number, author in enumerate(authors, offset):
+                    group = (random.choice(groups)
+                             if groups and random.random() < 0.5 else None)
+                    # Посты идут по времени в порядке id, как в жизни.
+                    yield (self.text(1, 5), author, group,
+                           self.moment(number / count), '', 0)
+
+        self.insert(Post, ('text', 'author', 'group', 'created', 'image',
+                           'comments_count'), rows())
+        span = Post.objects.filter(pk__gt=before).aggregate(
+            first=Min('pk'), last=Max('pk')
+        )
+        return span['first'], span['last']
+
+    def seed_comments(self, count, writers, weights, posts):
+        first, last = posts
+        if first is None:
+            return
+        span = last - first + 1
+
+        def rows():
+            for offset in range(0, count, self.options['batch_size']):
+                size = min(self.options['batch_size'], count - offset)
+                authors = random.choices(writers, cum_weights=weights,
+                                         k=size)
+                for author in authors:
+                    # Свежие посты обсуждают чаще старых.
+                    position = span - 1 - int(span * random.random() ** 2)
+                    created = position / span
+                    created += (1 - created) * random.random()
+                    yield (first + position, author, self.text(1, 2),
+                           self.moment(created))
+
+        self.insert(Comment, ('post', 'author', 'text', 'created'), rows())
+
+    def seed_follows(self, average, users, stars, weights):
+        limit = len(users) - 1
+        scale = average * (FOLLOWS_ALPHA - 1) / FOLLOWS_ALPHA
+
+        def rows():
+            for user in users:
+                wanted = min(limit,
+                             int(random.paretovariate(FOLLOWS_ALPHA) * scale))
+                authors = set()
+                # У популярных авторов выборка часто повторяется,
+                # поэтому число попыток ограничено.
+                for _ in range(wanted * 3):
+                    if len(authors) >= wanted:
+                        break
+                    authors.update(random.choices(
+                        stars, cum_weights=weights, k=wanted - len(authors)
+                    ))
+                    authors.discard(user)
+                for author in authors:
+                    yield user, author
+
+        self.insert(Follow, ('user', 'author'), rows())
+
+    def seed_counters(self, users, posts):
+        first_user = users[0] if users else 0
+
+        def grouped(queryset, field):
+            return dict(queryset
+                        .filter(**{f'{field}__gte': first_user})
+                        .order_by()
+                        .values_list(field)
+                        .annotate(count=Count('pk')))
+
+        written = grouped(Post.objects, 'author')
+        followers = grouped(Follow.objects, 'author')
+        following = grouped(Follow.objects, 'user')
+        self.insert(UserStats, (
+            'user', 'posts_count', 'followers_count', 'following_count',
+        ), (
+            (user, written.get(user, 0), followers.get(user, 0),
+             following.get(user, 0))
+            for user in users
+        ))
+        first, last = posts
+        if first is None:
+            return
+        comments = (Comment.objects
+                    .filter(post=OuterRef('pk'))
+                    .order_by()
+                    .values('post')
+                    .annotate(count=Count('pk'))
+                    .values('count'))
+        with transaction.atomic():
+            Post.objects.filter(pk__range=(first, last)).update(
+                comments_count=Coalesce(Subquery(comments), 0)
+            )
+
+    def seed_timeline(self, users):
+        # Те же строки, что у feed.backfill, но одним INSERT ... SELECT
+        # внутри базы, без выгрузки в Python.
+        follows = Follow.objects.filter(user__gte=users[0] if users else 0)
+        sql, params = feed.backfill_rows(follows).query.sql_with_params()
+        quote = connection.ops.quote_name
+        meta = Timeline._meta
+        columns = ', '.join(quote(meta.get_field(name).column)
+                            for name in ('user', 'post', 'created'))
+        indexes = drop_indexes(Timeline)
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(
+                    f'INSERT INTO {quote(meta.db_table)} ({columns}) {sql}',
+                    params,
+                )
+        finally:
+            restore_indexes(indexes)
@@ -0,0 +1,77 @@
+# Generated by Django 2.2.16 on 2026-10-17 23:34
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def count_comments(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    comments = (Comment.objects
+                .filter(post=OuterRef('pk'))
+                .values('post')
+                .annotate(count=Count('pk'))
+                .values('count'))
+    Post.objects.update(comments_count=Coalesce(Subquery(comments), 0))
+
+
+def count_users(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Post = apps.get_model('posts', 'Post')
+    Follow = apps.get_model('posts', 'Follow')
+    UserStats = apps.get_model('posts', 'UserStats')
+
+    def counted(queryset, field):
+        return Coalesce(Subquery(queryset
+                                 .filter(**{field: OuterRef('pk')})
+                                 .values(field)
+                                 .annotate(count=Count('pk'))
+                                 .values('count')), 0)
+
+    rows = (User.objects
+            .annotate(posts_count=counted(Post.objects, 'author'),
+                      followers_count=counted(Follow.objects, 'author'),
+                      following_count=counted(Follow.objects, 'user'))
+            .values_list('pk', 'posts_count', 'followers_count',
+                         'following_count')
+            .iterator())
+    UserStats.objects.bulk_create(
+        (UserStats(user_id=pk, posts_count=posts, followers_count=followers,
+                   following_count=following)
+         for pk, posts, followers, following in rows),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0015_list_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Постов')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='Подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Подписок')),
+            ],
+            options={
+                'verbose_name': 'Счётчики пользователя',
+                'verbose_name_plural': 'Счётчики пользователей',
+            },
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Число комментариев'),
+        ),
+        migrations.RunPython(count_comments, migrations.RunPython.noop),
+        migrations.RunPython(count_users, migrations.RunPython.noop),
+    ]
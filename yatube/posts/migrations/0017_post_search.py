@@ -0,0 +1,46 @@
+# Generated by Django 2.2.16 on 2026-10-17 23:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+import posts.models
+from posts.stemmer import tokens
+
+
+def fill_index(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    PostSearch = apps.get_model('posts', 'PostSearch')
+    PostSearch.objects.bulk_create(
+        (PostSearch(post_id=pk, body=' '.join(tokens(text)))
+         for pk, text in Post.objects.values_list('pk', 'text').iterator()),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostSearch',
+            fields=[
+                ('post', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search', serialize=False, to='posts.Post', verbose_name='Пост')),
+                ('body', posts.models.SearchField(verbose_name='Основы слов')),
+            ],
+            options={
+                'verbose_name': 'Поисковый индекс поста',
+                'verbose_name_plural': 'Поисковый индекс постов',
+                'db_table': 'posts_post_fts',
+                'managed': False,
+            },
+        ),
+        # Основы слов готовит Python, токенизатор только делит по словам.
+        migrations.RunSQL(
+            "CREATE VIRTUAL TABLE posts_post_fts USING fts5("
+            "body, tokenize='unicode61 remove_diacritics 2')",
+            'DROP TABLE posts_post_fts',
+        ),
+        migrations.RunPython(fill_index, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,9 @@
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models.expressions import RawSQL
 
 from core.models import CreatedModel
+from .stemmer import tokens
 
 
 User = get_user_model()
@@ -20,6 +22,53 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    """Профили загрузки постов под конкретные шаблоны."""
+    FEED_FIELDS = (
+        'text', 'created', 'image', 'author', 'group',
+        'author__username', 'author__first_name', 'author__last_name',
+        'group__slug',
+    )
+    DETAIL_FIELDS = FEED_FIELDS + (
+        'group__title', 'comments_count', 'author__stats__posts_count',
+    )
+    COMMENT_FIELDS = ('text', 'created', 'post', 'author', 'author__username')
+
+    def for_feed(self):
+        """Карточки постов в списках: автор и группа одним запросом."""
+        return self.select_related('author', 'group').only(*self.FEED_FIELDS)
+
+    def for_detail(self):
+        """Страница поста: автор, группа и комментарии с авторами."""
+        comments = (Comment.objects
+                    .select_related('author')
+                    .only(*self.COMMENT_FIELDS))
+        return (self
+                .select_related('author__stats', 'group')
+                .only(*self.DETAIL_FIELDS)
+                .prefetch_related(models.Prefetch('comments', comments)))
+
+    def search(self, query):
+        """
+        Посты, содержащие все слова запроса в любой форме,
+        по убыванию релевантности BM25 (поле rank).
+        """
+        words = tokens(query)
+        if not words:
+            return self.none()
+        # Слова запроса — только буквы и цифры, кавычки их экранируют.
+        expression = ' '.join(f'"{word}"' for word in words)
+        # Скрытый столбец rank FTS5 — это bm25(): меньше значит лучше.
+        # В отличие от функции bm25() он доступен и в подзапросе COUNT.
+        return (self
+                .filter(search__body__match=expression)
+                .annotate(rank=RawSQL(
+                    f'-"{PostSearch._meta.db_table}"."rank"', (),
+                    output_field=models.FloatField(),
+                ))
+                .order_by('-rank', '-pk'))
+
+
 class Post(CreatedModel):
     text = models.TextField(
         verbose_name='Текст поста',
@@ -46,11 +95,27 @@ class Post(CreatedModel):
         blank=True,
         null=True
     )
+    comments_count = models.PositiveIntegerField(
+        verbose_name='Число комментариев',
+        default=0,
+        editable=False,
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
         ordering = ('-created',)
+        indexes = (
+            models.Index(fields=('created',), name='post_created_idx'),
+            models.Index(
+                fields=('author', 'created'), name='post_author_created_idx'
+            ),
+            models.Index(
+                fields=('group', 'created'), name='post_group_created_idx'
+            ),
+        )
 
     def __str__(self):
         return self.text[:15]
@@ -77,6 +142,12 @@ class Comment(CreatedModel):
     class Meta:
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        ordering = ('created',)
+        indexes = (
+            models.Index(
+                fields=('post', 'created'), name='comment_post_created_idx'
+            ),
+        )
 
 
 class Follow(models.Model):
@@ -96,6 +167,100 @@ class Follow(models.Model):
     class Meta:
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
+        indexes = (
+            models.Index(
+                fields=('author', 'user'), name='follow_author_user_idx'
+            ),
+        )
         constraints = (models.UniqueConstraint(
             fields=('user', 'author'), name='unique appversion'
-        ))
+        ),)
+
+
+class Timeline(models.Model):
+    """Материализованная лента подписок пользователя."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Пользователь',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Пост',
+    )
+    # Копия Post.created: лента читается по индексу (user, created)
+    # без сортировки объединения с таблицей постов.
+    created = models.DateTimeField(
+        'Дата создания поста',
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        indexes = (
+            models.Index(
+                fields=('user', 'created', 'post'),
+                name='timeline_user_created_post'
+            ),
+        )
+        constraints = (models.UniqueConstraint(
+            fields=('user', 'post'), name='unique timeline post'
+        ),)
+
+
+class UserStats(models.Model):
+    """Счётчики пользователя, обновляются вместе с постами и подписками."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь',
+    )
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+
+
+class SearchField(models.TextField):
+    """Столбец полнотекстового индекса FTS5."""
+
+
+@SearchField.register_lookup
+class Match(models.Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+
+class PostSearch(models.Model):
+    """
+    Полнотекстовый индекс постов: виртуальная таблица FTS5 с основами
+    слов текста, rowid совпадает с id поста. Заполняется сигналами.
+    """
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column='rowid',
+        db_constraint=False,
+        related_name='search',
+        verbose_name='Пост',
+    )
+    body = SearchField('Основы слов')
+
+    class Meta:
+        managed = False
+        db_table = 'posts_post_fts'
+        verbose_name = 'Поисковый индекс поста'
+        verbose_name_plural = 'Поисковый индекс постов'
@@ -0,0 +1,68 @@
+from django.db import connection, transaction
+
+from .models import Post, PostSearch
+from .stemmer import tokens
+
+
+def indexed_text(text):
+    """Текст для индекса: основы слов через пробел."""
+    return ' '.join(tokens(text))
+
+
+def index_post(post_id, text):
+    PostSearch.objects.filter(post_id=post_id).delete()
+    PostSearch.objects.create(post_id=post_id, body=indexed_text(text))
+
+
+def unindex_post(post_id):
+    PostSearch.objects.filter(post_id=post_id).delete()
+
+
+def _index_batches(posts, batch_size):
+    """
+    Индексирует посты выборки пачками по возрастанию id, каждая пачка
+    в своей транзакции; возвращает их число.
+    """
+    count = 0
+    last = 0
+    while True:
+        rows = list(posts
+                    .filter(pk__gt=last)
+                    .order_by('pk')
+                    .values_list('pk', 'text')[:batch_size])
+        if not rows:
+            return count
+        with transaction.atomic():
+            PostSearch.objects.bulk_create(
+                PostSearch(post_id=pk, body=indexed_text(text))
+                for pk, text in rows
+            )
+        count += len(rows)
+        last = rows[-1][0]
+
+
+def rebuild(batch_size=500):
+    """Заново строит индекс по всем постам, возвращает их число."""
+    PostSearch.objects.all().delete()
+    count = _index_batches(Post.objects.all(), batch_size)
+    optimize()
+    return count
+
+
+def index_range(first, last, batch_size=500):
+    """
+    Индексирует посты с id от first до last, ещё не бывшие в индексе:
+    каждая пачка фиксируется отдельно, как массовая вставка.
+    """
+    count = _index_batches(
+        Post.objects.filter(pk__gte=first, pk__lte=last), batch_size,
+    )
+    optimize()
+    return count
+
+
+def optimize():
+    # Слияние сегментов FTS5 ускоряет последующие запросы.
+    table = PostSearch._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {table} ({table}) VALUES ('optimize')")
@@ -0,0 +1,218 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import (
+    caching, counters, feed, follows, listing, search, thumbnails,
+)
+from .models import Comment, Follow, Group, Post, UserStats
+
+
+User = get_user_model()
+
+
+def _now_and_on_commit(function, *args):
+    """
+    Сброс кэша сразу и ещё раз после фиксации транзакции: чтение,
+    начатое до фиксации, могло положить в кэш старые данные уже под
+    новым поколением или после удаления объекта.
+    """
+    function(*args)
+    transaction.on_commit(lambda: function(*args))
+
+
+@receiver(post_save, sender=Post)
+def push_new_post(sender, instance, created, **kwargs):
+    """Новый пост попадает в ленты подписчиков автора."""
+    if created:
+        feed.push_post(instance)
+
+
+@receiver(post_save, sender=Follow)
+def push_followed_author(sender, instance, created, **kwargs):
+    if created:
+        feed.push_author(instance.user, instance.author)
+
+
+@receiver(post_delete, sender=Follow)
+def drop_unfollowed_author(sender, instance, **kwargs):
+    feed.drop_author(instance.user, instance.author)
+
+
+@receiver(post_save, sender=Post)
+def pregenerate_thumbnails(sender, instance, update_fields=None, **kwargs):
+    """Миниатюры картинки создаются в фоне после фиксации транзакции."""
+    if instance.image and (update_fields is None or 'image' in update_fields):
+        name = instance.image.name
+        transaction.on_commit(lambda: thumbnails.schedule(name))
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous_group(sender, instance, **kwargs):
+    """Смена группы должна сбросить страницы старой группы."""
+    instance._previous_group_id = (
+        Post.objects
+        .filter(pk=instance.pk)
+        .values_list('group', flat=True)
+        .first()
+    ) if instance.pk else None
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_pages(sender, instance, **kwargs):
+    group_ids = {instance.group_id,
+                 getattr(instance, '_previous_group_id', None)}
+    groups = Group.objects.filter(pk__in=group_ids - {None})
+    _now_and_on_commit(
+        caching.bump,
+        'global',
+        f'post:{instance.pk}',
+        f'author:{instance.author.username}',
+        *(f'group:{slug}' for slug in groups.values_list('slug', flat=True)),
+    )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_lists(sender, instance, created=True, **kwargs):
+    """
+    Списки id меняются, только когда пост появился, удалён или сменил
+    группу; правка сбрасывает лишь сам объект поста.
+    """
+    _now_and_on_commit(listing.forget, instance)
+    previous_group = getattr(instance, '_previous_group_id', None)
+    if not created and previous_group == instance.group_id:
+        return
+    groups = Group.objects.filter(
+        pk__in={instance.group_id, previous_group} - {None}
+    )
+    _now_and_on_commit(
+        listing.bump,
+        'global',
+        f'author:{instance.author.username}',
+        *(f'group:{slug}' for slug in groups.values_list('slug', flat=True)),
+    )
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def forget_cached_object(sender, instance, **kwargs):
+    _now_and_on_commit(listing.forget, instance)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_pages(sender, instance, created, update_fields=None,
+                          **kwargs):
+    """
+    Имя автора выводится на карточках его постов и в профиле; вход
+    сохраняет только last_login и страниц не сбрасывает.
+    """
+    if created or update_fields is not None and not (
+            set(update_fields) & {'username', 'first_name', 'last_name'}):
+        return
+    slugs = (Group.objects
+             .filter(posts__author=instance)
+             .distinct()
+             .values_list('slug', flat=True))
+    _now_and_on_commit(
+        caching.bump,
+        'global',
+        f'author:{instance.username}',
+        *(f'group:{slug}' for slug in slugs),
+    )
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_pages(sender, instance, **kwargs):
+    _now_and_on_commit(caching.bump, f'post:{instance.post_id}')
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_pages(sender, instance, **kwargs):
+    _now_and_on_commit(
+        caching.bump, f'author:{instance.author.username}'
+    )
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def forget_following(sender, instance, **kwargs):
+    _now_and_on_commit(follows.forget_following, instance.user_id)
+
+
+@receiver(post_save, sender=Group)
+def invalidate_group_pages(sender, instance, **kwargs):
+    _now_and_on_commit(caching.bump, f'group:{instance.slug}')
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, **kwargs):
+    """Строка счётчиков создаётся вместе с пользователем."""
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def count_new_post(sender, instance, created, **kwargs):
+    if created:
+        counters.change_user(instance.author_id, posts_count=1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counters.change_user(instance.author_id, posts_count=-1)
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, **kwargs):
+    if created:
+        counters.change_comments(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    counters.change_comments(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_new_follow(sender, instance, created, **kwargs):
+    if created:
+        counters.change_user(instance.author_id, followers_count=1)
+        counters.change_user(instance.user_id, following_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    counters.change_user(instance.author_id, followers_count=-1)
+    counters.change_user(instance.user_id, following_count=-1)
+
+
+# После счётчиков: смену доставки видно по обновлённому числу подписчиков.
+@receiver(post_save, sender=Follow)
+def rebalance_followed_author(sender, instance, created, **kwargs):
+    if created and feed.rebalance_author(instance.author_id, 1):
+        _now_and_on_commit(feed.forget_pulled_authors)
+
+
+@receiver(post_delete, sender=Follow)
+def rebalance_unfollowed_author(sender, instance, **kwargs):
+    if feed.rebalance_author(instance.author_id, -1):
+        _now_and_on_commit(feed.forget_pulled_authors)
+
+
+@receiver(post_save, sender=Post)
+def index_post_text(sender, instance, update_fields=None, **kwargs):
+    """Поисковый индекс обновляется вместе с текстом поста."""
+    if update_fields is None or 'text' in update_fields:
+        search.index_post(instance.pk, instance.text)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post_text(sender, instance, **kwargs):
+    search.unindex_post(instance.pk)
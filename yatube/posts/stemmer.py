@@ -0,0 +1,145 @@
+"""
+Стеммер русского языка по алгоритму Snowball (Портер).
+
+Модуль без зависимостей от Django: им пользуются и миграции.
+"""
+import re
+from functools import lru_cache
+
+
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND = (
+    ('ившись', 'ывшись', 'ивши', 'ывши', 'ив', 'ыв'),
+    ('вшись', 'вши', 'в'),
+)
+REFLEXIVE = ('ся', 'сь')
+ADJECTIVE = (
+    'ими', 'ыми', 'его', 'ого', 'ему', 'ому', 'ее', 'ие', 'ые', 'ое',
+    'ей', 'ий', 'ый', 'ой', 'ем', 'им', 'ым', 'ом', 'их', 'ых', 'ую',
+    'юю', 'ая', 'яя', 'ою', 'ею',
+)
+PARTICIPLE = (
+    ('ивш', 'ывш', 'ующ'),
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+)
+VERB = (
+    ('ейте', 'уйте', 'ила', 'ыла', 'ена', 'ите', 'или', 'ыли', 'ило',
+     'ыло', 'ено', 'ует', 'уют', 'ены', 'ить', 'ыть', 'ишь', 'ей', 'уй',
+     'ил', 'ыл', 'им', 'ым', 'ен', 'ят', 'ит', 'ыт', 'ую', 'ю'),
+    ('ете', 'йте', 'ешь', 'нно', 'ла', 'на', 'ли', 'ем', 'ло', 'но',
+     'ет', 'ют', 'ны', 'ть', 'й', 'л', 'н'),
+)
+NOUN = (
+    'иями', 'ями', 'ами', 'ией', 'иям', 'ием', 'иях', 'ев', 'ов', 'ие',
+    'ье', 'еи', 'ии', 'ей', 'ой', 'ий', 'ям', 'ем', 'ам', 'ом', 'ах',
+    'ях', 'ию', 'ью', 'ия', 'ья', 'а', 'е', 'и', 'й', 'о', 'у', 'ы',
+    'ь', 'ю', 'я',
+)
+SUPERLATIVE = ('ейше', 'ейш')
+DERIVATIONAL = ('ость', 'ост')
+
+WORD = re.compile(r'\w+')
+
+
+def _longest_first(endings):
+    return tuple(sorted(endings, key=len, reverse=True))
+
+
+# Окончания проверяются от длинных к коротким.
+PERFECTIVE_GERUND = tuple(map(_longest_first, PERFECTIVE_GERUND))
+PARTICIPLE = tuple(map(_longest_first, PARTICIPLE))
+VERB = tuple(map(_longest_first, VERB))
+REFLEXIVE, ADJECTIVE, NOUN, SUPERLATIVE, DERIVATIONAL = map(
+    _longest_first, (REFLEXIVE, ADJECTIVE, NOUN, SUPERLATIVE, DERIVATIONAL)
+)
+
+
+def _regions(word):
+    """Начала областей RV и R2."""
+    rv = r1 = r2 = len(word)
+    for position, letter in enumerate(word):
+        if letter in VOWELS:
+            rv = position + 1
+            break
+    for position in range(1, len(word)):
+        if word[position - 1] in VOWELS and word[position] not in VOWELS:
+            r1 = position + 1
+            break
+    for position in range(r1 + 1, len(word)):
+        if word[position - 1] in VOWELS and word[position] not in VOWELS:
+            r2 = position + 1
+            break
+    return rv, r2
+
+
+def _strip(word, start, endings, after_a=False):
+    """Отрезает самое длинное окончание, целиком лежащее после start."""
+    for ending in endings:
+        if not word.endswith(ending):
+            continue
+        cut = len(word) - len(ending)
+        if after_a:
+            # Окончание группы 1 следует за «а» или «я» внутри области.
+            if cut - 1 < start or word[cut - 1] not in 'ая':
+                continue
+        elif cut < start:
+            continue
+        return word[:cut]
+    return None
+
+
+def _strip_groups(word, start, groups):
+    first, second = groups
+    longest = None
+    for stripped in (_strip(word, start, first),
+                     _strip(word, start, second, after_a=True)):
+        if stripped is not None and (longest is None
+                                     or len(stripped) < len(longest)):
+            longest = stripped
+    return longest
+
+
+def _adjectival(word, start):
+    stripped = _strip(word, start, ADJECTIVE)
+    if stripped is None:
+        return None
+    participle = _strip_groups(stripped, start, PARTICIPLE)
+    return stripped if participle is None else participle
+
+
+@lru_cache(maxsize=65536)
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    rv, r2 = _regions(word)
+
+    stripped = _strip_groups(word, rv, PERFECTIVE_GERUND)
+    if stripped is None:
+        word = _strip(word, rv, REFLEXIVE) or word
+        for strip in (lambda: _adjectival(word, rv),
+                      lambda: _strip_groups(word, rv, VERB),
+                      lambda: _strip(word, rv, NOUN)):
+            stripped = strip()
+            if stripped is not None:
+                break
+    word = stripped if stripped is not None else word
+
+    if word.endswith('и') and len(word) - 1 >= rv:
+        word = word[:-1]
+    word = _strip(word, r2, DERIVATIONAL) or word
+
+    if word.endswith('нн') and len(word) - 1 >= rv:
+        return word[:-1]
+    stripped = _strip(word, rv, SUPERLATIVE)
+    if stripped is not None:
+        word = stripped
+        if word.endswith('нн'):
+            word = word[:-1]
+    elif word.endswith('ь') and len(word) - 1 >= rv:
+        word = word[:-1]
+    return word
+
+
+def tokens(text):
+    """Основы слов текста в нижнем регистре."""
+    return [stem(word) for word in WORD.findall(text)]
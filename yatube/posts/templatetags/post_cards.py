@@ -0,0 +1,15 @@
+from django import template
+
+from posts import cards
+
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def post_cards(context, posts, follow_buttons=False):
+    """
+    Список карточек постов страницы из общего кэша фрагментов;
+    с follow_buttons под каждой — кнопка подписки на автора.
+    """
+    return cards.render(context, posts, follow_buttons)
@@ -0,0 +1,23 @@
+from django import template
+
+from posts import thumbnails
+
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_thumbnail(post, variant='card'):
+    """
+    Готовая миниатюра поста или None; недостающая ставится в очередь.
+    Разрешённые заранее миниатюры (thumbnails.attach) берутся без запросов.
+    """
+    if not post.image:
+        return None
+    resolved = getattr(post, 'thumbnails', None)
+    if resolved is not None:
+        return resolved[variant]
+    thumbnail = thumbnails.ready_thumbnail(post.image.name, variant)
+    if thumbnail is None:
+        thumbnails.schedule(post.image.name)
+    return thumbnail
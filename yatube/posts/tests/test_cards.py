@@ -0,0 +1,85 @@
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from core.metrics import registry
+from posts import cards
+from posts.models import Group, Post
+
+
+User = get_user_model()
+
+
+def card_counter(result):
+    return dict(
+        ((name, tuple(labels)), value) for name, labels, value
+        in registry.snapshot()['counters']
+    ).get(('yatube_fragment_cache_total', ('post_card', result)), 0)
+
+
+class PostCardCacheTests(TestCase):
+    """Карточки постов рисуются один раз на все списки."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='Описание'
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа', slug='other-slug', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, text='Тестовый пост', group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(PostCardCacheTests.author)
+
+    def test_card_is_shared_between_list_pages(self):
+        """Карточка с главной берётся из кэша на странице группы."""
+        hits, misses = card_counter('hit'), card_counter('miss')
+
+        index = self.client.get(reverse('posts:index'))
+        group = self.client.get(
+            reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        )
+
+        self.assertContains(index, 'Тестовый пост')
+        self.assertContains(group, 'Тестовый пост')
+        self.assertEqual(card_counter('miss') - misses, 1)
+        self.assertEqual(card_counter('hit') - hits, 1)
+
+    def test_edit_changes_card(self):
+        """Правка текста и группы даёт новую карточку."""
+        self.client.get(reverse('posts:index'))
+
+        self.author_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            {'text': 'Исправленный пост', 'group': self.other_group.pk},
+        )
+        response = self.client.get(reverse('posts:index'))
+
+        self.assertContains(response, 'Исправленный пост')
+        self.assertContains(response, reverse(
+            'posts:group_list', kwargs={'slug': self.other_group.slug}
+        ))
+        self.assertNotContains(response, 'Тестовый пост')
+
+    def test_ready_thumbnail_changes_version(self):
+        """Готовая миниатюра заменяет закэшированную заглушку."""
+        post = Post.objects.for_feed().get(pk=self.post.pk)
+        post.image = 'posts/small.gif'
+        post.thumbnails = {'card': None}
+        placeholder = cards.version(post)
+
+        post.thumbnails = {'card': SimpleNamespace(name='cache/small.jpg')}
+
+        self.assertNotEqual(cards.version(post), placeholder)
@@ -0,0 +1,155 @@
+import hashlib
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import caching
+from posts.caching import PAGE_KEY, generations
+from posts.models import Follow, Post
+
+
+User = get_user_model()
+
+
+class ConditionalGetTests(TestCase):
+    """Неизменные страницы отвечают 304 без рендеринга."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(author=cls.author, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(ConditionalGetTests.reader)
+
+    def test_guest_revalidates_with_etag_and_date(self):
+        """Гостю 304 и по ETag, и по дате изменения; страница без запросов."""
+        url = reverse('posts:index')
+        response = self.guest_client.get(url)
+
+        with CaptureQueriesContext(connection) as context:
+            by_etag = self.guest_client.get(
+                url, HTTP_IF_NONE_MATCH=response['ETag']
+            )
+        by_date = self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+
+        self.assertEqual(by_etag.status_code, 304)
+        self.assertEqual(by_date.status_code, 304)
+        self.assertEqual(by_etag['ETag'], response['ETag'])
+        self.assertFalse(any(
+            'posts_post' in query['sql']
+            for query in context.captured_queries
+        ))
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertIn('Cookie', response['Vary'])
+
+    def test_new_post_changes_validators(self):
+        """Новый пост меняет ETag главной."""
+        url = reverse('posts:index')
+        response = self.guest_client.get(url)
+
+        Post.objects.create(author=self.author, text='Новый пост')
+        after = self.guest_client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+        self.assertEqual(after.status_code, 200)
+        self.assertNotEqual(after['ETag'], response['ETag'])
+        self.assertContains(after, 'Новый пост')
+
+    def test_author_name_change_changes_validators(self):
+        """Новое имя автора меняет ETag страниц с его постами."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', args=(self.author.username,)),
+            reverse('posts:post_detail', args=(self.post.pk,)),
+        )
+        before = {url: self.guest_client.get(url) for url in urls}
+
+        author = User.objects.get(pk=self.author.pk)
+        author.first_name = 'Лев'
+        author.save()
+
+        for url in urls:
+            with self.subTest(url=url):
+                after = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=before[url]['ETag']
+                )
+                self.assertEqual(after.status_code, 200)
+                self.assertContains(after, 'Лев')
+
+    def test_login_keeps_validators(self):
+        """Вход автора не сбрасывает страницы."""
+        url = reverse('posts:index')
+        response = self.guest_client.get(url)
+
+        Client().force_login(self.author)
+        after = self.guest_client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+        self.assertEqual(after.status_code, 304)
+
+    def test_stale_page_keeps_its_own_etag(self):
+        """Прежняя страница на время пересчёта не получает новый ETag."""
+        url = reverse('posts:index')
+        before = self.guest_client.get(url)
+        Post.objects.create(author=self.author, text='Новый пост')
+        key = PAGE_KEY.format(
+            view='index', request=hashlib.md5(url.encode()).hexdigest()
+        )
+
+        self.assertTrue(caching._acquire(key))
+        stale = self.guest_client.get(url)
+        caching._release(key)
+        after = self.guest_client.get(url, HTTP_IF_NONE_MATCH=stale['ETag'])
+
+        self.assertNotContains(stale, 'Новый пост')
+        self.assertEqual(stale['ETag'], before['ETag'])
+        self.assertFalse(stale.has_header('Last-Modified'))
+        self.assertEqual(after.status_code, 200)
+        self.assertContains(after, 'Новый пост')
+
+    def test_logged_in_page_is_private_and_personal(self):
+        """У вошедшего свой ETag, без даты, и он меняется с подпиской."""
+        url = reverse('posts:profile', kwargs={'username': 'author'})
+        guest = self.guest_client.get(url)
+        response = self.reader_client.get(url)
+
+        with_guest_etag = self.reader_client.get(
+            url, HTTP_IF_NONE_MATCH=guest['ETag']
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+        after_follow = self.reader_client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+
+        self.assertEqual(with_guest_etag.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertFalse(response.has_header('Last-Modified'))
+        self.assertEqual(after_follow.status_code, 200)
+        self.assertContains(after_follow, 'Отписаться')
+
+
+class CommitInvalidationTests(TransactionTestCase):
+    def test_generation_bumped_again_after_commit(self):
+        """Поколение меняется и при записи, и после фиксации."""
+        author = User.objects.create_user(username='author')
+        before, _ = generations(['global'])
+
+        with transaction.atomic():
+            Post.objects.create(author=author, text='Тестовый пост')
+            # Чтение до фиксации кэширует страницу под этим поколением.
+            inside, _ = generations(['global'])
+        after, _ = generations(['global'])
+
+        self.assertNotEqual(inside, before)
+        self.assertNotEqual(after, inside)
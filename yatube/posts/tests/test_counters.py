@@ -0,0 +1,88 @@
+from io import StringIO
+
+from django.contrib.admin.sites import site
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase
+
+from posts.models import Comment, Follow, Post, UserStats
+
+
+User = get_user_model()
+
+
+class CounterTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_counters_follow_changes(self):
+        """Счётчики меняются вместе с постами, комментариями и подписками."""
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Пост')
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='Комментарий'
+        )
+
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+
+        comment.delete()
+        follow.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+        post.delete()
+        self.assertEqual(self.stats(self.author).posts_count, 0)
+
+    def test_admin_save_keeps_comments_count(self):
+        """Правка поста в админке не затирает счётчик комментариев."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        request = RequestFactory().post('/admin/posts/post/')
+        request.user = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        admin = site._registry[Post]
+        stale = Post.objects.get(pk=post.pk)
+        Comment.objects.create(
+            post=post, author=self.reader, text='Комментарий'
+        )
+        form = admin.get_form(request, stale)(
+            data={'text': 'Новый текст', 'author': self.author.pk},
+            instance=stale,
+        )
+
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertNotIn('comments_count', form.fields)
+        admin.save_model(request, form.save(commit=False), form, True)
+
+        post.refresh_from_db()
+        self.assertEqual(post.text, 'Новый текст')
+        self.assertEqual(post.comments_count, 1)
+
+    def test_recount_stats_repairs_drift(self):
+        """Команда recount_stats возвращает счётчики к реальным значениям."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        Comment.objects.create(
+            post=post, author=self.reader, text='Комментарий'
+        )
+        UserStats.objects.filter(user=self.author).update(posts_count=7)
+        UserStats.objects.filter(user=self.reader).delete()
+        Post.objects.filter(pk=post.pk).update(comments_count=0)
+
+        call_command('recount_stats', stdout=StringIO())
+
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.reader).posts_count, 0)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
@@ -0,0 +1,106 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from posts.models import Follow, Post, Timeline
+
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.follow_index = reverse('posts:follow_index')
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(TimelineTests.reader)
+
+    def test_new_post_pushed_to_followers(self):
+        """Новый пост автора попадает в ленту подписчика."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+
+        self.assertTrue(
+            Timeline.objects.filter(user=self.reader, post=post).exists()
+        )
+        response = self.reader_client.get(self.follow_index)
+        self.assertEqual(list(response.context['page_obj']), [post])
+
+    def test_follow_and_unfollow_update_timeline(self):
+        """Подписка заполняет ленту, отписка очищает её."""
+        post = Post.objects.create(author=self.author, text='Старый пост')
+
+        self.reader_client.get(reverse(
+            'posts:profile_follow', kwargs={'username': self.author.username}
+        ))
+        self.assertTrue(
+            Timeline.objects.filter(user=self.reader, post=post).exists()
+        )
+
+        self.reader_client.get(reverse(
+            'posts:profile_unfollow',
+            kwargs={'username': self.author.username}
+        ))
+        self.assertFalse(Timeline.objects.filter(user=self.reader).exists())
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_pulled_author_read_at_request_time(self):
+        """Посты популярного автора не рассылаются, но видны в ленте."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Звёздный пост')
+
+        self.assertFalse(Timeline.objects.filter(post=post).exists())
+        response = self.reader_client.get(self.follow_index)
+        self.assertEqual(list(response.context['page_obj']), [post])
+
+    def test_backfill_command_rebuilds_timeline(self):
+        """Команда backfill_timeline восстанавливает ленты по подпискам."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = [
+            Post.objects.create(author=self.author, text=f'Пост {number}')
+            for number in range(3)
+        ]
+        Timeline.objects.all().delete()
+
+        call_command('backfill_timeline', '--clear', stdout=StringIO())
+
+        self.assertEqual(
+            set(Timeline.objects.filter(user=self.reader)
+                .values_list('post', flat=True)),
+            {post.pk for post in posts}
+        )
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_author_crossing_limit_rebalanced(self):
+        """Переход порога подписчиков удаляет или дописывает ленты."""
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=self.reader, author=self.author)
+        first = Post.objects.create(author=self.author, text='Первый пост')
+
+        follow = Follow.objects.create(user=other, author=self.author)
+        purged = Timeline.objects.filter(post__author=self.author).exists()
+        second = Post.objects.create(author=self.author, text='Второй пост')
+        pulled = list(
+            self.reader_client.get(self.follow_index).context['page_obj']
+        )
+        follow.delete()
+
+        self.assertFalse(purged)
+        self.assertEqual(pulled, [second, first])
+        self.assertEqual(
+            set(Timeline.objects.filter(user=self.reader)
+                .values_list('post', flat=True)),
+            {first.pk, second.pk},
+        )
+        response = self.reader_client.get(self.follow_index)
+        self.assertEqual(list(response.context['page_obj']), [second, first])
@@ -0,0 +1,96 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Follow, Post
+
+
+User = get_user_model()
+
+
+# Журнал запросов не сбрасывает статистику в базу во время замера.
+@override_settings(QUERY_LOG_FLUSH_INTERVAL=float('inf'))
+class CardFollowButtonTests(TestCase):
+    """Кнопки подписки на карточках по одному множеству подписок."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        for number in range(5):
+            author = User.objects.create_user(username=f'author-{number}')
+            Post.objects.create(author=author, text=f'Пост {number}')
+            if number % 2:
+                Follow.objects.create(user=cls.reader, author=author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def follow_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        return response, [query['sql'] for query in context.captured_queries
+                          if 'posts_follow' in query['sql']]
+
+    def test_buttons_need_one_read_per_page(self):
+        """Подписки всех авторов страницы — один запрос, затем кэш."""
+        response, cold = self.follow_queries(reverse('posts:index'))
+        _, warm = self.follow_queries(reverse('posts:index'))
+
+        self.assertEqual(len(cold), 1, cold)
+        self.assertEqual(warm, [])
+        for number in range(5):
+            action = 'unfollow' if number % 2 else 'follow'
+            with self.subTest(author=number):
+                self.assertContains(response, reverse(
+                    f'posts:profile_{action}',
+                    kwargs={'username': f'author-{number}'},
+                ))
+
+    def test_follow_resets_cached_set(self):
+        """После подписки карточка автора предлагает отписаться."""
+        url = reverse('posts:index')
+        unfollow = reverse(
+            'posts:profile_unfollow', kwargs={'username': 'author-0'}
+        )
+        self.assertNotContains(self.client.get(url), unfollow)
+
+        self.client.get(
+            reverse('posts:profile_follow', kwargs={'username': 'author-0'})
+        )
+
+        self.assertContains(self.client.get(url), unfollow)
+
+    def test_follow_changes_etag(self):
+        """Подписка меняет ETag главной: 304 со старой кнопкой не будет."""
+        url = reverse('posts:index')
+        before = self.client.get(url)
+
+        self.client.get(
+            reverse('posts:profile_follow', kwargs={'username': 'author-0'})
+        )
+        after = self.client.get(url, HTTP_IF_NONE_MATCH=before['ETag'])
+
+        self.assertEqual(after.status_code, 200)
+        self.assertContains(after, reverse(
+            'posts:profile_unfollow', kwargs={'username': 'author-0'}
+        ))
+
+    def test_no_button_on_own_cards(self):
+        """На карточках своих постов кнопки подписки нет."""
+        client = Client()
+        client.force_login(User.objects.get(username='author-0'))
+
+        response = client.get(reverse('posts:index'))
+
+        self.assertNotContains(response, reverse(
+            'posts:profile_follow', kwargs={'username': 'author-0'}
+        ))
+        self.assertContains(response, reverse(
+            'posts:profile_follow', kwargs={'username': 'author-2'}
+        ))
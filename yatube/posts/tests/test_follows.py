@@ -0,0 +1,102 @@
+import threading
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from posts import follows
+from posts.models import Follow, UserStats
+
+
+User = get_user_model()
+
+
+class FollowViewTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        for username in ('first', 'second', 'third'):
+            User.objects.create_user(username=username)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def followers(self, username):
+        return UserStats.objects.get(user__username=username).followers_count
+
+    def test_repeated_follow_is_idempotent(self):
+        """Повторная подписка не падает и не меняет счётчики."""
+        url = reverse('posts:profile_follow', kwargs={'username': 'first'})
+
+        responses = [self.client.get(url) for _ in range(2)]
+
+        self.assertEqual([response.status_code for response in responses],
+                         [302, 302])
+        self.assertEqual(Follow.objects.filter(user=self.reader).count(), 1)
+        self.assertEqual(self.followers('first'), 1)
+
+    def test_follow_many_in_one_request(self):
+        """Пачка подписок пропускает себя и неизвестных авторов."""
+        url = reverse('posts:follow_many')
+
+        self.client.post(url, {'username': [
+            'first', 'second', 'reader', 'missing',
+        ]})
+        followed = set(Follow.objects.filter(user=self.reader)
+                       .values_list('author__username', flat=True))
+        self.client.post(url, {'username': ['first', 'third'],
+                               'action': 'unfollow'})
+        left = set(Follow.objects.filter(user=self.reader)
+                   .values_list('author__username', flat=True))
+
+        self.assertEqual(followed, {'first', 'second'})
+        self.assertEqual(left, {'second'})
+        self.assertEqual(self.followers('first'), 0)
+        self.assertEqual(
+            UserStats.objects.get(user=self.reader).following_count, 1
+        )
+
+    def test_unknown_author_is_not_found(self):
+        """Подписка и отписка от несуществующего автора — 404."""
+        for name in ('posts:profile_follow', 'posts:profile_unfollow'):
+            with self.subTest(name=name):
+                response = self.client.get(
+                    reverse(name, kwargs={'username': 'missing'})
+                )
+                self.assertEqual(response.status_code, 404)
+
+
+class FollowConcurrencyTests(TransactionTestCase):
+    def test_parallel_follow_creates_one_subscription(self):
+        """Параллельные подписки на одного автора дают одну запись."""
+        reader = User.objects.create_user(username='reader')
+        User.objects.create_user(username='author')
+        barrier = threading.Barrier(8)
+        results, errors = [], []
+
+        def click():
+            try:
+                barrier.wait()
+                results.append(follows.follow(reader, ['author']))
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=click) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(
+            sum(result['author'] for result in results), 1
+        )
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(
+            UserStats.objects.get(user__username='author').followers_count, 1
+        )
@@ -1,12 +1,21 @@
 import shutil
 import tempfile
+from concurrent.futures import TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from unittest import mock
 
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase, override_settings
+from django.db import connection
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings,
+)
 from django.urls import reverse
 from django.conf import settings
+from PIL import Image
 
+from posts import images
 from posts.models import Post, Group, Comment
 
 
@@ -14,7 +23,7 @@ User = get_user_model()
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
-@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
 class PostCreateFormTest(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -81,7 +90,7 @@ class PostCreateFormTest(TestCase):
                 text='Тестовый текст',
                 author=self.user,
                 group=self.group,
-                image='posts/small.gif',
+                image='posts/small.png',
             ).exists()
         )
 
@@ -115,6 +124,95 @@ class PostCreateFormTest(TestCase):
             ).exists()
         )
 
+    @staticmethod
+    def upload_jpeg(size):
+        file = BytesIO()
+        Image.new('RGB', size, color=(200, 30, 30)).save(file, 'JPEG')
+        return SimpleUploadedFile(
+            name='photo.jpeg', content=file.getvalue(),
+            content_type='image/jpeg',
+        )
+
+    def test_post_create_image_reencoded(self):
+        """
+        Тестирование перекодирования картинки: большая сторона
+        уменьшается до IMAGE_MAX_SIDE, фото сохраняется в JPEG.
+        """
+        with override_settings(IMAGE_MAX_SIDE=100, IMAGE_WORKERS=0):
+            self.authorized_client.post(
+                reverse(self.create_post),
+                data={'text': 'Большая картинка',
+                      'image': self.upload_jpeg((400, 200))},
+            )
+
+        post = Post.objects.get(text='Большая картинка')
+        self.assertEqual(post.image.name, 'posts/photo.jpg')
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.size, (100, 50))
+
+    def test_post_create_image_pixel_limit(self):
+        """Тестирование отказа в приёме картинки сверх лимита пикселей."""
+        post_count = Post.objects.count()
+
+        with override_settings(IMAGE_MAX_PIXELS=100, IMAGE_WORKERS=0):
+            response = self.authorized_client.post(
+                reverse(self.create_post),
+                data={'text': 'Огромная картинка',
+                      'image': self.upload_jpeg((20, 20))},
+            )
+
+        self.assertEqual(Post.objects.count(), post_count)
+        self.assertFormError(
+            response, 'form', 'image',
+            'Изображение больше 100 пикселей.',
+        )
+
+    def test_post_create_truncated_image(self):
+        """Тестирование отказа в приёме обрезанной картинки."""
+        post_count = Post.objects.count()
+        image = self.upload_jpeg((200, 200))
+        truncated = SimpleUploadedFile(
+            name='photo.jpeg', content=image.read()[:len(image) // 2],
+            content_type='image/jpeg',
+        )
+
+        with override_settings(IMAGE_WORKERS=0):
+            response = self.authorized_client.post(
+                reverse(self.create_post),
+                data={'text': 'Обрезанная картинка', 'image': truncated},
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Post.objects.count(), post_count)
+        self.assertFormError(
+            response, 'form', 'image', 'Не удалось прочитать изображение.',
+        )
+
+    def test_post_create_image_pool_failure(self):
+        """Упавший или зависший пул — ошибка формы, пул пересоздаётся."""
+        for error in (BrokenProcessPool, TimeoutError):
+            with self.subTest(error=error.__name__):
+                pool = mock.Mock()
+                pool.submit.return_value.result.side_effect = error
+                images._executor = pool
+
+                with override_settings(IMAGE_WORKERS=1):
+                    response = self.authorized_client.post(
+                        reverse(self.create_post),
+                        data={'text': 'Картинка',
+                              'image': self.upload_jpeg((20, 20))},
+                    )
+
+                self.assertFormError(
+                    response, 'form', 'image',
+                    'Не удалось обработать изображение.',
+                )
+                broken = error is BrokenProcessPool
+                self.assertEqual(images._executor is None, broken)
+                self.assertEqual(pool.shutdown.called, broken)
+                images._executor = None
+
     def test_post_create_nonaut_user(self):
         """
         Тестирование на возможность
@@ -213,3 +311,25 @@ class CommentCreateFormTest(TestCase):
             self.post.comments.all().count(),
             comment_count + 1
         )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class PostCreateTransactionTest(TransactionTestCase):
+    def test_image_processed_outside_transaction(self):
+        """Картинка перекодируется до транзакции сохранения поста."""
+        client = Client()
+        client.force_login(User.objects.create_user(username='auth'))
+        in_atomic = []
+
+        def ingest(image):
+            in_atomic.append(connection.in_atomic_block)
+            return image
+
+        with mock.patch('posts.forms.ingest', side_effect=ingest):
+            client.post(reverse('posts:create_post'), data={
+                'text': 'Пост с картинкой',
+                'image': PostCreateFormTest.upload_jpeg((10, 10)),
+            })
+
+        self.assertEqual(in_atomic, [False])
+        self.assertTrue(Post.objects.filter(text='Пост с картинкой').exists())
@@ -0,0 +1,75 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Follow, Post
+
+
+User = get_user_model()
+
+
+class SharedPageTests(TestCase):
+    """Одна копия страницы в кэше на всех, фрагменты — свои у каждого."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.post = Post.objects.create(author=cls.author, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(SharedPageTests.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(SharedPageTests.reader)
+
+    def test_logged_in_user_gets_page_cached_for_guest(self):
+        """Авторизованный получает страницу из кэша гостя со своей шапкой."""
+        guest = self.guest_client.get(reverse('posts:index'))
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.reader_client.get(reverse('posts:index'))
+
+        self.assertContains(guest, 'Войти')
+        self.assertNotContains(guest, 'Избранные авторы')
+        self.assertContains(response, 'Пользователь: reader')
+        self.assertContains(response, 'Избранные авторы')
+        self.assertNotContains(response, '<!--hole:')
+        self.assertFalse(any(
+            'posts_post' in query['sql']
+            for query in context.captured_queries
+        ))
+
+    def test_follow_button_is_personal(self):
+        """Кнопка подписки на закэшированном профиле своя у каждого."""
+        url = reverse('posts:profile', kwargs={'username': 'author'})
+
+        guest = self.guest_client.get(url)
+        reader = self.reader_client.get(url)
+        author = self.author_client.get(url)
+
+        self.assertNotContains(guest, 'Подписаться')
+        self.assertContains(reader, 'Отписаться')
+        self.assertContains(author, 'Подписаться')
+
+    def test_post_controls_are_personal(self):
+        """Правка поста только у автора, форма комментария с его CSRF."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        edit_url = reverse('posts:post_edit', kwargs={'post_id': self.post.pk})
+
+        guest = self.guest_client.get(url)
+        reader = self.reader_client.get(url)
+        author = self.author_client.get(url)
+
+        self.assertNotContains(guest, 'Добавить комментарий')
+        self.assertNotContains(reader, edit_url)
+        self.assertContains(reader, 'Добавить комментарий')
+        self.assertContains(reader, 'csrfmiddlewaretoken')
+        self.assertContains(author, edit_url)
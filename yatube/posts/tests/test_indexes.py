@@ -0,0 +1,95 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+
+User = get_user_model()
+
+
+class QueryPlanTests(TestCase):
+    """Основные запросы страниц читаются по индексу, без сортировки."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.user)
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый пост',
+            group=cls.group,
+        )
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Комментарий'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(QueryPlanTests.reader)
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def main_query_plan(self, url, table):
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url)
+        queries = [query['sql'] for query in context.captured_queries
+                   if query['sql'].startswith('SELECT')
+                   and f'FROM "{table}"' in query['sql']
+                   and 'ORDER BY' in query['sql']]
+        self.assertTrue(queries, f'Не найден запрос к {table} на {url}')
+        return self.explain(queries[0])
+
+    def test_list_queries_use_indexes(self):
+        """
+        EXPLAIN QUERY PLAN не содержит полного скана и сортировки.
+        Досортировка хвоста ключа (RIGHT PART OF ORDER BY) в ленте
+        подписок затрагивает только посты с одинаковым created.
+        """
+        pages = {
+            reverse('posts:index'): 'posts_post',
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}):
+            'posts_post',
+            reverse('posts:profile', kwargs={'username': self.user.username}):
+            'posts_post',
+            reverse('posts:follow_index'): 'posts_post',
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}):
+            'posts_comment',
+        }
+
+        for url, table in pages.items():
+            with self.subTest(url=url):
+                plan = self.main_query_plan(url, table)
+                for step in plan:
+                    self.assertNotIn(
+                        'USE TEMP B-TREE FOR ORDER BY', step, plan
+                    )
+                    if step.startswith('SCAN'):
+                        self.assertIn('USING', step, plan)
+
+    def test_follow_lookup_by_author_uses_index(self):
+        """Подписчики автора выбираются по индексу без скана Follow."""
+        sql, params = (Follow.objects
+                       .filter(author=self.user)
+                       .values_list('user', flat=True)
+                       .query.sql_with_params())
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = [row[-1] for row in cursor.fetchall()]
+
+        self.assertTrue(
+            any('follow_author_user_idx' in step for step in plan), plan
+        )
@@ -0,0 +1,99 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Group, Post
+
+
+User = get_user_model()
+
+
+@override_settings(POSTS_PER_PAGE=3)
+class ListingCacheTests(TestCase):
+    """Списки постов из кэша id и объектов."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='Описание'
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа', slug='other-slug', description='Описание'
+        )
+        for number in range(5):
+            Post.objects.create(
+                author=cls.author, text=f'Пост {number}', group=cls.group
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def post_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        return response, [query['sql'] for query in context.captured_queries
+                          if 'posts_post' in query['sql']]
+
+    def test_edit_refetches_only_edited_post(self):
+        """После правки страница перерисовывается, но из базы — один пост."""
+        url = reverse('posts:index')
+        self.client.get(url)
+        post = Post.objects.latest('created')
+        post.text = 'Исправленный пост'
+        post.save()
+
+        response, queries = self.post_queries(url)
+
+        self.assertContains(response, 'Исправленный пост')
+        self.assertEqual(len(queries), 1, queries)
+        self.assertIn(f'IN ({post.pk})', queries[0])
+
+    def test_new_post_resets_id_lists(self):
+        """Новый пост появляется в списках главной, группы и профиля."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+        )
+        for url in urls:
+            self.client.get(url)
+
+        Post.objects.create(
+            author=self.author, text='Новый пост', group=self.group
+        )
+
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), 'Новый пост')
+
+    def test_group_change_moves_post_between_lists(self):
+        """Смена группы убирает пост из старого списка и добавляет в новый."""
+        old_url = reverse('posts:group_list', kwargs={'slug': 'test-slug'})
+        new_url = reverse('posts:group_list', kwargs={'slug': 'other-slug'})
+        self.client.get(old_url)
+        self.client.get(new_url)
+        post = Post.objects.latest('created')
+
+        post.group = self.other_group
+        post.save()
+
+        self.assertNotContains(self.client.get(old_url), post.text)
+        self.assertContains(self.client.get(new_url), post.text)
+
+    def test_numbered_pages_follow_deletion(self):
+        """Нумерованные страницы учитывают удаление поста."""
+        url = reverse('posts:index') + '?page=2'
+        before = self.client.get(url)
+
+        Post.objects.earliest('created').delete()
+        after = self.client.get(url)
+
+        self.assertEqual(len(before.context['page_obj']), 2)
+        self.assertEqual(len(after.context['page_obj']), 1)
+        self.assertEqual(after.context['page_obj'].paginator.count, 4)
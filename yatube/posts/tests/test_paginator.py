@@ -0,0 +1,125 @@
+import base64
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from posts.feed import follow_feed
+from posts.models import Follow, Post
+from posts.utils import CursorPaginator, CachedPaginator
+
+
+User = get_user_model()
+
+
+@override_settings(POSTS_PER_PAGE=3)
+class CursorPaginatorTests(TestCase):
+    POSTS_CREATE_COUNT = 8
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.user)
+        for number in range(CursorPaginatorTests.POSTS_CREATE_COUNT):
+            Post.objects.create(author=cls.user, text=f'Пост {number}')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def walk(self, queryset):
+        paginator = CursorPaginator(queryset, 3)
+        page = paginator.get_page(None)
+        pages = [list(page)]
+        while page.next_cursor:
+            page = paginator.get_page(page.next_cursor)
+            pages.append(list(page))
+        return page, paginator, pages
+
+    def test_cursor_walk_covers_all_posts(self):
+        """Переход по курсорам проходит выборку без пропусков и повторов."""
+        _, _, pages = self.walk(Post.objects.all())
+
+        self.assertEqual(
+            [post for page in pages for post in page],
+            list(Post.objects.all())
+        )
+        self.assertEqual([len(page) for page in pages], [3, 3, 2])
+
+    def test_previous_cursor_returns_previous_page(self):
+        """Курсор назад возвращает предыдущую страницу."""
+        page, paginator, pages = self.walk(Post.objects.all())
+
+        previous = paginator.get_page(page.previous_cursor)
+
+        self.assertEqual(list(previous), pages[-2])
+        self.assertTrue(previous.has_next())
+
+    def test_follow_feed_cursor_walk(self):
+        """Курсоры работают с материализованной лентой подписок."""
+        _, _, pages = self.walk(follow_feed(self.reader))
+
+        self.assertEqual(
+            [post.pk for page in pages for post in page],
+            list(Post.objects.values_list('pk', flat=True))
+        )
+
+    def test_deep_page_is_single_query(self):
+        """Страница по курсору — один запрос без COUNT(*)."""
+        paginator = CursorPaginator(Post.objects.all(), 3)
+        cursor = paginator.get_page(None).next_cursor
+
+        with self.assertNumQueries(1):
+            page = paginator.get_page(cursor)
+            self.assertTrue(page.has_next())
+
+    def test_invalid_cursor_returns_first_page(self):
+        """Некорректный курсор открывает первую страницу."""
+        response = self.guest_client.get(
+            reverse('posts:index') + '?cursor=broken'
+        )
+
+        self.assertEqual(
+            list(response.context['page_obj']),
+            list(Post.objects.all()[:3])
+        )
+
+    def test_crafted_cursor_returns_first_page(self):
+        """Курсор с чужой структурой или значениями — первая страница."""
+        first = list(Post.objects.all()[:3])
+        for token in (['next', 5], {}, ['next', ['not-a-date', 1]],
+                      ['next', ['2020-01-01T00:00:00+00:00', 'abc']],
+                      ['next', [None, 1]], 'next', 5):
+            cursor = base64.urlsafe_b64encode(
+                json.dumps(token).encode()
+            ).decode()
+            with self.subTest(token=token):
+                response = self.guest_client.get(
+                    reverse('posts:index'), {'cursor': cursor}
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(list(response.context['page_obj']), first)
+
+    @override_settings(PAGE_NUMBERS_MAX_COUNT=5)
+    def test_page_number_ignored_on_large_list(self):
+        """На большой выборке ?page=N листается курсором без COUNT."""
+        response = self.guest_client.get(reverse('posts:index') + '?page=3')
+
+        page_obj = response.context['page_obj']
+        self.assertIsInstance(page_obj.paginator, CursorPaginator)
+        self.assertEqual(page_obj.number, 1)
+        self.assertEqual(list(page_obj), list(Post.objects.all()[:3]))
+
+    def test_page_number_mode_still_available(self):
+        """Нумерованные страницы остаются доступны через ?page=N."""
+        response = self.guest_client.get(reverse('posts:index') + '?page=3')
+
+        self.assertIsInstance(
+            response.context['page_obj'].paginator, CachedPaginator
+        )
+        self.assertEqual(response.context['page_obj'].number, 3)
+        self.assertEqual(len(response.context['page_obj']), 2)
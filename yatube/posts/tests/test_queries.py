@@ -0,0 +1,85 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+
+User = get_user_model()
+
+
+# Журнал запросов не сбрасывает статистику в базу во время замера.
+@override_settings(QUERY_LOG_FLUSH_INTERVAL=float('inf'))
+class QueryBudgetTests(TestCase):
+    """Число запросов страниц не растёт с числом постов на странице."""
+    AUTHORS_COUNT = 12
+    # Сессия и пользователь запроса учтены в бюджете каждой страницы,
+    # у post_detail ещё поиск автора поста для ключа кэша, у index —
+    # подписки читателя для кнопок на карточках (дальше они в кэше).
+    BUDGETS = {
+        'posts:index': 4,
+        'posts:group_list': 4,
+        'posts:profile': 6,
+        'posts:post_detail': 6,
+        'posts:follow_index': 4,
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        for number in range(QueryBudgetTests.AUTHORS_COUNT):
+            author = User.objects.create_user(
+                username=f'author-{number}',
+                first_name='Имя',
+                last_name=f'Фамилия {number}',
+            )
+            Follow.objects.create(user=cls.reader, author=author)
+            cls.post = Post.objects.create(
+                author=author, text=f'Пост {number}', group=cls.group
+            )
+        for number in range(QueryBudgetTests.AUTHORS_COUNT):
+            Comment.objects.create(
+                post=cls.post,
+                author=User.objects.get(username=f'author-{number}'),
+                text=f'Комментарий {number}',
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(QueryBudgetTests.reader)
+
+    def test_views_stay_within_query_budget(self):
+        """Каждая страница укладывается в фиксированный бюджет запросов."""
+        urls = {
+            'posts:index': reverse('posts:index'),
+            'posts:group_list': reverse(
+                'posts:group_list', kwargs={'slug': self.group.slug}
+            ),
+            'posts:profile': reverse(
+                'posts:profile',
+                kwargs={'username': self.post.author.username}
+            ),
+            'posts:post_detail': reverse(
+                'posts:post_detail', kwargs={'post_id': self.post.pk}
+            ),
+            'posts:follow_index': reverse('posts:follow_index'),
+        }
+
+        for name, url in urls.items():
+            with self.subTest(view=name):
+                with CaptureQueriesContext(connection) as context:
+                    self.client.get(url)
+                queries = [query['sql'] for query in context.captured_queries]
+                self.assertLessEqual(
+                    len(queries), self.BUDGETS[name], '\n'.join(queries)
+                )
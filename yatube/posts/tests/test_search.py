@@ -0,0 +1,115 @@
+from io import StringIO
+
+from django.contrib.admin.sites import site
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Group, Post, PostSearch
+from posts.stemmer import stem
+
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.cat = Post.objects.create(
+            author=cls.author, text='Кошка спит на тёплой крыше',
+            group=cls.group,
+        )
+        cls.cats = Post.objects.create(
+            author=cls.other, text='Кошки, кошки и ещё раз кошки',
+        )
+        cls.dog = Post.objects.create(
+            author=cls.author, text='Собака гуляет во дворе',
+        )
+        cls.url = reverse('posts:search')
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_stemmer_reduces_word_forms(self):
+        """Формы одного слова сводятся к общей основе."""
+        self.assertEqual(stem('кошками'), stem('Кошка'))
+        self.assertEqual(stem('читали'), stem('читает'))
+        self.assertEqual(stem('ёлки'), stem('елка'))
+
+    def test_search_matches_word_forms_by_rank(self):
+        """Поиск находит любые формы слова, релевантные посты выше."""
+        found = list(Post.objects.search('кошками'))
+
+        self.assertEqual(found, [self.cats, self.cat])
+        self.assertFalse(Post.objects.search('!!!').exists())
+
+    def test_index_follows_post_changes(self):
+        """Индекс обновляется при изменении и удалении поста."""
+        post = Post.objects.create(author=self.author, text='Старый текст')
+        post.text = 'Новый рассказ'
+        post.save()
+
+        self.assertFalse(Post.objects.search('старый').exists())
+        self.assertEqual(list(Post.objects.search('рассказы')), [post])
+
+        post.delete()
+        self.assertFalse(PostSearch.objects.filter(post_id=post.pk).exists())
+
+    def test_search_view_filters(self):
+        """Страница поиска учитывает фильтры по группе и автору."""
+        cases = {
+            (('q', 'кошка'),): [self.cats, self.cat],
+            (('q', 'кошка'), ('group', self.group.pk)): [self.cat],
+            (('q', 'кошка'), ('author', 'other')): [self.cats],
+            (('q', 'кошка'), ('date_from', '2000-01-01')):
+            [self.cats, self.cat],
+            (('q', ''),): [],
+        }
+        for params, expected in cases.items():
+            with self.subTest(params=params):
+                response = self.client.get(self.url, dict(params))
+                self.assertEqual(
+                    list(response.context['page_obj']), expected
+                )
+
+    @override_settings(POSTS_PER_PAGE=1)
+    def test_search_view_cursor_keeps_query(self):
+        """Курсор следующей страницы сохраняет запрос."""
+        first = self.client.get(self.url, {'q': 'кошка'})
+        cursor = first.context['page_obj'].next_cursor
+
+        self.assertContains(
+            first, f'?q=%D0%BA%D0%BE%D1%88%D0%BA%D0%B0&amp;cursor={cursor}'
+        )
+        second = self.client.get(self.url, {'q': 'кошка', 'cursor': cursor})
+        self.assertEqual(list(second.context['page_obj']), [self.cat])
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке идёт по полнотекстовому индексу."""
+        request = RequestFactory().get('/admin/posts/post/')
+        admin = site._registry[Post]
+
+        queryset, distinct = admin.get_search_results(
+            request, Post.objects.all(), 'кошками'
+        )
+
+        self.assertEqual(set(queryset), {self.cat, self.cats})
+        self.assertFalse(distinct)
+
+    def test_rebuild_command_restores_index(self):
+        """Команда rebuild_search_index восстанавливает индекс."""
+        PostSearch.objects.all().delete()
+
+        call_command('rebuild_search_index', stdout=StringIO())
+
+        self.assertEqual(PostSearch.objects.count(), Post.objects.count())
+        self.assertEqual(list(Post.objects.search('собаки')), [self.dog])
@@ -0,0 +1,113 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import Count, F
+from django.test import TestCase
+
+from posts.management.commands.seed_social_graph import (
+    drop_indexes, restore_indexes,
+)
+from posts.models import Comment, Follow, Group, Post, PostSearch, Timeline
+
+
+User = get_user_model()
+
+
+class SeedSocialGraphTests(TestCase):
+    def seed(self, *args):
+        out = StringIO()
+        call_command(
+            'seed_social_graph', '--users', '50', '--groups', '3',
+            '--posts', '400', '--comments', '300', '--follows', '5',
+            '--batch-size', '64', *args, stdout=out,
+        )
+        return out.getvalue()
+
+    def test_graph_created_with_consistent_derived_data(self):
+        """Граф создан, счётчики, ленты и индекс согласованы с данными."""
+        self.seed('--with-search')
+
+        self.assertEqual(User.objects.count(), 50)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 400)
+        self.assertEqual(Comment.objects.count(), 300)
+        self.assertTrue(Follow.objects.exists())
+        self.assertFalse(Follow.objects.filter(user=F('author')).exists())
+        self.assertEqual(PostSearch.objects.count(), 400)
+        self.assertEqual(
+            Timeline.objects.count(),
+            Post.objects.filter(author__following__isnull=False).count(),
+        )
+        out = StringIO()
+        call_command('recount_stats', stdout=out)
+        self.assertIn('пользователей 0, постов 0', out.getvalue())
+
+    def test_posting_follows_power_law(self):
+        """Самый активный автор пишет много больше медианного."""
+        self.seed('--skip-timeline')
+        counts = sorted(
+            Post.objects.order_by().values('author').annotate(
+                count=Count('pk')).values_list('count', flat=True)
+        )
+
+        self.assertGreater(counts[-1], counts[len(counts) // 2] * 5)
+        self.assertFalse(Timeline.objects.exists())
+        self.assertFalse(PostSearch.objects.exists())
+
+    def test_search_indexes_only_seeded_posts(self):
+        """--with-search индексирует только созданные командой посты."""
+        self.seed('--prefix', 'a', '--skip-timeline')
+        self.seed('--prefix', 'b', '--skip-timeline', '--with-search')
+
+        self.assertEqual(
+            set(PostSearch.objects.values_list('post_id', flat=True)),
+            set(Post.objects.filter(author__username__startswith='b-')
+                .values_list('pk', flat=True)),
+        )
+
+    def test_same_seed_same_graph(self):
+        """Одинаковый seed даёт одинаковый граф."""
+        self.seed('--prefix', 'a', '--skip-timeline')
+        self.seed('--prefix', 'b', '--skip-timeline')
+
+        def texts(prefix):
+            return list(Post.objects
+                        .filter(author__username__startswith=prefix)
+                        .order_by('pk')
+                        .values_list('text', flat=True))
+
+        self.assertEqual(texts('a-'), texts('b-'))
+
+    def test_unique_indexes_kept_during_load(self):
+        """На время вставки снимаются только неуникальные индексы."""
+        def indexes():
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA index_list(posts_follow)')
+                return {row[1]: row[2] for row in cursor.fetchall()}
+
+        # Так создаёт ограничение UniqueConstraint с условием.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE UNIQUE INDEX follow_self_uniq ON posts_follow '
+                '(user_id) WHERE user_id = author_id'
+            )
+        before = indexes()
+        dropped = drop_indexes(Follow)
+        during = indexes()
+        restore_indexes(dropped)
+
+        self.assertTrue(dropped)
+        self.assertIn('follow_self_uniq', during)
+        self.assertEqual(
+            during, {name: 1 for name, unique in before.items() if unique}
+        )
+        self.assertEqual(indexes(), before)
+
+    def test_existing_prefix_rejected(self):
+        """Повторный запуск с тем же префиксом не дублирует данные."""
+        User.objects.create_user(username='seed-0')
+
+        with self.assertRaises(CommandError):
+            self.seed()
@@ -1,14 +1,18 @@
 import shutil
 import tempfile
+from io import StringIO
 
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.conf import settings
 from django.core.cache import cache
 
-from posts.models import Post, Group
+from posts.models import Comment, Post, Group
 from posts.forms import PostForm
 
 
@@ -69,24 +73,38 @@ class PostsPagesTemplatesTests(TestCase):
         """Тестирование на обновление кэша."""
         response = self.guest_client.get(reverse(self.post_index))
 
-        self.post.delete()
+        Post.objects.filter(pk=self.post.pk).update(text='Без сигналов')
 
-        response_after_del_post = self.guest_client.get(
+        response_after_update = self.guest_client.get(
             reverse(self.post_index)
         )
 
-        cache.clear()
+        self.post.delete()
 
-        response_after_cache_clear = self.guest_client.get(
+        response_after_del_post = self.guest_client.get(
             reverse(self.post_index)
         )
 
-        self.assertEqual(response_after_del_post.content, response.content)
+        self.assertEqual(response_after_update.content, response.content)
         self.assertNotEqual(
-            response_after_cache_clear.content,
+            response_after_del_post.content,
             response.content
         )
 
+    def test_cache_invalidated_by_comment(self):
+        """Новый комментарий сбрасывает кэш страницы поста."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        response = self.guest_client.get(url)
+
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Новый комментарий'
+        )
+
+        response_after_comment = self.guest_client.get(url)
+
+        self.assertNotEqual(response_after_comment.content, response.content)
+        self.assertContains(response_after_comment, 'Новый комментарий')
+
 
 class PostsPagesContextTests(TestCase):
     POSTS_CREATE_COUNT = 11
@@ -436,7 +454,7 @@ class PostsPagesContextTests(TestCase):
         )
 
 
-@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
 class PostsPagesImgContextTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -447,7 +465,7 @@ class PostsPagesImgContextTests(TestCase):
             slug='test-slug',
             description='Тестовое описание',
         )
-        small_gif = (
+        cls.small_gif = small_gif = (
             b'\x47\x49\x46\x38\x39\x61\x02\x00'
             b'\x01\x00\x80\x00\x00\x00\x00\x00'
             b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
@@ -525,3 +543,46 @@ class PostsPagesImgContextTests(TestCase):
         ))
 
         self.assertIsNotNone(response.context.get('post').image)
+
+    def test_img_placeholder_until_thumbnail_ready(self):
+        """
+        Пока миниатюра не создана, вместо неё выводится заглушка;
+        готовая миниатюра сбрасывает кэш страницы.
+        """
+        cache.clear()
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+
+        first = self.guest_client.get(url).content.decode()
+        second = self.guest_client.get(url).content.decode()
+
+        self.assertIn('aspect-ratio', first)
+        self.assertNotIn('<img class="card-img', first)
+        self.assertIn('<img class="card-img', second)
+
+    def test_img_thumbnails_resolved_in_one_query(self):
+        """Миниатюры всех постов страницы читаются одним запросом."""
+        cache.clear()
+        for number in range(3):
+            Post.objects.create(
+                author=self.user,
+                text=f'Пост с картинкой {number}',
+                image=SimpleUploadedFile(
+                    name=f'small-{number}.gif',
+                    content=self.small_gif,
+                    content_type='image/gif',
+                ),
+            )
+        call_command('pregenerate_thumbnails', stdout=StringIO())
+        cache.clear()
+
+        with CaptureQueriesContext(connection) as context:
+            content = self.guest_client.get(
+                reverse('posts:index')
+            ).content.decode()
+
+        kvstore_queries = [
+            query['sql'] for query in context.captured_queries
+            if 'thumbnail_kvstore' in query['sql']
+        ]
+        self.assertEqual(len(kvstore_queries), 1, kvstore_queries)
+        self.assertEqual(content.count('<img class="card-img'), 4)
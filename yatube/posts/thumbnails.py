@@ -0,0 +1,163 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults, settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import (
+    EMPTY_VALUE, KVStore as CachedDBKVStore,
+)
+from sorl.thumbnail.models import KVStore
+
+from . import caching
+from .models import Post
+
+
+logger = logging.getLogger(__name__)
+
+# Варианты миниатюр, которые используют шаблоны.
+VARIANTS = {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+_executor_lock = threading.Lock()
+
+
+def _pool():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+    return _executor
+
+
+def thumbnail_file(name, variant):
+    """Файл миниатюры так же, как его назовёт sorl-thumbnail."""
+    geometry, options = VARIANTS[variant]
+    backend = default.backend
+    source = ImageFile(name)
+    options = dict(options)
+    if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(thumbnail_settings, attr)
+        if value != getattr(defaults, attr):
+            options.setdefault(key, value)
+    return ImageFile(
+        backend._get_thumbnail_filename(source, geometry, options),
+        default.storage,
+    )
+
+
+def ready_thumbnail(name, variant):
+    """Готовая миниатюра из хранилища sorl или None; PIL не вызывается."""
+    return default.kvstore.get(thumbnail_file(name, variant))
+
+
+def ready_thumbnails(names):
+    """
+    Готовые миниатюры всех вариантов для многих картинок сразу:
+    один get_many к кэшу и один запрос к таблице KVStore на промахи.
+    Возвращает {(name, variant): миниатюра или None}.
+    """
+    pairs = {(name, variant) for name in names for variant in VARIANTS}
+    kvstore = default.kvstore
+    if not isinstance(kvstore, CachedDBKVStore):
+        return {pair: ready_thumbnail(*pair) for pair in pairs}
+    keys = {add_prefix(thumbnail_file(*pair).key): pair for pair in pairs}
+    found = kvstore.cache.get_many(keys) if keys else {}
+    missing = [key for key in keys if key not in found]
+    if missing:
+        rows = dict(KVStore.objects
+                    .filter(key__in=missing)
+                    .values_list('key', 'value'))
+        # Отсутствие тоже кэшируется, как в самом хранилище sorl.
+        loaded = {key: rows.get(key, EMPTY_VALUE) for key in missing}
+        kvstore.cache.set_many(
+            loaded, thumbnail_settings.THUMBNAIL_CACHE_TIMEOUT
+        )
+        found.update(loaded)
+    return {
+        pair: (None if found[key] in (None, EMPTY_VALUE)
+               else deserialize_image_file(found[key]))
+        for key, pair in keys.items()
+    }
+
+
+def attach(posts):
+    """
+    Разрешает миниатюры постов страницы до рендеринга шаблона:
+    post.thumbnails = {variant: миниатюра или None}.
+    """
+    posts = [post for post in posts if post.image]
+    ready = ready_thumbnails({post.image.name for post in posts})
+    for post in posts:
+        post.thumbnails = {
+            variant: ready[post.image.name, variant] for variant in VARIANTS
+        }
+        if None in post.thumbnails.values():
+            schedule(post.image.name)
+    return posts
+
+
+def _invalidate(name):
+    # Страницы с заглушкой вместо картинки устарели.
+    namespaces = {'global'}
+    posts = Post.objects.filter(image=name).values_list(
+        'pk', 'author__username', 'group__slug'
+    )
+    for post_id, username, slug in posts:
+        namespaces.update((f'post:{post_id}', f'author:{username}'))
+        if slug:
+            namespaces.add(f'group:{slug}')
+    caching.bump(*namespaces)
+
+
+def generate(name):
+    """Создаёт недостающие варианты миниатюр изображения."""
+    try:
+        missing = [variant for variant in VARIANTS
+                   if ready_thumbnail(name, variant) is None]
+        for variant in missing:
+            geometry, options = VARIANTS[variant]
+            get_thumbnail(name, geometry, **options)
+        if missing:
+            _invalidate(name)
+    except Exception:
+        logger.exception('Не удалось создать миниатюру %s', name)
+    finally:
+        with _lock:
+            _pending.discard(name)
+
+
+def _work(name):
+    try:
+        generate(name)
+    finally:
+        # Поток пула не обслуживает запросы: соединение закрываем сами.
+        connection.close()
+
+
+def schedule(name):
+    """Ставит создание миниатюр в очередь пула, повторы отбрасываются."""
+    if not name:
+        return None
+    with _lock:
+        if name in _pending:
+            return None
+        _pending.add(name)
+    if not settings.THUMBNAIL_WORKERS:
+        return generate(name)
+    return _pool().submit(_work, name)
@@ -1,10 +1,192 @@
-from django.core.paginator import Paginator
+import base64
+import binascii
+import json
+
+from django.core.paginator import Page, Paginator
 from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from . import listing
+
+
+class CursorPaginator(Paginator):
+    """
+    Пагинация по ключу (created, id) без COUNT(*) и OFFSET.
+
+    Ключ берётся из явной сортировки queryset (все поля по убыванию)
+    или из Meta.ordering модели, последним полем всегда идёт pk.
+    Соседние страницы адресуются непрозрачными курсорами.
+    """
+    keyset = True
+
+    def __init__(self, object_list, per_page, namespaces=None):
+        super().__init__(object_list, per_page)
+        self.namespaces = namespaces
+        ordering = (object_list.query.order_by
+                    or object_list.model._meta.ordering)
+        self.keys = [field.lstrip('-') for field in ordering]
+        if 'pk' not in self.keys:
+            self.keys.append('pk')
+        self.fields = [self.field(key) for key in self.keys]
+        self._num_pages = 1
+
+    def field(self, key):
+        """Поле модели или аннотации, по которому идёт сортировка."""
+        model = self.object_list.model
+        if key == 'pk':
+            return model._meta.pk
+        annotation = self.object_list.query.annotations.get(key)
+        if annotation is not None:
+            return annotation.output_field
+        return model._meta.get_field(key)
+
+    @property
+    def num_pages(self):
+        return self._num_pages
+
+    def encode(self, direction, obj):
+        values = [getattr(obj, key) for key in self.keys]
+        values = [value.isoformat() if hasattr(value, 'isoformat') else value
+                  for value in values]
+        token = json.dumps([direction, values]).encode()
+        return base64.urlsafe_b64encode(token).decode()
+
+    def decode(self, cursor):
+        """
+        Направление и значения ключа из курсора; курсор приходит от
+        клиента, поэтому любой некорректный даёт (None, None).
+        """
+        try:
+            token = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            direction, values = token
+            if direction not in ('next', 'prev'):
+                return None, None
+            if (not isinstance(values, list)
+                    or len(values) != len(self.keys)
+                    or None in values):
+                return None, None
+            values = [field.to_python(value)
+                      for field, value in zip(self.fields, values)]
+        except (ValueError, TypeError, ValidationError, binascii.Error):
+            return None, None
+        return direction, values
+
+    def keyset_filter(self, values, lookup):
+        condition = Q()
+        for position, key in enumerate(self.keys):
+            bound = dict(zip(self.keys[:position], values))
+            bound[f'{key}__{lookup}'] = values[position]
+            condition |= Q(**bound)
+        return condition
+
+    def fetch(self, queryset, limit):
+        """Первые limit объектов, со списком namespaces — через кэш."""
+        if self.namespaces is None:
+            return list(queryset[:limit])
+        return listing.cached_slice(queryset, 0, limit, self.namespaces)
+
+    def get_page(self, cursor):
+        """Страница после (next) или перед (prev) позицией курсора."""
+        direction, values = self.decode(cursor) if cursor else (None, None)
+        descending = [f'-{key}' for key in self.keys]
+        queryset = self.object_list
+        if direction == 'prev':
+            queryset = (queryset
+                        .filter(self.keyset_filter(values, 'gt'))
+                        .order_by(*self.keys))
+        else:
+            if direction == 'next':
+                queryset = queryset.filter(self.keyset_filter(values, 'lt'))
+            queryset = queryset.order_by(*descending)
+        items = self.fetch(queryset, self.per_page + 1)
+        has_more = len(items) > self.per_page
+        items = items[:self.per_page]
+        if direction == 'prev':
+            if not has_more:
+                # Дошли до начала выборки: отдаём полную первую страницу.
+                return self.get_page(None)
+            items.reverse()
+            has_previous, has_next = True, True
+        else:
+            has_previous, has_next = direction == 'next', has_more
+
+        number = 2 if has_previous else 1
+        self._num_pages = number + 1 if has_next else number
+        page = Page(items, number, self)
+        page.previous_cursor = (
+            self.encode('prev', items[0])
+            if has_previous and items else None
+        )
+        page.next_cursor = (
+            self.encode('next', items[-1])
+            if has_next and items else None
+        )
+        return page
+
+
+class CachedPaginator(Paginator):
+    """Нумерованные страницы через кэш id и объектов, см. posts.listing."""
+
+    def __init__(self, object_list, per_page, namespaces):
+        super().__init__(object_list, per_page)
+        self.namespaces = namespaces
+
+    @cached_property
+    def count(self):
+        return listing.cached_count(self.object_list, self.namespaces)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        if top + self.orphans >= self.count:
+            top = self.count
+        return self._get_page(
+            listing.cached_slice(
+                self.object_list, bottom, top, self.namespaces
+            ),
+            number, self,
+        )
+
+
+def _small_count(post_list):
+    """
+    Число объектов выборки, если она не больше PAGE_NUMBERS_MAX_COUNT,
+    иначе None: COUNT по выборке с LIMIT не читает больше лимита строк.
+    """
+    limit = settings.PAGE_NUMBERS_MAX_COUNT
+    count = post_list[:limit + 1].count()
+    return count if count <= limit else None
+
 
+def add_paginator_on_page(post_list, request, page_numbers=False,
+                          namespaces=None):
+    """
+    Пагинация страинцы.
 
-def add_paginator_on_page(post_list, request):
-    """Пагинация страинцы."""
-    paginator = Paginator(post_list, settings.POSTS_PER_PAGE)
+    По умолчанию страницы адресуются курсором (?cursor=...).
+    Нумерация (?page=N) с COUNT(*) и OFFSET — только для выборок
+    не больше PAGE_NUMBERS_MAX_COUNT постов или с page_numbers;
+    на больших ?page=N открывает первую страницу по курсору.
+    С namespaces списков (см. posts.listing) id постов страницы
+    и сами посты берутся из кэша.
+    """
     page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    return page_obj
+    count = None
+    if page_number is not None and not page_numbers:
+        count = _small_count(post_list)
+    if page_numbers or count is not None:
+        if namespaces is None:
+            paginator = Paginator(post_list, settings.POSTS_PER_PAGE)
+        else:
+            paginator = CachedPaginator(
+                post_list, settings.POSTS_PER_PAGE, namespaces
+            )
+        if count is not None:
+            # Выборка уже посчитана проверкой размера.
+            paginator.count = count
+        return paginator.get_page(page_number)
+    paginator = CursorPaginator(post_list, settings.POSTS_PER_PAGE, namespaces)
+    return paginator.get_page(request.GET.get('cursor'))
@@ -1,26 +1,44 @@
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.cache import cache_page
-
-from .models import Follow, Post, Group, User
-from .forms import PostForm, CommentForm
+from django.db import transaction
+from django.http import Http404
+from django.views.decorators.http import require_POST
+
+from core.replicas import replica_reads
+
+from .models import Post, Group, User
+from . import follows, thumbnails
+from .forms import CommentForm, PostForm, SearchForm
+from .caching import cached_page, post_author
+from .counters import user_stats
+from .feed import follow_feed
 from .utils import add_paginator_on_page
 
 
-@cache_page(20, key_prefix='index_page')
+@replica_reads
+@cached_page(lambda request: ('global',))
 def index(request):
-    post_list = Post.objects.select_related('group')
-    page_obj = add_paginator_on_page(post_list, request)
+    post_list = Post.objects.for_feed()
+    page_obj = add_paginator_on_page(
+        post_list, request, namespaces=('global',)
+    )
+    thumbnails.attach(page_obj)
     context = {
         'page_obj': page_obj,
     }
     return render(request, 'posts/index.html', context)
 
 
+@replica_reads
+@cached_page(lambda request, slug: (f'group:{slug}',))
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
-    page_obj = add_paginator_on_page(post_list, request)
+    post_list = group.posts.for_feed()
+    page_obj = add_paginator_on_page(
+        post_list, request, namespaces=(f'group:{slug}',)
+    )
+    thumbnails.attach(page_obj)
     context = {
         'group': group,
         'page_obj': page_obj,
@@ -28,48 +46,74 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@replica_reads
+@cached_page(lambda request, username: (f'author:{username}',))
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
-    post_count = post_list.count()
-    page_obj = add_paginator_on_page(post_list, request)
-    if (request.user.is_authenticated
-       and request.user.follower.filter(author=author).exists()):
-        following = True
-    else:
-        following = False
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    post_list = author.posts.for_feed()
+    stats = user_stats(author)
+    page_obj = add_paginator_on_page(
+        post_list, request, namespaces=(f'author:{username}',)
+    )
+    thumbnails.attach(page_obj)
     context = {
         'page_obj': page_obj,
-        'post_count': post_count,
+        'post_count': stats.posts_count,
+        'stats': stats,
         'author': author,
-        'following': following,
     }
     return render(request, 'posts/profile.html', context)
 
 
+@replica_reads
+@cached_page(lambda request, post_id: (
+    f'post:{post_id}', f'author:{post_author(post_id)}'
+))
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    author = post.author
-    post_count = author.posts.all().count()
+    post = get_object_or_404(Post.objects.for_detail(), pk=post_id)
     comments = post.comments.all()
     context = {
         'form': CommentForm(),
         'post': post,
-        'post_count': post_count,
+        'post_count': user_stats(post.author).posts_count,
         'comments': comments
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def search(request):
+    form = SearchForm(request.GET)
+    post_list = Post.objects.none()
+    if form.is_valid():
+        post_list = form.search(Post.objects.for_feed())
+    page_obj = add_paginator_on_page(post_list, request)
+    thumbnails.attach(page_obj)
+    # Ссылки пагинатора сохраняют запрос и фильтры.
+    query = request.GET.copy()
+    query.pop('cursor', None)
+    query.pop('page', None)
+    context = {
+        'form': form,
+        'page_obj': page_obj,
+        'page_query': f'{query.urlencode()}&' if query else '',
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def create_post(request):
     if request.method == 'POST':
         form = PostForm(request.POST, files=request.FILES or None)
 
+        # Перекодирование картинки идёт до транзакции: с BEGIN IMMEDIATE
+        # она держит блокировку записи только на время сохранения.
         if form.is_valid():
             post = form.save(commit=False)
             post.author = request.user
-            post.save()
+            with transaction.atomic():
+                post.save()
             return redirect('posts:profile', username=post.author.username)
 
         return render(request, 'posts/create_post.html', {'form': form})
@@ -81,8 +125,7 @@ def create_post(request):
 @login_required
 def post_edit(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
-    author = post.author
-    if request.user != author:
+    if request.user.pk != post.author_id:
         return redirect('posts:post_detail', post_id=post_id)
 
     form = PostForm(
@@ -91,7 +134,8 @@ def post_edit(request, post_id):
         instance=post
     )
     if form.is_valid() and request.method == "POST":
-        form.save()
+        # Счётчик комментариев обновляется отдельно и не перезаписывается.
+        form.save(commit=False).save(update_fields=form.Meta.fields)
         return redirect('posts:post_detail', post_id=post_id)
     context = {
         'form': form,
@@ -102,20 +146,23 @@ def post_edit(request, post_id):
 
 @login_required
 def add_comment(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        with transaction.atomic():
+            comment.save()
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@replica_reads
 @login_required
 def follow_index(request):
-    posts_list = Post.objects.filter(author__following__user=request.user)
+    posts_list = follow_feed(request.user).for_feed()
     page_obj = add_paginator_on_page(posts_list, request)
+    thumbnails.attach(page_obj)
     context = {
         'page_obj': page_obj,
     }
@@ -124,16 +171,26 @@ def follow_index(request):
 
 @login_required
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
-    following = Follow.objects.filter(
-        user=request.user, author=author).exists()
-    if request.user != author and following is not True:
-        Follow(user=request.user, author=author).save()
+    if username not in follows.follow(request.user, [username]):
+        raise Http404
     return redirect('posts:follow_index')
 
 
 @login_required
 def profile_unfollow(request, username):
-    author = get_object_or_404(User, username=username)
-    Follow.objects.filter(author=author, user=request.user).delete()
+    if (not follows.unfollow(request.user, [username])
+            and not User.objects.filter(username=username).exists()):
+        raise Http404
+    return redirect('posts:follow_index')
+
+
+@login_required
+@require_POST
+def follow_many(request):
+    """Подписка или отписка от нескольких авторов (username) разом."""
+    usernames = request.POST.getlist('username')[:settings.FOLLOW_BULK_LIMIT]
+    if request.POST.get('action') == 'unfollow':
+        follows.unfollow(request.user, usernames)
+    else:
+        follows.follow(request.user, usernames)
     return redirect('posts:follow_index')
@@ -1,8 +1,15 @@
+import atexit
 import os
+import shutil
+import sys
+import tempfile
 
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+# Прогон тестов: manage.py test или pytest (pytest-django).
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+
 
 SECRET_KEY = '118b0&$c4=2r&sdhfrmwb-m=6q+j4buugbt@1j*vg37574z=(j'
 
@@ -26,7 +33,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
 
-    'posts',
+    'posts.apps.PostsConfig',
     'users',
     'core',
     'about',
@@ -35,6 +42,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Журнал запросов снаружи метрик: его запись в базу после ответа
+    # не попадает в число и время SQL-запросов страницы.
+    'core.middleware.QueryLogMiddleware',
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -49,7 +61,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.templates_backend.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -69,11 +81,59 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        # sqlite3 с опциями init_command и transaction_mode из Django 5.1.
+        'ENGINE': 'core.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+        # Соединение переживает запрос и переиспользуется своим потоком.
+        'CONN_MAX_AGE': 60,
+        # Тестовая база в файле, как рабочая: в памяти с общим кэшем
+        # SQLite блокирует таблицы без ожидания busy_timeout.
+        'TEST': {'NAME': os.path.join(BASE_DIR, 'test_db.sqlite3')},
+        'OPTIONS': {
+            # busy_timeout, с: сколько ждать блокировку записи.
+            'timeout': 20,
+            # Пишущие atomic сразу встают в очередь за блокировкой.
+            'transaction_mode': 'IMMEDIATE',
+            # auto_vacuum действует только для новой базы и до WAL,
+            # старую переводит db_maintenance --convert.
+            # WAL: читатели не ждут писателя.
+            'init_command': (
+                'PRAGMA auto_vacuum=INCREMENTAL;'
+                'PRAGMA journal_mode=WAL;'
+                'PRAGMA synchronous=NORMAL;'
+                'PRAGMA cache_size=-20000;'
+                'PRAGMA mmap_size=134217728;'
+                'PRAGMA temp_store=MEMORY'
+            ),
+        },
+    },
+    # Локальная реплика: копия default, её обновляет refresh_replica.
+    'replica': {
+        'ENGINE': 'core.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db.replica.sqlite3'),
+        'CONN_MAX_AGE': 60,
+        'OPTIONS': {
+            'timeout': 20,
+            'init_command': (
+                'PRAGMA query_only=ON;'
+                'PRAGMA cache_size=-20000;'
+                'PRAGMA mmap_size=134217728;'
+                'PRAGMA temp_store=MEMORY'
+            ),
+        },
+        'TEST': {'MIRROR': 'default'},
+    },
 }
 
+# Чтения представлений с replica_reads идут на реплики, см. core.replicas.
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+DATABASE_REPLICAS = ['replica']
+# Реплика, отставшая больше чем на столько секунд, не используется.
+REPLICA_MAX_LAG = 10
+# Сколько после записи пользователь читает не старше своей записи;
+# должно быть больше REPLICA_MAX_LAG.
+REPLICA_STICKY_SECONDS = 30
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -105,6 +165,56 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 POSTS_PER_PAGE = 10
+# Нумерованные страницы (?page=N) только для выборок не больше этого,
+# большие листаются курсором без COUNT(*) и OFFSET.
+PAGE_NUMBERS_MAX_COUNT = 1000
+# Авторы с большим числом подписчиков не рассылаются по лентам,
+# а подмешиваются в ленту подписок при чтении.
+FEED_FANOUT_LIMIT = 5000
+FEED_BATCH_SIZE = 500
+FEED_PULLED_TIMEOUT = 60
+# Сколько авторов за раз принимает follow_many.
+FOLLOW_BULK_LIMIT = 100
+# Множество подписок пользователя для кнопок подписки на карточках.
+FOLLOWING_TIMEOUT = 60 * 60
+# Страницы сбрасываются сигналами моделей, поэтому хранятся долго.
+PAGE_CACHE_TIMEOUT = 60 * 10
+# Защита от лавины пересчётов: сколько устаревшее значение ещё можно
+# отдавать, срок блокировки пересчёта, ожидание чужого пересчёта
+# и потоки фонового обновления (0 — обновлять в самом запросе).
+CACHE_STALE_TIMEOUT = 60 * 10
+CACHE_LOCK_TIMEOUT = 30
+CACHE_LOCK_WAIT = 2
+CACHE_REFRESH_WORKERS = 2
+# Ключ карточки поста меняется вместе с её содержимым, сбрасывать
+# карточки не нужно: старые просто истекают.
+POST_CARD_TIMEOUT = 60 * 60 * 24
+# Посты, авторы и группы списков; сбрасываются сигналами моделей.
+OBJECT_CACHE_TIMEOUT = 60 * 60
+# Потоки фонового создания миниатюр; 0 — создавать сразу в вызывающем.
+THUMBNAIL_WORKERS = 2
+# Приём картинок: лимиты и перекодирование в пуле процессов.
+IMAGE_WORKERS = 2
+# Сколько секунд запрос ждёт перекодирования картинки в пуле.
+IMAGE_TIMEOUT = 30
+IMAGE_MAX_BYTES = 20 * 1024 * 1024
+IMAGE_MAX_PIXELS = 50 * 10 ** 6
+IMAGE_MAX_SIDE = 1920
+IMAGE_QUALITY = 85
+# Метрики запросов: снимки процессов своего развёртывания и доступ
+# к /metrics. Сборщик присылает METRICS_TOKEN в Authorization: Bearer;
+# METRICS_ALLOWED_IPS сверяются с REMOTE_ADDR, поэтому за обратным
+# прокси (там REMOTE_ADDR — адрес прокси) их оставляют пустыми.
+METRICS_DIR = os.path.join(BASE_DIR, 'metrics')
+METRICS_FLUSH_INTERVAL = 5
+METRICS_TOKEN = None
+METRICS_ALLOWED_IPS = ()
+# Журнал запросов: порог медленного запроса в секундах, частота записи
+# статистики в базу и сколько последних медленных запросов хранить.
+SLOW_QUERY_THRESHOLD = 0.05
+SLOW_QUERY_KEEP = 1000
+SLOW_QUERY_STACK_DEPTH = 8
+QUERY_LOG_FLUSH_INTERVAL = 10
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
@@ -115,6 +225,24 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+            'MAX_SIZE': 256 * 1024 * 1024,
+            'COMPRESS_MIN_SIZE': 1024,
+        },
     }
 }
+if TESTING:
+    # Тесты и замеры очищают кэш и пишут в него отметки реплик: у прогона
+    # свой файл, кэш работающего сервера они не трогают.
+    _test_cache_dir = tempfile.mkdtemp(prefix='yatube-test-cache-')
+    atexit.register(shutil.rmtree, _test_cache_dir, ignore_errors=True)
+    CACHES['default']['LOCATION'] = os.path.join(
+        _test_cache_dir, 'cache.sqlite3'
+    )
+    # Фоновые потоки миниатюр и обновления кэша пишут в MEDIA_ROOT и базу
+    # теста уже после его транзакции: в тестах работа идёт в самом запросе.
+    THUMBNAIL_WORKERS = 0
+    CACHE_REFRESH_WORKERS = 0
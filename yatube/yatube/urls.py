@@ -3,6 +3,8 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core.views import metrics_export
+
 
 handler403 = settings.CSRF_FAILURE_VIEW
 handler404 = 'core.views.page_not_found'
@@ -15,6 +17,7 @@ urlpatterns = [
     path('auth/', include('users.urls', namespace='users')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
+    path('metrics', metrics_export, name='metrics'),
 ]
 
 if settings.DEBUG: